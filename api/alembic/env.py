@@ -15,7 +15,7 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from app.config import settings
 from app.database import Base
-from app.models import User, CarbonLog, Badge, UserBadge, Challenge, RecyclingPoint, CFCReport
+from app.models import User, CarbonLog, Badge, UserBadge, Challenge, RecyclingPoint, CFCReport, RecommendationSnapshot, PointsLedger, PointsPeriodTotal, UserChallengeProgress, UserActivityDays, UserFollow, EcoScoreHistory, EmailOutbox, JobCheckpoint
 
 # this is the Alembic Config object
 config = context.config
@@ -0,0 +1,36 @@
+"""add_recommendation_snapshots
+
+Revision ID: 7c1e2f9a3b10
+Revises: email_verification_001
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e2f9a3b10'
+down_revision: Union[str, None] = 'email_verification_001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('recommendation_snapshots',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('days', sa.Integer(), nullable=False),
+    sa.Column('data', sa.JSON(), nullable=False),
+    sa.Column('data_version', sa.String(length=100), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'days')
+    )
+    op.create_index(op.f('ix_recommendation_snapshots_computed_at'), 'recommendation_snapshots', ['computed_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_recommendation_snapshots_computed_at'), table_name='recommendation_snapshots')
+    op.drop_table('recommendation_snapshots')
@@ -0,0 +1,74 @@
+"""add_points_ledger
+
+Revision ID: 3d8b5e61f2a4
+Revises: 7c1e2f9a3b10
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d8b5e61f2a4'
+down_revision: Union[str, None] = '7c1e2f9a3b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    ledger = op.create_table('points_ledger',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=50), nullable=False),
+    sa.Column('log_id', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_points_ledger_user_id'), 'points_ledger', ['user_id'], unique=False)
+    op.create_index(op.f('ix_points_ledger_log_id'), 'points_ledger', ['log_id'], unique=False)
+    op.create_index(op.f('ix_points_ledger_created_at'), 'points_ledger', ['created_at'], unique=False)
+
+    op.create_table('points_period_totals',
+    sa.Column('period_type', sa.String(length=10), nullable=False),
+    sa.Column('period_start', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('points', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('period_type', 'period_start', 'user_id')
+    )
+    op.create_index('ix_points_period_totals_ranking', 'points_period_totals', ['period_type', 'period_start', 'points'], unique=False)
+
+    # Opening balance so each user's ledger sums to their current total_points
+    conn = op.get_bind()
+    users = conn.execute(sa.text(
+        "SELECT id, total_points FROM users WHERE total_points IS NOT NULL AND total_points <> 0"
+    )).fetchall()
+    now = datetime.utcnow()
+    if users:
+        op.bulk_insert(ledger, [
+            {
+                'id': uuid.uuid4(),
+                'user_id': user_id,
+                'delta': total_points,
+                'reason': 'opening_balance',
+                'log_id': None,
+                'created_at': now,
+            }
+            for user_id, total_points in users
+        ])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_points_period_totals_ranking', table_name='points_period_totals')
+    op.drop_table('points_period_totals')
+    op.drop_index(op.f('ix_points_ledger_created_at'), table_name='points_ledger')
+    op.drop_index(op.f('ix_points_ledger_log_id'), table_name='points_ledger')
+    op.drop_index(op.f('ix_points_ledger_user_id'), table_name='points_ledger')
+    op.drop_table('points_ledger')
@@ -0,0 +1,43 @@
+"""add_challenge_progress
+
+Revision ID: 9f4a0c7d2e58
+Revises: 3d8b5e61f2a4
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f4a0c7d2e58'
+down_revision: Union[str, None] = '3d8b5e61f2a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('challenges', sa.Column('category', sa.String(length=50), nullable=True))
+    op.add_column('challenges', sa.Column('activity', sa.String(length=255), nullable=True))
+    op.create_index(op.f('ix_challenges_category'), 'challenges', ['category'], unique=False)
+
+    op.create_table('user_challenge_progress',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('challenge_id', sa.UUID(), nullable=False),
+    sa.Column('progress', sa.Float(), nullable=False),
+    sa.Column('last_counted_date', sa.Date(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['challenge_id'], ['challenges.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'challenge_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_challenge_progress')
+    op.drop_index(op.f('ix_challenges_category'), table_name='challenges')
+    op.drop_column('challenges', 'activity')
+    op.drop_column('challenges', 'category')
@@ -0,0 +1,60 @@
+"""add_user_activity_days
+
+Revision ID: b6e2d4f81c37
+Revises: 9f4a0c7d2e58
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e2d4f81c37'
+down_revision: Union[str, None] = '9f4a0c7d2e58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    activity_days = op.create_table('user_activity_days',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('day_bits', sa.LargeBinary(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Build each user's bitmap from the days they have logged on
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT DISTINCT user_id, CAST(created_at AS DATE) FROM carbon_logs WHERE created_at IS NOT NULL"
+    )).fetchall()
+    days_by_user = defaultdict(list)
+    for user_id, day in rows:
+        days_by_user[user_id].append(day)
+
+    now = datetime.utcnow()
+    bitmaps = []
+    for user_id, days in days_by_user.items():
+        start_date = min(days)
+        bits = 0
+        for day in days:
+            bits |= 1 << (day - start_date).days
+        bitmaps.append({
+            'user_id': user_id,
+            'start_date': start_date,
+            'day_bits': bits.to_bytes((bits.bit_length() + 7) // 8, 'little'),
+            'updated_at': now,
+        })
+    if bitmaps:
+        op.bulk_insert(activity_days, bitmaps)
+
+
+def downgrade() -> None:
+    op.drop_table('user_activity_days')
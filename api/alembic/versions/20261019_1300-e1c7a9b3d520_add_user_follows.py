@@ -0,0 +1,35 @@
+"""add_user_follows
+
+Revision ID: e1c7a9b3d520
+Revises: b6e2d4f81c37
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1c7a9b3d520'
+down_revision: Union[str, None] = 'b6e2d4f81c37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_follows',
+    sa.Column('follower_id', sa.UUID(), nullable=False),
+    sa.Column('followee_id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['followee_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['follower_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('follower_id', 'followee_id')
+    )
+    op.create_index('ix_user_follows_followee_id', 'user_follows', ['followee_id', 'follower_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_follows_followee_id', table_name='user_follows')
+    op.drop_table('user_follows')
@@ -0,0 +1,35 @@
+"""add_eco_score_history
+
+Revision ID: 5a9d3f7e1b62
+Revises: e1c7a9b3d520
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a9d3f7e1b62'
+down_revision: Union[str, None] = 'e1c7a9b3d520'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('eco_score_history',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('snapshot_date', sa.Date(), nullable=False),
+    sa.Column('eco_score', sa.Float(), nullable=False),
+    sa.Column('total_points', sa.Integer(), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'snapshot_date')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('eco_score_history')
@@ -0,0 +1,37 @@
+"""add_weekly_digest
+
+Revision ID: 7b3e9d1f4a28
+Revises: c4f8a2d6e913
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3e9d1f4a28'
+down_revision: Union[str, None] = 'c4f8a2d6e913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('weekly_digest_opt_in', sa.Boolean(), nullable=False, server_default='false'))
+    op.create_table('job_checkpoints',
+    sa.Column('job_name', sa.String(length=100), nullable=False),
+    sa.Column('last_key', sa.String(length=64), nullable=True),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('queued', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('job_name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_checkpoints')
+    op.drop_column('users', 'weekly_digest_opt_in')
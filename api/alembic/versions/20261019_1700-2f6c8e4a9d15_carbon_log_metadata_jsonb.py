@@ -0,0 +1,52 @@
+"""carbon_log_metadata_jsonb
+
+Revision ID: 2f6c8e4a9d15
+Revises: 7b3e9d1f4a28
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f6c8e4a9d15'
+down_revision: Union[str, None] = '7b3e9d1f4a28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Numeric metadata keys analytics aggregate on (see LogMetadataService)
+NUMERIC_KEYS = ('distance_km', 'quantity_kg', 'amount')
+
+
+def upgrade() -> None:
+    # Rewrites the table (and locks it) once; JSONB is parsed on write instead of every read
+    op.alter_column('carbon_logs', 'meta_data',
+                    type_=postgresql.JSONB(astext_type=sa.Text()),
+                    existing_type=sa.JSON(),
+                    existing_nullable=True,
+                    postgresql_using='meta_data::jsonb')
+    op.create_index('ix_carbon_logs_meta_data', 'carbon_logs', ['meta_data'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'meta_data': 'jsonb_path_ops'})
+    # Non-numeric values index as NULL instead of failing the insert
+    for key in NUMERIC_KEYS:
+        op.create_index(f'ix_carbon_logs_meta_{key}', 'carbon_logs', [sa.text(
+            f"(CASE WHEN jsonb_typeof(meta_data -> '{key}') = 'number' "
+            f"THEN (meta_data ->> '{key}')::double precision END)"
+        )], unique=False)
+    op.create_index('ix_carbon_logs_meta_unit', 'carbon_logs', [sa.text("(meta_data ->> 'unit')")], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_carbon_logs_meta_unit', table_name='carbon_logs')
+    for key in reversed(NUMERIC_KEYS):
+        op.drop_index(f'ix_carbon_logs_meta_{key}', table_name='carbon_logs')
+    op.drop_index('ix_carbon_logs_meta_data', table_name='carbon_logs')
+    op.alter_column('carbon_logs', 'meta_data',
+                    type_=sa.JSON(),
+                    existing_type=postgresql.JSONB(astext_type=sa.Text()),
+                    existing_nullable=True,
+                    postgresql_using='meta_data::json')
@@ -0,0 +1,143 @@
+"""partition_carbon_logs
+
+Revision ID: d8a3f5c1e704
+Revises: 2f6c8e4a9d15
+Create Date: 2026-10-19 18:00:00.000000
+
+Converts carbon_logs to monthly range partitions on created_at
+(carbon_logs_pYYYYMM, plus carbon_logs_default for anything outside them).
+The table is copied while locked: run it in a maintenance window.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a3f5c1e704'
+down_revision: Union[str, None] = '2f6c8e4a9d15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months of empty partitions created ahead; the API and
+# maintain_log_partitions.py keep extending them (see LogPartitionService)
+MONTHS_AHEAD = 3
+
+# Numeric metadata keys analytics aggregate on (see LogMetadataService)
+NUMERIC_KEYS = ('distance_km', 'quantity_kg', 'amount')
+
+COLUMNS = 'id, user_id, category, activity, carbon_amount_kg, meta_data, created_at'
+
+# Creates the missing monthly partitions from first_month through last_month.
+# Rows that already landed in the default partition for a new month are moved
+# into it. The advisory lock keeps API workers starting together from racing.
+ENSURE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION carbon_logs_ensure_partitions(first_month date, last_month date)
+RETURNS integer LANGUAGE plpgsql AS $$
+DECLARE
+    month_start date := date_trunc('month', first_month)::date;
+    month_end date;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('carbon_logs_ensure_partitions'));
+    WHILE month_start <= last_month LOOP
+        month_end := (month_start + interval '1 month')::date;
+        partition_name := 'carbon_logs_p' || to_char(month_start, 'YYYYMM');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE carbon_logs INCLUDING DEFAULTS)', partition_name);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM carbon_logs_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                month_start, month_end, partition_name);
+            EXECUTE format('ALTER TABLE carbon_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                           partition_name, month_start, month_end);
+            created := created + 1;
+        END IF;
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END $$
+"""
+
+
+def create_indexes() -> None:
+    op.create_index(op.f('ix_carbon_logs_category'), 'carbon_logs', ['category'], unique=False)
+    op.create_index(op.f('ix_carbon_logs_created_at'), 'carbon_logs', ['created_at'], unique=False)
+    op.create_index(op.f('ix_carbon_logs_user_id'), 'carbon_logs', ['user_id'], unique=False)
+    op.create_index('ix_carbon_logs_meta_data', 'carbon_logs', ['meta_data'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'meta_data': 'jsonb_path_ops'})
+    for key in NUMERIC_KEYS:
+        op.create_index(f'ix_carbon_logs_meta_{key}', 'carbon_logs', [sa.text(
+            f"(CASE WHEN jsonb_typeof(meta_data -> '{key}') = 'number' "
+            f"THEN (meta_data ->> '{key}')::double precision END)"
+        )], unique=False)
+    op.create_index('ix_carbon_logs_meta_unit', 'carbon_logs', [sa.text("(meta_data ->> 'unit')")], unique=False)
+
+
+def upgrade() -> None:
+    op.execute('LOCK TABLE carbon_logs IN ACCESS EXCLUSIVE MODE')
+    op.rename_table('carbon_logs', 'carbon_logs_unpartitioned')
+    op.execute('ALTER TABLE carbon_logs_unpartitioned RENAME CONSTRAINT carbon_logs_pkey TO carbon_logs_unpartitioned_pkey')
+    op.execute('ALTER TABLE carbon_logs_unpartitioned RENAME CONSTRAINT carbon_logs_user_id_fkey TO carbon_logs_unpartitioned_user_id_fkey')
+
+    # The partition key has to be part of the primary key (ids stay unique: they are UUIDs)
+    op.execute("""
+        CREATE TABLE carbon_logs (
+            id UUID NOT NULL,
+            user_id UUID NOT NULL CONSTRAINT carbon_logs_user_id_fkey REFERENCES users (id),
+            category VARCHAR(50) NOT NULL,
+            activity VARCHAR(255) NOT NULL,
+            carbon_amount_kg FLOAT NOT NULL,
+            meta_data JSONB,
+            created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            CONSTRAINT carbon_logs_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute('CREATE TABLE carbon_logs_default PARTITION OF carbon_logs DEFAULT')
+    op.execute(ENSURE_PARTITIONS_FUNCTION)
+    op.execute(f"""
+        SELECT carbon_logs_ensure_partitions(
+            COALESCE((SELECT min(created_at) FROM carbon_logs_unpartitioned), now() AT TIME ZONE 'UTC')::date,
+            ((now() AT TIME ZONE 'UTC') + interval '{MONTHS_AHEAD} months')::date
+        )
+    """)
+
+    # Rows without a timestamp (never written by the API) are dated to the migration
+    op.execute(f"""
+        INSERT INTO carbon_logs ({COLUMNS})
+        SELECT id, user_id, category, activity, carbon_amount_kg, meta_data,
+               COALESCE(created_at, now() AT TIME ZONE 'UTC')
+        FROM carbon_logs_unpartitioned
+    """)
+    op.drop_table('carbon_logs_unpartitioned')
+
+    # Indexes on the parent cascade to every partition, current and future
+    create_indexes()
+    op.execute('ANALYZE carbon_logs')
+
+
+def downgrade() -> None:
+    # Partitions already moved out by the retention policy are left where they are
+    op.execute('LOCK TABLE carbon_logs IN ACCESS EXCLUSIVE MODE')
+    op.rename_table('carbon_logs', 'carbon_logs_partitioned')
+    op.execute('ALTER TABLE carbon_logs_partitioned RENAME CONSTRAINT carbon_logs_pkey TO carbon_logs_partitioned_pkey')
+    op.execute('ALTER TABLE carbon_logs_partitioned RENAME CONSTRAINT carbon_logs_user_id_fkey TO carbon_logs_partitioned_user_id_fkey')
+    op.execute("""
+        CREATE TABLE carbon_logs (
+            id UUID NOT NULL,
+            user_id UUID NOT NULL CONSTRAINT carbon_logs_user_id_fkey REFERENCES users (id),
+            category VARCHAR(50) NOT NULL,
+            activity VARCHAR(255) NOT NULL,
+            carbon_amount_kg FLOAT NOT NULL,
+            meta_data JSONB,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT carbon_logs_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute(f'INSERT INTO carbon_logs ({COLUMNS}) SELECT {COLUMNS} FROM carbon_logs_partitioned')
+    op.execute('DROP TABLE carbon_logs_partitioned CASCADE')
+    op.execute('DROP FUNCTION carbon_logs_ensure_partitions(date, date)')
+    create_indexes()
@@ -0,0 +1,26 @@
+"""add_email_outbox_headers
+
+Revision ID: b3e8f1a4c692
+Revises: 5a9d2c7e1b46
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8f1a4c692'
+down_revision: Union[str, None] = '5a9d2c7e1b46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('email_outbox', sa.Column('headers', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('email_outbox', 'headers')
@@ -2,20 +2,32 @@
 Authentication utilities and JWT handling
 """
 
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import uuid
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Set, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from app.config import settings
 from app.database import get_db
 from app.models import User
+from app.services.token_revocation import revocation_list
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+)
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
@@ -31,6 +43,89 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated bounded thread pool so hashing never blocks
+    the event loop. When too many hashes are pending, new ones are rejected
+    with 429 instead of queueing without limit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    thread_name_prefix="password-hash",
+                )
+            return self._executor
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    @staticmethod
+    def _busy() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many authentication requests. Please try again shortly.",
+            headers={"Retry-After": "1"},
+        )
+
+    def ensure_capacity(self) -> None:
+        """Reject early (before any DB work) when the pool is already full"""
+        with self._lock:
+            if self._pending >= settings.PASSWORD_HASH_MAX_PENDING:
+                raise self._busy()
+
+    async def run(self, func: Callable, *args):
+        """Run a hashing function in the pool"""
+        with self._lock:
+            if self._pending >= settings.PASSWORD_HASH_MAX_PENDING:
+                raise self._busy()
+            self._pending += 1
+
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return await future
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher()
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password without blocking the event loop"""
+    return await password_hasher.run(pwd_context.hash, password)
+
+
+async def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str,
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password without blocking the event loop
+
+    Returns:
+        (valid, new_hash) - new_hash is set when the stored hash uses an
+        outdated work factor and should be replaced
+    """
+    return await password_hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token"""
     to_encode = data.copy()
@@ -44,16 +139,155 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def decode_access_token(token: str) -> Optional[str]:
-    """Decode JWT token and return user email"""
+def create_user_access_token(user: User, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Create a short-lived access token for a user
+    Carries the primary key and the active/admin flags so requests can be
+    authorized without loading the user row while revocations are shared
+    between workers
+    """
+    return create_access_token(
+        data={
+            "sub": user.email,
+            "uid": str(user.id),
+            "act": bool(user.is_active),
+            "adm": bool(user.is_admin),
+            "typ": "access",
+            "iat": time.time(),
+        },
+        expires_delta=expires_delta,
+    )
+
+
+def create_refresh_token(user: User) -> str:
+    """Create a long-lived, single-use refresh token (only accepted by /auth/refresh)"""
+    return create_access_token(
+        data={
+            "sub": user.email,
+            "uid": str(user.id),
+            "typ": "refresh",
+            "jti": uuid.uuid4().hex,  # Recorded when used, so it can't be used twice
+            "iat": time.time(),
+        },
+        expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+
+
+def decode_token_claims(token: str, token_type: str = "access") -> Optional[Dict[str, Any]]:
+    """Decode JWT token and return its claims (None if invalid or of another type)"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
     except JWTError:
         return None
+    if payload.get("sub") is None and payload.get("uid") is None:
+        return None
+    # Tokens issued before token types were added are access tokens
+    if payload.get("typ", "access") != token_type:
+        return None
+    return payload
+
+
+def _user_id(value: str):
+    """Primary key value in the form the UUID column expects"""
+    if settings.DATABASE_URL.startswith("sqlite"):
+        return value
+    return uuid.UUID(value)
+
+
+def decode_access_token(token: str) -> Optional[str]:
+    """Decode JWT token and return user email"""
+    claims = decode_token_claims(token)
+    return claims.get("sub") if claims else None
+
+
+class AuthUserCache:
+    """
+    Short-lived in-process cache of token -> user row
+    Lets authenticated requests skip the JWT decode and the users lookup.
+    Entries are dropped when the user changes in this process; other
+    worker processes pick changes up within AUTH_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, str, Optional[float], Dict[str, Any]]]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._columns = [attr.key for attr in inspect(User).column_attrs]
+
+    def get(self, token: str) -> Optional[Tuple[Dict[str, Any], Optional[float]]]:
+        """Cached (column values, token issued-at) for a token's user, if fresh"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, user_id, issued_at, values = entry
+            if time.monotonic() >= expires_at:
+                self._drop(token, user_id)
+                return None
+            return values, issued_at
+
+    def put(
+        self,
+        token: str,
+        values: Dict[str, Any],
+        token_exp: Optional[float] = None,
+        issued_at: Optional[float] = None,
+    ) -> None:
+        """Cache a resolved user (never beyond the token's own expiry)"""
+        ttl = settings.AUTH_CACHE_TTL_SECONDS
+        if ttl <= 0:
+            return
+        if token_exp is not None:
+            ttl = min(ttl, token_exp - time.time())
+            if ttl <= 0:
+                return
+
+        user_id = str(values["id"])
+        with self._lock:
+            self._entries[token] = (time.monotonic() + ttl, user_id, issued_at, values)
+            self._tokens_by_user.setdefault(user_id, set()).add(token)
+            while len(self._entries) > settings.AUTH_CACHE_MAX_ENTRIES:
+                old_token, (_, old_user_id, _, _) = self._entries.popitem(last=False)
+                self._forget(old_token, old_user_id)
+
+    def _forget(self, token: str, user_id: str) -> None:
+        tokens = self._tokens_by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user_id]
+
+    def _drop(self, token: str, user_id: str) -> None:
+        self._entries.pop(token, None)
+        self._forget(token, user_id)
+
+    def invalidate_user(self, user_id) -> None:
+        """Drop every cached token for a user (call after the user row changes)"""
+        with self._lock:
+            for token in self._tokens_by_user.pop(str(user_id), ()):
+                self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def row_values(self, user: User) -> Dict[str, Any]:
+        """Column values of a loaded user, for caching"""
+        return {key: getattr(user, key) for key in self._columns}
+
+    @staticmethod
+    def attach(db: Session, values: Dict[str, Any]) -> User:
+        """
+        Attach a cached user row to the request's session without a query
+        Columns missing from values are loaded by primary key on first access
+        """
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+
+auth_cache = AuthUserCache()
 
 
 async def get_current_user(
@@ -67,15 +301,46 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    email = decode_access_token(token)
-    if email is None:
+    cached = auth_cache.get(token)
+    if cached is not None:
+        values, issued_at = cached
+        if revocation_list.is_revoked(values["id"], issued_at):
+            raise credentials_exception
+        return auth_cache.attach(db, values)
+    
+    claims = decode_token_claims(token)
+    if claims is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    uid = claims.get("uid")
+    if uid and revocation_list.is_revoked(uid, claims.get("iat")):
         raise credentials_exception
     
-    return user
+    if uid and "act" in claims and revocation_list.is_shared():
+        # Claims token: authorize from the claims alone. Other columns are
+        # loaded by primary key only if the endpoint reads them.
+        values = {
+            "id": _user_id(uid),
+            "email": claims.get("sub"),
+            "is_active": bool(claims["act"]),
+            "is_admin": bool(claims.get("adm")),
+        }
+    else:
+        # Tokens issued before claims were added need the user row, and so
+        # does any token while revocations aren't shared: a user deactivated
+        # or demoted on another worker (or before a restart) keeps valid claims
+        if uid:
+            user = db.query(User).filter(User.id == uid).first()
+        else:
+            user = db.query(User).filter(User.email == claims["sub"]).first()
+        if user is None:
+            raise credentials_exception
+        values = auth_cache.row_values(user)
+        auth_cache.put(token, values, claims.get("exp"), claims.get("iat"))
+        return user
+    
+    auth_cache.put(token, values, claims.get("exp"), claims.get("iat"))
+    return auth_cache.attach(db, values)
 
 
 async def get_current_active_user(
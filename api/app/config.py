@@ -27,10 +27,80 @@ class Settings(BaseSettings):
     # SQLite: sqlite:///./carbon_tracker.db (for local development)
     DATABASE_URL: str = "sqlite:///./carbon_tracker.db"
     
+    # Optional read replica for read-only endpoints (reports, stats, leaderboards,
+    # admin analytics). After a write a user reads from the primary for
+    # READ_YOUR_WRITES_SECONDS, so replication lag never hides their own changes.
+    # "auto" shares these pins through Redis when reachable so all workers see them.
+    DATABASE_READ_URL: str = ""
+    DATABASE_READ_POOL_SIZE: int = 10
+    DATABASE_READ_MAX_OVERFLOW: int = 20
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    READ_YOUR_WRITES_BACKEND: str = "auto"
+    READ_YOUR_WRITES_REDIS_PREFIX: str = "readpin"
+    
+    # SQLite tuning, applied to every new connection (ignored for PostgreSQL).
+    # WAL lets readers run alongside the writer; NORMAL sync skips the fsync per
+    # commit (still safe against corruption, the last commits may be lost on power loss).
+    SQLITE_PRAGMAS_ENABLED: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 268435456  # Bytes of the file to memory-map (256 MB)
+    SQLITE_CACHE_SIZE: int = -65536  # Page cache; negative values are KiB (64 MB)
+    SQLITE_TEMP_STORE: str = "MEMORY"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # Wait this long for a lock instead of failing
+    
+    # Group commit: carbon log / CFC report writes go through one writer thread
+    # that commits everything queued within the window together (mainly for SQLite)
+    WRITE_QUEUE_ENABLED: bool = False
+    WRITE_QUEUE_WINDOW_MS: float = 5.0
+    WRITE_QUEUE_MAX_BATCH: int = 64
+    
+    # Monthly carbon_logs partitions (PostgreSQL, see maintain_log_partitions.py),
+    # kept created this many months ahead. Retention retires months older than
+    # CARBON_LOG_RETENTION_MONTHS (0 keeps everything): "archive" detaches them into
+    # CARBON_LOG_ARCHIVE_SCHEMA, "drop" deletes them. Retired months no longer count
+    # in reports, impact or stats recomputes (points already awarded stay).
+    CARBON_LOG_PARTITION_MONTHS_AHEAD: int = 3
+    CARBON_LOG_RETENTION_MONTHS: int = 0
+    CARBON_LOG_RETENTION_ACTION: str = "archive"
+    CARBON_LOG_ARCHIVE_SCHEMA: str = "carbon_logs_archive"
+    
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
+    # Access tokens carry active/admin claims (admin changes revoke them). Keep the
+    # 7 day default until the web client renews through /auth/refresh, then shorten it.
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7  # Refresh tokens are single-use: each refresh issues a new one
+    AUTH_CACHE_TTL_SECONDS: int = 30  # How long a resolved token -> user is reused (0 disables)
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Access token revocations (admin changes to a user invalidate their tokens).
+    # "auto" shares them through Redis when reachable.
+    REVOCATION_BACKEND: str = "auto"
+    REVOCATION_REDIS_KEY: str = "auth:revocations"
+    REVOCATION_SYNC_SECONDS: int = 5
+    
+    # Password hashing: bcrypt work factor and the thread pool it runs in.
+    # Stored hashes with a different work factor are re-hashed on next login.
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32  # Running + queued hashes before rejecting with 429
+    
+    # Login/registration throttling (token buckets: burst size + refill per minute).
+    # "auto" keeps buckets in Redis when reachable so all workers share them.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "auto"
+    RATE_LIMIT_REDIS_PREFIX: str = "ratelimit"
+    TRUST_FORWARDED_FOR: bool = False  # Use X-Forwarded-For for the client IP (behind a proxy)
+    LOGIN_RATE_LIMIT_IP_BURST: int = 20
+    LOGIN_RATE_LIMIT_IP_PER_MINUTE: float = 10
+    LOGIN_RATE_LIMIT_EMAIL_BURST: int = 5
+    LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE: float = 2
+    REGISTER_RATE_LIMIT_IP_BURST: int = 5
+    REGISTER_RATE_LIMIT_IP_PER_MINUTE: float = 1
+    REFRESH_RATE_LIMIT_IP_BURST: int = 30
+    REFRESH_RATE_LIMIT_IP_PER_MINUTE: float = 10
     
     # ML Service
     ML_SERVICE_URL: str = "http://localhost:8001"
@@ -38,6 +108,20 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     
+    # Leaderboard: "auto" uses Redis when reachable, "local" forces the in-process structure
+    LEADERBOARD_BACKEND: str = "auto"
+    LEADERBOARD_REDIS_KEY: str = "leaderboard:points"
+    LEADERBOARD_REFRESH_SECONDS: int = 300  # Resync interval for the in-process structure
+    
+    # Badge engine: reload interval for the cached badge thresholds
+    BADGE_THRESHOLDS_REFRESH_SECONDS: int = 300
+    
+    # Challenge engine: rebuild interval for the active-challenge index
+    CHALLENGE_INDEX_REFRESH_SECONDS: int = 300
+    
+    # Friends leaderboard: max age of a cached per-user result
+    FRIENDS_LEADERBOARD_CACHE_SECONDS: int = 300
+    
     # AWS / S3
     AWS_ACCESS_KEY_ID: str = ""
     AWS_SECRET_ACCESS_KEY: str = ""
@@ -59,16 +143,49 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str = ""
     SMTP_FROM_EMAIL: str = "noreply@carbontracker.com"
     SMTP_FROM_NAME: str = "MyCarbonFootprint"
+    SMTP_USE_TLS: bool = False  # Implicit TLS (usually port 465)
+    SMTP_STARTTLS: bool = True  # Upgrade plain connections with STARTTLS
+    SMTP_TIMEOUT_SECONDS: float = 30.0
+    # Persistent SMTP connections: pool size, max idle time before reconnecting,
+    # and how many messages are pipelined per connection at a time
+    SMTP_POOL_SIZE: int = 2
+    SMTP_IDLE_SECONDS: int = 60
+    SMTP_PIPELINE_BATCH: int = 20
     
     # Alternative: Resend API (https://resend.com)
     RESEND_API_KEY: str = Field(default="", description="Resend API key for email sending")
+    RESEND_API_URL: str = "https://api.resend.com/emails"
+    
+    # Email outbox: emails are queued in the database and sent by a background worker.
+    # Failed sends are retried with exponential backoff, then marked dead.
+    EMAIL_OUTBOX_ENABLED: bool = True  # Run the sender in this process
+    EMAIL_OUTBOX_BATCH_SIZE: int = 20
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5.0
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = 8
+    EMAIL_OUTBOX_BACKOFF_SECONDS: float = 30.0  # First retry delay, doubled per attempt
+    EMAIL_OUTBOX_MAX_BACKOFF_SECONDS: float = 3600.0
+    EMAIL_OUTBOX_CLAIM_TIMEOUT_SECONDS: int = 300  # A claimed email not finished by then is retried
+    EMAIL_OUTBOX_MAX_CONNECTIONS: int = 10  # Pooled HTTP connections to the email API
+    
+    # Weekly digest emails (see send_weekly_digest.py). Digest emails are
+    # scheduled into the outbox at most this many per minute.
+    WEEKLY_DIGEST_CHUNK_SIZE: int = 1000
+    WEEKLY_DIGEST_EMAILS_PER_MINUTE: int = 1000
     
     # Frontend URL for email links
     FRONTEND_URL: str = "http://localhost:3000"
     
+    # Public URL of this API, for links that must reach it directly (one-click unsubscribe)
+    API_URL: str = "http://localhost:8000"
+    
     # Email verification token expiry (hours)
     VERIFICATION_TOKEN_EXPIRE_HOURS: int = 24
     
+    # Precomputed recommendations (see precompute_recommendations.py)
+    RECOMMENDATIONS_MAX_AGE_HOURS: int = 24
+    RECOMMENDATIONS_ACTIVE_DAYS: int = 30
+    RECOMMENDATIONS_SHARD_SIZE: int = 500
+    
     @model_validator(mode='after')
     def parse_cors_origins(self):
         """Parse CORS_ORIGINS after initialization"""
@@ -2,34 +2,108 @@
 Database connection and session management
 """
 
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from typing import Any, Dict
+
+from fastapi import Depends, Request
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.config import settings
 
-# Create database engine
-# For SQLite, use check_same_thread=False and don't use connection pooling
-if settings.DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        settings.DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        pool_pre_ping=True,
-    )
-else:
-    engine = create_engine(
-        settings.DATABASE_URL,
+
+def sqlite_pragmas() -> Dict[str, Any]:
+    """
+    Connection pragmas from the SQLite tuning settings
+    Empty when SQLITE_PRAGMAS_ENABLED is off.
+    """
+    if not settings.SQLITE_PRAGMAS_ENABLED:
+        return {}
+    pragmas = {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE.upper(),
+        "synchronous": settings.SQLITE_SYNCHRONOUS.upper(),
+        "temp_store": settings.SQLITE_TEMP_STORE.upper(),
+        "mmap_size": int(settings.SQLITE_MMAP_SIZE),
+        "cache_size": int(settings.SQLITE_CACHE_SIZE),
+        "busy_timeout": int(settings.SQLITE_BUSY_TIMEOUT_MS),
+    }
+    allowed = {
+        "journal_mode": {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"},
+        "synchronous": {"OFF", "NORMAL", "FULL", "EXTRA"},
+        "temp_store": {"DEFAULT", "FILE", "MEMORY"},
+    }
+    for name, values in allowed.items():
+        if pragmas[name] not in values:
+            raise ValueError(f"Invalid SQLite {name}: {pragmas[name]} (expected one of {sorted(values)})")
+    return pragmas
+
+
+def install_sqlite_pragmas(target_engine, pragmas: Dict[str, Any]) -> None:
+    """Run the given PRAGMA statements on every new connection of an SQLite engine"""
+    if not pragmas:
+        return
+
+    @event.listens_for(target_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def _create_engine(url: str, pool_size: int = 10, max_overflow: int = 20):
+    """Engine for a database URL (SQLite gets check_same_thread=False and the tuning pragmas)"""
+    if url.startswith("sqlite"):
+        sqlite_engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            pool_pre_ping=True,
+        )
+        install_sqlite_pragmas(sqlite_engine, sqlite_pragmas())
+        return sqlite_engine
+    return create_engine(
+        url,
         pool_pre_ping=True,
-        pool_size=10,
-        max_overflow=20,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
     )
 
+
+# Create database engine
+engine = _create_engine(settings.DATABASE_URL)
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Read replica (None when DATABASE_READ_URL is not set: reads use the primary)
+read_engine = None
+ReadSessionLocal = None
+if settings.DATABASE_READ_URL:
+    read_engine = _create_engine(
+        settings.DATABASE_READ_URL,
+        pool_size=settings.DATABASE_READ_POOL_SIZE,
+        max_overflow=settings.DATABASE_READ_MAX_OVERFLOW,
+    )
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 # Base class for models
 Base = declarative_base()
 
 
+def dialect_insert(db):
+    """
+    Get the dialect-specific insert() for the session's database
+    Both PostgreSQL and SQLite versions support ON CONFLICT clauses
+    """
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
 def get_db():
     """
     Dependency to get database session
@@ -40,3 +114,35 @@ def get_db():
     finally:
         db.close()
 
+
+@contextmanager
+def primary_session(db: Session):
+    """
+    The given session if it is on the primary, otherwise a new primary session
+    For data cached and served to every user (e.g. the leaderboard): it must
+    not be filled from a lagging replica.
+    """
+    if db.bind is engine:
+        yield db
+        return
+    primary = SessionLocal()
+    try:
+        yield primary
+    finally:
+        primary.close()
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """
+    Dependency to get a database session for read-only endpoints
+    Uses the read replica when one is configured, unless the current user
+    wrote something within READ_YOUR_WRITES_SECONDS (see ReadYourWritesMiddleware)
+    """
+    if ReadSessionLocal is None or getattr(request.state, "read_from_primary", False):
+        yield db
+        return
+    read_db = ReadSessionLocal()
+    try:
+        yield read_db
+    finally:
+        read_db.close()
@@ -2,8 +2,9 @@
 SQLAlchemy models for Carbon Tracker
 """
 
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, ForeignKey, JSON, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Integer, Float, Boolean, Date, DateTime, ForeignKey, JSON, Text, Index, LargeBinary, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -12,11 +13,40 @@ import os
 from app.database import Base
 from app.config import settings
 
-# Use String for SQLite, UUID for PostgreSQL
-if settings.DATABASE_URL.startswith("sqlite"):
-    UUIDType = String(36)  # UUID as string for SQLite
-else:
-    UUIDType = UUID(as_uuid=True)
+class CompactUUID(TypeDecorator):
+    """
+    UUID stored as a 16-byte BLOB on SQLite and as native uuid on PostgreSQL
+    Python values are unchanged: str on SQLite, uuid.UUID on PostgreSQL.
+    Strings that are not UUIDs are bound as their raw bytes, so they match nothing.
+    """
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        if not isinstance(value, uuid.UUID):
+            try:
+                value = uuid.UUID(str(value))
+            except ValueError:
+                return value if dialect.name == "postgresql" else str(value).encode()
+        return value if dialect.name == "postgresql" else value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        if isinstance(value, str):
+            return value  # Row not yet converted by migrate_compact_uuids.py
+        return str(uuid.UUID(bytes=bytes(value)))
+
+
+UUIDType = CompactUUID()
 
 
 class User(Base):
@@ -44,6 +74,9 @@ class User(Base):
     verification_token = Column(String(255), nullable=True, index=True)
     verification_token_expires = Column(DateTime, nullable=True)
     
+    # Email preferences
+    weekly_digest_opt_in = Column(Boolean, default=False, nullable=False)
+    
     # Relationships
     carbon_logs = relationship("CarbonLog", back_populates="user")
     badges = relationship("UserBadge", back_populates="user")
@@ -58,11 +91,29 @@ class CarbonLog(Base):
     category = Column(String(50), nullable=False, index=True)  # transport, diet, energy, etc.
     activity = Column(String(255), nullable=False)
     carbon_amount_kg = Column(Float, nullable=False)
-    meta_data = Column(JSON, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    meta_data = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)  # Queried via LogMetadataService
+    # Partition key on PostgreSQL: monthly partitions, primary key (id, created_at)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     
     # Relationships
     user = relationship("User", back_populates="carbon_logs")
+    
+    __table_args__ = (
+        # PostgreSQL (JSONB) only: containment queries, and the metadata keys
+        # analytics filter and aggregate on (same expressions as LogMetadataService)
+        Index(
+            "ix_carbon_logs_meta_data", "meta_data",
+            postgresql_using="gin", postgresql_ops={"meta_data": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
+        *[
+            Index(
+                f"ix_carbon_logs_meta_{key}",
+                text(f"(CASE WHEN jsonb_typeof(meta_data -> '{key}') = 'number' THEN (meta_data ->> '{key}')::double precision END)"),
+            ).ddl_if(dialect="postgresql")
+            for key in ("distance_km", "quantity_kg", "amount")
+        ],
+        Index("ix_carbon_logs_meta_unit", text("(meta_data ->> 'unit')")).ddl_if(dialect="postgresql"),
+    )
 
 
 class Badge(Base):
@@ -96,12 +147,16 @@ class Challenge(Base):
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
     target_value = Column(Float, nullable=False)
-    current_unit = Column(String(50), nullable=False)
+    current_unit = Column(String(50), nullable=False)  # kg, logs, days, km, points
     reward_points = Column(Integer, default=0)
     badge_reward = Column(UUIDType, ForeignKey("badges.id"), nullable=True)
     expires_at = Column(DateTime, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Which logs count towards the challenge (None = any)
+    category = Column(String(50), nullable=True, index=True)
+    activity = Column(String(255), nullable=True)
 
 
 class RecyclingPoint(Base):
@@ -135,3 +190,125 @@ class CFCReport(Base):
     # Relationships
     user = relationship("User", back_populates="cfc_reports")
 
+
+
+class RecommendationSnapshot(Base):
+    __tablename__ = "recommendation_snapshots"
+    
+    user_id = Column(UUIDType, ForeignKey("users.id"), primary_key=True)
+    days = Column(Integer, primary_key=True)  # Look-back window the data was computed for
+    data = Column(JSON, nullable=False)
+    data_version = Column(String(100), nullable=False)  # Stamp of the logs the data was built from
+    computed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class PointsLedger(Base):
+    __tablename__ = "points_ledger"
+    
+    id = Column(UUIDType, primary_key=True, default=lambda: str(uuid.uuid4()) if settings.DATABASE_URL.startswith("sqlite") else uuid.uuid4())
+    user_id = Column(UUIDType, ForeignKey("users.id"), nullable=False, index=True)
+    delta = Column(Integer, nullable=False)
+    reason = Column(String(50), nullable=False)  # carbon_log, log_deleted, admin_adjustment, ...
+    log_id = Column(UUIDType, nullable=True, index=True)  # No FK - entries outlive deleted logs
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class PointsPeriodTotal(Base):
+    __tablename__ = "points_period_totals"
+    
+    period_type = Column(String(10), primary_key=True)  # week / month
+    period_start = Column(Date, primary_key=True)
+    user_id = Column(UUIDType, ForeignKey("users.id"), primary_key=True)
+    points = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index("ix_points_period_totals_ranking", "period_type", "period_start", "points"),
+    )
+
+
+class UserChallengeProgress(Base):
+    __tablename__ = "user_challenge_progress"
+    
+    user_id = Column(UUIDType, ForeignKey("users.id"), primary_key=True)
+    challenge_id = Column(UUIDType, ForeignKey("challenges.id"), primary_key=True)
+    progress = Column(Float, nullable=False, default=0)
+    last_counted_date = Column(Date, nullable=True)  # For "days" challenges
+    completed_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class UserActivityDays(Base):
+    __tablename__ = "user_activity_days"
+    
+    user_id = Column(UUIDType, ForeignKey("users.id"), primary_key=True)
+    start_date = Column(Date, nullable=False)  # Day represented by bit 0
+    day_bits = Column(LargeBinary, nullable=False)  # One bit per day since start_date, little-endian
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class UserFollow(Base):
+    __tablename__ = "user_follows"
+    
+    follower_id = Column(UUIDType, ForeignKey("users.id"), primary_key=True)
+    followee_id = Column(UUIDType, ForeignKey("users.id"), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Primary key serves "who do I follow"; this serves "who follows me"
+        Index("ix_user_follows_followee_id", "followee_id", "follower_id"),
+    )
+
+
+class EcoScoreHistory(Base):
+    __tablename__ = "eco_score_history"
+    
+    user_id = Column(UUIDType, ForeignKey("users.id"), primary_key=True)
+    snapshot_date = Column(Date, primary_key=True)
+    eco_score = Column(Float, nullable=False)
+    total_points = Column(Integer, nullable=False, default=0)
+    level = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    
+    id = Column(UUIDType, primary_key=True, default=lambda: str(uuid.uuid4()) if settings.DATABASE_URL.startswith("sqlite") else uuid.uuid4())
+    kind = Column(String(50), nullable=False)  # verification, ...
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    html_body = Column(Text, nullable=False)
+    text_body = Column(Text, nullable=False)
+    headers = Column(JSON, nullable=True)  # Extra message headers, e.g. List-Unsubscribe
+    status = Column(String(20), nullable=False, default="pending")  # pending / sending / sent / dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # Claim deadline while sending
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        # The sender polls for due rows: status IN (pending, sending) AND next_attempt_at <= now
+        Index("ix_email_outbox_due", "status", "next_attempt_at"),
+    )
+
+
+class UsedRefreshToken(Base):
+    __tablename__ = "used_refresh_tokens"
+    
+    jti = Column(String(32), primary_key=True)  # Token id claim
+    user_id = Column(UUIDType, ForeignKey("users.id"), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # Row can go once the token has expired
+    used_at = Column(DateTime, default=datetime.utcnow)
+
+
+class JobCheckpoint(Base):
+    __tablename__ = "job_checkpoints"
+    
+    job_name = Column(String(100), primary_key=True)  # e.g. weekly_digest:2026-10-12
+    last_key = Column(String(64), nullable=True)  # Keyset cursor: last processed id
+    processed = Column(Integer, nullable=False, default=0)
+    queued = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
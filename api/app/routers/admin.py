@@ -2,15 +2,26 @@
 Admin panel endpoints for managing the Carbon Tracker platform
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from app.database import get_db
-from app.models import User, CarbonLog, Badge, UserBadge, Challenge, RecyclingPoint, CFCReport
-from app.auth import get_current_admin
+from app.database import get_db, get_read_db
+from app.models import User, CarbonLog, Badge, UserBadge, Challenge, RecyclingPoint, CFCReport, UserChallengeProgress
+from app.auth import get_current_admin, auth_cache
+from app.services.leaderboard import leaderboard_service
+from app.services.points_ledger import PointsLedgerService
+from app.services.badge_engine import badge_engine
+from app.services.activity_days import ActivityDaysService
+from app.services.challenge_engine import challenge_engine
+from app.services.stats_recompute import stats_recompute
+from app.services.rate_limiter import rate_limiter
+from app.services.token_revocation import revocation_list
+from app.services.email_outbox import EmailOutboxService, email_outbox
+from app.services.write_queue import write_queue
+from app.services.log_metadata import LogMetadataService, NUMERIC_KEYS
 from pydantic import BaseModel, EmailStr
 
 router = APIRouter()
@@ -80,7 +91,7 @@ async def get_all_users(
     search: Optional[str] = None,
     is_admin: Optional[bool] = None,
     is_active: Optional[bool] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin: User = Depends(get_current_admin)
 ):
     """Get all users with filtering and pagination"""
@@ -143,12 +154,25 @@ async def update_user(
         raise HTTPException(status_code=400, detail="Cannot remove your own admin status")
     
     update_data = user_update.model_dump(exclude_unset=True)
+    
+    # Record manual point changes in the ledger
+    new_points = update_data.get("total_points")
+    if new_points is not None and new_points != user.total_points:
+        PointsLedgerService.record(
+            db, user.id, new_points - (user.total_points or 0), "admin_adjustment"
+        )
+        badge_engine.award_crossed(db, user.id, user.total_points or 0, new_points)
+    
     for field, value in update_data.items():
         setattr(user, field, value)
     
     user.updated_at = datetime.utcnow()
     db.commit()
+    # Outstanding access tokens carry the old active/admin claims
+    revocation_list.revoke_user(user.id)
+    auth_cache.invalidate_user(user.id)
     db.refresh(user)
+    leaderboard_service.update_user(user, db)
     return user
 
 
@@ -169,13 +193,16 @@ async def delete_user(
     
     user.is_active = False
     db.commit()
+    revocation_list.revoke_user(user.id)
+    auth_cache.invalidate_user(user.id)
+    leaderboard_service.remove_user(user.id, db)
     return {"message": "User deactivated successfully"}
 
 
 # Statistics
 @router.get("/stats", response_model=StatsResponse)
 async def get_admin_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin: User = Depends(get_current_admin)
 ):
     """Get platform statistics"""
@@ -223,7 +250,7 @@ async def get_all_carbon_logs(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     user_id: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin: User = Depends(get_current_admin)
 ):
     """Get all carbon logs"""
@@ -242,14 +269,56 @@ async def delete_carbon_log(
     db: Session = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
-    """Delete carbon log"""
+    """Delete carbon log and reverse the points it awarded"""
     log = db.query(CarbonLog).filter(CarbonLog.id == log_id).first()
     if not log:
         raise HTTPException(status_code=404, detail="Carbon log not found")
     
+    # Removes the points from the users' totals too (never below zero)
+    reversed_points = PointsLedgerService.reverse_log(db, log.id)
+    affected_users = db.query(User).filter(User.id.in_(list(reversed_points))).all() if reversed_points else []
+    
     db.delete(log)
+    db.flush()
+    if log.created_at:
+        ActivityDaysService.clear_day_if_empty(db, log.user_id, log.created_at.date())
     db.commit()
-    return {"message": "Carbon log deleted successfully"}
+    
+    for user in affected_users:
+        auth_cache.invalidate_user(user.id)
+        leaderboard_service.update_user(user, db)
+    
+    return {
+        "message": "Carbon log deleted successfully",
+        "points_reversed": sum(reversed_points.values()),
+    }
+
+
+@router.get("/analytics/activity-totals")
+async def get_activity_totals(
+    days: Optional[int] = Query(None, ge=1, le=3650),
+    db: Session = Depends(get_read_db),
+    admin: User = Depends(get_current_admin)
+):
+    """Get log counts, kg CO2 and metadata sums (km, kg, amount) per activity and unit"""
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    return LogMetadataService.activity_totals(db, since=since)
+
+
+@router.get("/analytics/metadata-leaders")
+async def get_metadata_leaders(
+    key: str = Query("distance_km"),
+    activity: Optional[List[str]] = Query(None),
+    days: Optional[int] = Query(None, ge=1, le=3650),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+    admin: User = Depends(get_current_admin)
+):
+    """Get users with the largest total of a metadata key (e.g. car km: activity=car&activity=car_small)"""
+    if key not in NUMERIC_KEYS:
+        raise HTTPException(status_code=400, detail=f"key must be one of: {', '.join(NUMERIC_KEYS)}")
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    return LogMetadataService.total_by_user(db, key, activities=activity, since=since, limit=limit)
 
 
 # Badges Management
@@ -284,6 +353,7 @@ async def create_badge(
     db.add(badge)
     db.commit()
     db.refresh(badge)
+    badge_engine.invalidate()
     return badge
 
 
@@ -316,6 +386,7 @@ async def update_badge(
     
     db.commit()
     db.refresh(badge)
+    badge_engine.invalidate()
     return badge
 
 
@@ -332,9 +403,93 @@ async def delete_badge(
     
     db.delete(badge)
     db.commit()
+    badge_engine.invalidate()
     return {"message": "Badge deleted successfully"}
 
 
+@router.post("/badges/backfill")
+async def backfill_badges(
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_current_admin)
+):
+    """Award all points badges users have already earned but not received"""
+    awarded = badge_engine.backfill(db)
+    return {"message": "Badge backfill completed", "badges_awarded": awarded}
+
+
+@router.get("/metrics/rate-limits")
+async def get_rate_limit_metrics(
+    admin: User = Depends(get_current_admin)
+):
+    """Get login/registration throttling hit counters (this worker)"""
+    return rate_limiter.metrics()
+
+
+@router.get("/metrics/write-queue")
+async def get_write_queue_metrics(
+    admin: User = Depends(get_current_admin)
+):
+    """Get group-commit write queue counters (this worker)"""
+    return write_queue.metrics()
+
+
+# Email outbox
+@router.get("/email-outbox")
+async def get_email_outbox(
+    status: str = Query("dead", description="pending, sending, sent or dead"),
+    limit: int = Query(50, ge=1, le=500),
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Get queued email counts and the emails with a given status"""
+    return {
+        "counts": EmailOutboxService.stats(db),
+        "emails": EmailOutboxService.list_emails(db, status, limit),
+    }
+
+
+@router.post("/email-outbox/{email_id}/retry")
+async def retry_email(
+    email_id: str,
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Re-queue a dead email"""
+    if not EmailOutboxService.retry(db, email_id):
+        raise HTTPException(status_code=404, detail="Dead email not found")
+    email_outbox.notify()
+    return {"message": "Email re-queued"}
+
+
+# Bulk stats recompute
+@router.post("/stats/recompute", status_code=202)
+async def recompute_user_stats(
+    background_tasks: BackgroundTasks,
+    dry_run: bool = Query(True, description="Only report what would change"),
+    chunk_size: int = Query(1000, ge=100, le=50000),
+    include_points: bool = Query(False, description="Also rebuild total_points from the points ledger"),
+    admin: User = Depends(get_current_admin)
+):
+    """Re-apply the current eco score and level rules to every user"""
+    job = stats_recompute.start(dry_run, chunk_size, include_points)
+    if job is None:
+        raise HTTPException(status_code=409, detail="A stats recompute is already running")
+    
+    background_tasks.add_task(stats_recompute.run)
+    return job
+
+
+@router.get("/stats/recompute")
+async def get_recompute_status(
+    admin: User = Depends(get_current_admin)
+):
+    """Get progress of the current or last stats recompute"""
+    job = stats_recompute.status()
+    if job is None:
+        raise HTTPException(status_code=404, detail="No stats recompute has been run")
+    return job
+
+
 # Challenges Management
 @router.get("/challenges")
 async def get_all_challenges(
@@ -356,6 +511,8 @@ async def create_challenge(
     badge_reward: Optional[str] = None,
     expires_at: Optional[datetime] = None,
     is_active: bool = True,
+    category: Optional[str] = None,
+    activity: Optional[str] = None,
     db: Session = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
@@ -368,11 +525,14 @@ async def create_challenge(
         reward_points=reward_points,
         badge_reward=badge_reward,
         expires_at=expires_at,
-        is_active=is_active
+        is_active=is_active,
+        category=category,
+        activity=activity
     )
     db.add(challenge)
     db.commit()
     db.refresh(challenge)
+    challenge_engine.invalidate()
     return challenge
 
 
@@ -387,6 +547,8 @@ async def update_challenge(
     badge_reward: Optional[str] = None,
     expires_at: Optional[datetime] = None,
     is_active: Optional[bool] = None,
+    category: Optional[str] = None,
+    activity: Optional[str] = None,
     db: Session = Depends(get_db),
     admin: User = Depends(get_current_admin)
 ):
@@ -411,9 +573,14 @@ async def update_challenge(
         challenge.expires_at = expires_at
     if is_active is not None:
         challenge.is_active = is_active
+    if category is not None:
+        challenge.category = category
+    if activity is not None:
+        challenge.activity = activity
     
     db.commit()
     db.refresh(challenge)
+    challenge_engine.invalidate()
     return challenge
 
 
@@ -428,8 +595,12 @@ async def delete_challenge(
     if not challenge:
         raise HTTPException(status_code=404, detail="Challenge not found")
     
+    db.query(UserChallengeProgress).filter(
+        UserChallengeProgress.challenge_id == challenge.id
+    ).delete(synchronize_session=False)
     db.delete(challenge)
     db.commit()
+    challenge_engine.invalidate()
     return {"message": "Challenge deleted successfully"}
 
 
@@ -543,7 +714,7 @@ async def get_all_cfc_reports(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     user_id: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     admin: User = Depends(get_current_admin)
 ):
     """Get all CFC reports"""
@@ -2,33 +2,62 @@
 Authentication endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta
 import secrets
 
-from app.database import get_db
-from app.models import User
+from app.database import dialect_insert, get_db
+from app.models import User, UsedRefreshToken
 from app.config import settings
 from app.auth import (
-    verify_password,
-    get_password_hash,
-    create_access_token,
+    hash_password,
+    verify_and_update_password,
+    password_hasher,
+    pwd_context,
+    create_user_access_token,
+    create_refresh_token,
+    decode_token_claims,
     get_current_user,
+    auth_cache,
 )
 from app.services.email_service import EmailService
+from app.services.email_outbox import email_outbox
+from app.services.leaderboard import leaderboard_service
+from app.services.rate_limiter import rate_limiter
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def _client_ip(request: Request) -> str | None:
+    """Client IP for throttling (first X-Forwarded-For hop when behind a trusted proxy)"""
+    if settings.TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+
+def _too_many_attempts(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many attempts. Please try again later.",
+        headers={"Retry-After": str(max(int(retry_after + 0.999), 1))},
+    )
+
+
 class UserCreate(BaseModel):
     email: EmailStr
     password: str
     name: str
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
 class UserResponse(BaseModel):
     id: str
     email: str
@@ -47,6 +76,7 @@ class UserResponse(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
     user: UserResponse
     verification_url: str | None = None  # For development when email not configured
     verification_token: str | None = None  # For development when email not configured
@@ -55,9 +85,14 @@ class Token(BaseModel):
 @router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
 async def register(
     user_data: UserCreate,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Register a new user"""
+    retry_after = rate_limiter.check_register(_client_ip(request))
+    if retry_after is not None:
+        raise _too_many_attempts(retry_after)
+    password_hasher.ensure_capacity()
     try:
         # Normalize email (lowercase and strip whitespace)
         email = user_data.email.strip().lower()
@@ -74,8 +109,9 @@ async def register(
         verification_token = secrets.token_urlsafe(32)
         verification_expires = datetime.utcnow() + timedelta(hours=settings.VERIFICATION_TOKEN_EXPIRE_HOURS)
         
-        # Create new user
-        hashed_password = get_password_hash(user_data.password)
+        # Create new user (release the DB connection while bcrypt runs)
+        db.close()
+        hashed_password = await hash_password(user_data.password)
         print(f"Registering user: {email}, password hash: {hashed_password[:30]}...")
         
         db_user = User(
@@ -91,37 +127,27 @@ async def register(
         )
         
         db.add(db_user)
+        
+        # Queue the verification email in the same transaction as the user
+        email_configured = EmailService.is_configured()
+        if email_configured:
+            email_outbox.enqueue_verification(db, email, user_data.name, verification_token)
+        
         db.commit()
         db.refresh(db_user)
+        email_outbox.notify()
         
         print(f"User registered successfully: {db_user.email}, ID: {db_user.id}")
-        
-        # Send verification email (async, don't wait for it)
-        try:
-            email_sent = await EmailService.send_verification_email(
-                to_email=email,
-                name=user_data.name,
-                verification_token=verification_token
-            )
-            if not email_sent:
-                # Email not configured - show verification link in response for development
-                print(f"📧 Email not configured. Verification token for {email}: {verification_token}")
-                print(f"🔗 Verification URL: {settings.FRONTEND_URL}/verify-email?token={verification_token}")
-        except Exception as email_error:
-            print(f"⚠️ Failed to send verification email: {email_error}")
-            print(f"🔗 Manual verification URL: {settings.FRONTEND_URL}/verify-email?token={verification_token}")
-            # Don't fail registration if email fails
+        leaderboard_service.update_user(db_user, db)
         
         # Create access token
-        access_token = create_access_token(data={"sub": db_user.email})
-        
-        # Check if email service is configured
-        email_configured = bool(settings.SMTP_HOST and settings.SMTP_USER) or bool(settings.RESEND_API_KEY)
+        access_token = create_user_access_token(db_user)
         
         # Build response
         token_response = Token(
             access_token=access_token,
             token_type="bearer",
+            refresh_token=create_refresh_token(db_user),
             user=UserResponse(
                 id=str(db_user.id),
                 email=db_user.email,
@@ -168,20 +194,30 @@ async def register(
 
 @router.post("/login", response_model=Token)
 async def login(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
     """Login user"""
+    # Throttle before any DB or bcrypt work
+    retry_after = rate_limiter.check_login(
+        _client_ip(request), form_data.username.strip().lower()
+    )
+    if retry_after is not None:
+        print(f"Login throttled for '{form_data.username.strip().lower()}'")
+        raise _too_many_attempts(retry_after)
+    password_hasher.ensure_capacity()
     try:
         # Find user by email (username field is used for email in OAuth2PasswordRequestForm)
         email = form_data.username.strip().lower()  # Normalize email
         user = db.query(User).filter(User.email == email).first()
         
         if not user:
-            # Debug: Check all users
-            all_users = db.query(User.email).all()
+            # Spend the same bcrypt time as a real check so response timing
+            # doesn't reveal which emails are registered
+            db.close()
+            await password_hasher.run(pwd_context.dummy_verify)
             print(f"Login attempt: User '{email}' not found")
-            print(f"Available users in database: {[u.email for u in all_users]}")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -200,8 +236,12 @@ async def login(
         if not user.email_verified:
             print(f"Login attempt: User '{email}' email not verified - access will be restricted")
         
-        # Verify password
-        password_valid = verify_password(form_data.password, user.hashed_password)
+        # Verify password - the session is closed first so a login burst
+        # can't hold every pooled DB connection while bcrypt runs
+        db.close()
+        password_valid, new_hash = await verify_and_update_password(
+            form_data.password, user.hashed_password
+        )
         if not password_valid:
             print(f"Login attempt: Invalid password for user '{email}'")
             print(f"Stored hash starts with: {user.hashed_password[:20]}...")
@@ -213,12 +253,21 @@ async def login(
         
         print(f"Login successful: User '{email}' logged in")
         
+        # Re-hash transparently when the bcrypt work factor has changed
+        if new_hash:
+            db.query(User).filter(User.id == user.id).update(
+                {User.hashed_password: new_hash}, synchronize_session=False
+            )
+            db.commit()
+            auth_cache.invalidate_user(user.id)
+        
         # Create access token
-        access_token = create_access_token(data={"sub": user.email})
+        access_token = create_user_access_token(user)
         
         return Token(
             access_token=access_token,
             token_type="bearer",
+            refresh_token=create_refresh_token(user),
             user=UserResponse(
                 id=str(user.id),
                 email=user.email,
@@ -243,6 +292,81 @@ async def login(
         )
 
 
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(
+    request: Request,
+    refresh_data: RefreshRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Exchange a refresh token for a new access token (claims re-read from the database)
+    Refresh tokens are single-use: the response carries a new one.
+    """
+    retry_after = rate_limiter.check_refresh(_client_ip(request))
+    if retry_after is not None:
+        raise _too_many_attempts(retry_after)
+    
+    claims = decode_token_claims(refresh_data.refresh_token, token_type="refresh")
+    if claims is None or not claims.get("uid") or not claims.get("jti"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    user = db.query(User).filter(User.id == claims["uid"]).first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive",
+        )
+    
+    # Record the token as used; a second use (replay of a leaked token) is rejected
+    now = datetime.utcnow()
+    used = db.execute(
+        dialect_insert(db)(UsedRefreshToken)
+        .values(
+            jti=claims["jti"],
+            user_id=user.id,
+            expires_at=datetime.utcfromtimestamp(claims["exp"]),
+            used_at=now,
+        )
+        .on_conflict_do_nothing()
+    )
+    db.query(UsedRefreshToken).filter(UsedRefreshToken.expires_at < now).delete(synchronize_session=False)
+    db.commit()
+    if used.rowcount == 0:
+        print(f"⚠️ Refresh token reused for user '{user.email}'")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return Token(
+        access_token=create_user_access_token(user),
+        token_type="bearer",
+        refresh_token=create_refresh_token(user),
+        user=UserResponse(
+            id=str(user.id),
+            email=user.email,
+            name=user.name,
+            eco_score=user.eco_score,
+            level=user.level,
+            total_points=user.total_points,
+            is_admin=user.is_admin,
+            is_active=user.is_active,
+            email_verified=user.email_verified,
+        )
+    )
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
     current_user: User = Depends(get_current_user)
@@ -290,6 +414,7 @@ async def verify_email(
     user.verification_token = None
     user.verification_token_expires = None
     db.commit()
+    auth_cache.invalidate_user(user.id)
     
     return {"message": "Email verified successfully", "verified": True}
 
@@ -312,20 +437,25 @@ async def resend_verification_email(
     
     current_user.verification_token = verification_token
     current_user.verification_token_expires = verification_expires
-    db.commit()
-    
-    # Send verification email
+    queued = False
     try:
-        await EmailService.send_verification_email(
-            to_email=current_user.email,
-            name=current_user.name,
-            verification_token=verification_token
-        )
-        return {"message": "Verification email sent successfully"}
+        if EmailService.is_configured():
+            email_outbox.enqueue_verification(db, current_user.email, current_user.name, verification_token)
+            queued = True
+        else:
+            print(f"📧 Email not configured - Verification URL: {settings.FRONTEND_URL}/verify-email?token={verification_token}")
+        db.commit()
     except Exception as e:
-        print(f"⚠️ Failed to send verification email: {e}")
+        db.rollback()
+        queued = False
+        print(f"⚠️ Failed to queue verification email: {e}")
+    auth_cache.invalidate_user(current_user.id)
+    
+    if not queued:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to send verification email. Please try again later."
         )
+    email_outbox.notify()
+    return {"message": "Verification email sent successfully"}
 
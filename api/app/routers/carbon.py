@@ -2,20 +2,29 @@
 Carbon tracking endpoints
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
+from html import escape
+from urllib.parse import urlencode
 from pydantic import BaseModel
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import CarbonLog, User
-from app.auth import get_current_active_user
+from app.auth import get_current_active_user, auth_cache
 from app.services.carbon_calculator import CarbonCalculator
 from app.services.gamification import GamificationService
 from app.services.suggestion_service import SuggestionService
 from app.services.report_service import ReportService
+from app.services.weekly_digest import WeeklyDigestService
 from app.services.impact_service import ImpactService
+from app.services.recommendation_cache import RecommendationCache
+from app.services.tip_search import TipSearchIndex
+from app.services.challenge_engine import challenge_engine
+from app.services.activity_days import ActivityDaysService
+from app.services.write_queue import write_queue
 
 router = APIRouter()
 calculator = CarbonCalculator()
@@ -23,6 +32,7 @@ gamification = GamificationService()
 suggestion_service = SuggestionService()
 report_service = ReportService()
 impact_service = ImpactService()
+tip_index = TipSearchIndex.from_catalogs()
 
 
 class CarbonLogCreate(BaseModel):
@@ -32,11 +42,15 @@ class CarbonLogCreate(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
+class WeeklyDigestPreference(BaseModel):
+    enabled: bool
+
+
 @router.get("/logs")
 async def get_carbon_logs(
     limit: int = 50,
     offset: int = 0,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
@@ -63,6 +77,32 @@ async def get_carbon_logs(
     }
 
 
+def _insert_carbon_log(db: Session, user: User, log_data: CarbonLogCreate, carbon_amount_kg: float) -> Dict[str, Any]:
+    """Insert a log with its points, challenge progress and stats. Does not commit."""
+    log = CarbonLog(
+        user_id=user.id,
+        category=log_data.category,
+        activity=log_data.activity,
+        carbon_amount_kg=carbon_amount_kg,
+        meta_data=log_data.metadata,
+    )
+    db.add(log)
+    db.flush()
+    
+    # Award points, challenge progress and stats - committed together with the log
+    points = gamification.award_points_for_log(carbon_amount_kg, log_data.category)
+    ActivityDaysService.mark_day(db, user.id, log.created_at.date())
+    challenges = challenge_engine.process_log(db, user, log, points)
+    stats, eco_score = gamification.apply_user_stats(user, points, db, log_id=log.id)
+    return {
+        "log": log,
+        "points": points,
+        "challenges": challenges,
+        "stats": stats,
+        "eco_score": eco_score,
+    }
+
+
 @router.post("/logs")
 async def create_carbon_log(
     log_data: CarbonLogCreate,
@@ -95,26 +135,24 @@ async def create_carbon_log(
             unit = log_data.metadata.get("unit", "item")
             carbon_amount_kg = calculator.calculate_lifestyle(log_data.activity, amount, unit)
     
-    log = CarbonLog(
-        user_id=current_user.id,
-        category=log_data.category,
-        activity=log_data.activity,
-        carbon_amount_kg=carbon_amount_kg,
-        meta_data=log_data.metadata,
-    )
-    db.add(log)
-    db.commit()
-    db.refresh(log)
-    
-    # Award points and update stats
-    points = gamification.award_points_for_log(carbon_amount_kg, log_data.category)
-    stats = gamification.update_user_stats(current_user, points, db)
+    user_id = current_user.id
+    if write_queue.enabled:
+        # Committed together with other requests' writes by the group-commit writer
+        created = await write_queue.run(
+            lambda write_db: _insert_carbon_log(write_db, current_user, log_data, carbon_amount_kg)
+        )
+    else:
+        created = _insert_carbon_log(db, current_user, log_data, carbon_amount_kg)
+        db.commit()
+        db.refresh(created["log"])
+    log, points, challenges, stats = created["log"], created["points"], created["challenges"], created["stats"]
+    gamification.publish_user_stats(db, user_id, stats["total_points"], created["eco_score"])
     
     # Generate suggestions for this log entry
     # Get user's recent logs for context
     cutoff_date = datetime.utcnow() - timedelta(days=30)
     recent_logs = db.query(CarbonLog).filter(
-        CarbonLog.user_id == current_user.id,
+        CarbonLog.user_id == log.user_id,
         CarbonLog.created_at >= cutoff_date
     ).all()
     
@@ -136,13 +174,14 @@ async def create_carbon_log(
         "data": log_dict,
         "points_awarded": points,
         "user_stats": stats,
+        "challenges": challenges,
         "suggestions": suggestions,
     }
 
 
 @router.get("/stats")
 async def get_carbon_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
@@ -202,7 +241,7 @@ async def get_carbon_stats(
 async def get_suggestions(
     limit: int = 5,
     days: int = 30,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
@@ -233,6 +272,27 @@ async def get_daily_tip():
     }
 
 
+@router.get("/tips/search")
+async def search_tips(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Search daily tips, suggestion actions and recycling tips
+    Every word must match (prefixes allow search-as-you-type)
+    """
+    results = tip_index.search(q, limit=limit)
+    
+    return {
+        "success": True,
+        "data": {
+            "query": q,
+            "results": results,
+            "total": len(results),
+        },
+    }
+
+
 @router.get("/recommendations")
 async def get_personalized_recommendations(
     days: int = 30,
@@ -242,8 +302,9 @@ async def get_personalized_recommendations(
     """
     Get personalized, actionable recommendations based on user's highest emission category
     Includes category-specific tips, quick wins, and savings calculator
+    Served from the nightly precomputed copy when it is still fresh
     """
-    recommendations = suggestion_service.get_personalized_recommendations(
+    recommendations = RecommendationCache.get_recommendations(
         current_user, db, days=days
     )
     
@@ -256,7 +317,7 @@ async def get_personalized_recommendations(
 @router.get("/reports/weekly")
 async def get_weekly_report(
     week_start: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
@@ -279,11 +340,85 @@ async def get_weekly_report(
     }
 
 
+@router.get("/reports/weekly/digest")
+async def get_weekly_digest_preference(
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Get whether the weekly digest email is turned on
+    """
+    return {
+        "success": True,
+        "data": {"enabled": bool(current_user.weekly_digest_opt_in)},
+    }
+
+
+@router.put("/reports/weekly/digest")
+async def set_weekly_digest_preference(
+    preference: WeeklyDigestPreference,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """
+    Turn the weekly digest email on or off
+    """
+    db.query(User).filter(User.id == current_user.id).update(
+        {"weekly_digest_opt_in": preference.enabled}, synchronize_session=False
+    )
+    db.commit()
+    auth_cache.invalidate_user(current_user.id)
+    
+    return {
+        "success": True,
+        "data": {"enabled": preference.enabled},
+    }
+
+
+UNSUBSCRIBE_PAGE = """<!DOCTYPE html>
+<html>
+<body style="font-family: Arial, sans-serif; text-align: center; padding: 40px; color: #333;">
+    <h2>🌱 MyCarbonFootprint weekly digest</h2>
+    {body}
+</body>
+</html>
+"""
+
+
+@router.get("/reports/weekly/digest/unsubscribe", response_class=HTMLResponse)
+async def confirm_weekly_digest_unsubscribe(user: str, token: str):
+    """
+    Unsubscribe link from a digest email: asks for confirmation
+    (link scanners open GET links, so only the POST unsubscribes)
+    """
+    action = escape(f"?{urlencode({'user': user, 'token': token})}")
+    return UNSUBSCRIBE_PAGE.format(body=f"""
+    <p>Stop receiving the weekly digest email?</p>
+    <form method="post" action="{action}">
+        <button type="submit" style="padding: 10px 24px; background: #10b981; color: white; border: none; border-radius: 5px;">Unsubscribe</button>
+    </form>""")
+
+
+@router.post("/reports/weekly/digest/unsubscribe", response_class=HTMLResponse)
+async def weekly_digest_unsubscribe(
+    user: str,
+    token: str,
+    db: Session = Depends(get_db),
+):
+    """
+    Turn the weekly digest off from a signed email link (also the RFC 8058
+    one-click target of the List-Unsubscribe header)
+    """
+    if not WeeklyDigestService.unsubscribe(db, user, token):
+        raise HTTPException(status_code=400, detail="Invalid unsubscribe link")
+    auth_cache.invalidate_user(user)
+    return UNSUBSCRIBE_PAGE.format(body="<p>You won't receive the weekly digest anymore.</p>")
+
+
 @router.get("/reports/monthly")
 async def get_monthly_report(
     month: Optional[int] = None,
     year: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
@@ -302,7 +437,7 @@ async def get_monthly_report(
 @router.get("/impact")
 async def get_carbon_impact(
     days: int = 30,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
@@ -338,7 +473,7 @@ async def get_equivalents(
 @router.get("/impact/community")
 async def get_community_impact(
     days: int = 30,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
@@ -4,14 +4,15 @@ CFC Emission Awareness & Reporting endpoints
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, List
 from pydantic import BaseModel
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models import CFCReport, User
 from app.auth import get_current_active_user
 from app.services.cfc_calculator import CFCCalculator
+from app.services.write_queue import write_queue
 
 router = APIRouter()
 
@@ -107,28 +108,36 @@ async def create_cfc_report(
             detail=f"Issue type must be one of: {', '.join(VALID_ISSUE_TYPES)}"
         )
     
-    report = CFCReport(
-        user_id=current_user.id,
-        device=report_data.device,
-        issue_type=report_data.issue_type,
-        notes=report_data.notes,
-        date=datetime.utcnow(),
-    )
+    user_id = current_user.id
     
-    db.add(report)
-    db.commit()
-    db.refresh(report)
+    def insert_report(write_db: Session) -> Dict[str, Any]:
+        report = CFCReport(
+            user_id=user_id,
+            device=report_data.device,
+            issue_type=report_data.issue_type,
+            notes=report_data.notes,
+            date=datetime.utcnow(),
+        )
+        write_db.add(report)
+        write_db.flush()
+        
+        # Serialize the report object to dict for proper JSON response
+        return {
+            "id": str(report.id),
+            "user_id": str(report.user_id),
+            "device": report.device,
+            "issue_type": report.issue_type,
+            "notes": report.notes,
+            "date": report.date.isoformat() if report.date else None,
+            "created_at": report.created_at.isoformat() if report.created_at else None,
+        }
     
-    # Serialize the report object to dict for proper JSON response
-    report_dict = {
-        "id": str(report.id),
-        "user_id": str(report.user_id),
-        "device": report.device,
-        "issue_type": report.issue_type,
-        "notes": report.notes,
-        "date": report.date.isoformat() if report.date else None,
-        "created_at": report.created_at.isoformat() if report.created_at else None,
-    }
+    if write_queue.enabled:
+        # Committed together with other requests' writes by the group-commit writer
+        report_dict = await write_queue.run(insert_report)
+    else:
+        report_dict = insert_report(db)
+        db.commit()
     
     return {
         "success": True,
@@ -227,7 +236,7 @@ async def get_device_defaults(device: str):
 
 @router.get("/my-reports")
 async def get_my_cfc_reports(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ):
     """
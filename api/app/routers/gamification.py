@@ -2,17 +2,25 @@
 Gamification endpoints (badges, leaderboard, challenges)
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
+from datetime import datetime
 
-from app.database import get_db
-from app.models import User, Badge, UserBadge
+from app.database import get_db, get_read_db
+from app.models import User, Badge, UserBadge, Challenge, UserChallengeProgress
+from app.auth import get_current_active_user
+from app.services.leaderboard import leaderboard_service
+from app.services.points_ledger import PointsLedgerService
+from app.services.activity_days import ActivityDaysService
+from app.services.friends_leaderboard import friends_leaderboard
+from app.services.eco_history import EcoScoreHistoryService
 
 router = APIRouter()
 
 
 @router.get("/badges")
-async def get_all_badges(db: Session = Depends(get_db)):
+async def get_all_badges(db: Session = Depends(get_read_db)):
     """Get all available badges"""
     badges = db.query(Badge).all()
     return {
@@ -21,31 +29,110 @@ async def get_all_badges(db: Session = Depends(get_db)):
     }
 
 
-@router.get("/leaderboard")
-async def get_leaderboard(
-    limit: int = 50,
-    db: Session = Depends(get_db),
+@router.get("/badges/me")
+async def get_my_badges(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
 ):
-    """Get leaderboard"""
-    users = (
-        db.query(User)
-        .order_by(User.total_points.desc(), User.eco_score.desc())
-        .limit(limit)
+    """Get badges earned by the current user"""
+    earned = (
+        db.query(Badge, UserBadge.earned_at)
+        .join(UserBadge, UserBadge.badge_id == Badge.id)
+        .filter(UserBadge.user_id == current_user.id)
+        .order_by(UserBadge.earned_at.desc())
         .all()
     )
     
-    leaderboard = [
-        {
-            "user_id": str(user.id),
-            "name": user.name,
-            "avatar_url": user.avatar_url,
-            "eco_score": user.eco_score,
-            "total_points": user.total_points,
-            "level": user.level,
-            "rank": idx + 1,
-        }
-        for idx, user in enumerate(users)
-    ]
+    return {
+        "success": True,
+        "data": [
+            {
+                "id": str(badge.id),
+                "name": badge.name,
+                "description": badge.description,
+                "icon": badge.icon,
+                "rarity": badge.rarity,
+                "points_required": badge.points_required,
+                "earned_at": earned_at.isoformat() if earned_at else None,
+            }
+            for badge, earned_at in earned
+        ],
+    }
+
+
+@router.get("/streaks")
+async def get_my_streaks(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get the current user's logging streaks and active-day counts"""
+    return {
+        "success": True,
+        "data": ActivityDaysService.get_streaks(db, current_user.id),
+    }
+
+
+@router.get("/eco-score/history")
+async def get_eco_score_history(
+    days: int = Query(90, ge=1, le=3650),
+    max_points: int = Query(90, ge=2, le=366),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get the current user's daily eco score, points and level (downsampled for long ranges)"""
+    return {
+        "success": True,
+        "data": EcoScoreHistoryService.get_series(
+            db, current_user.id, days=days, max_points=max_points
+        ),
+    }
+
+
+@router.get("/leaderboard")
+async def get_leaderboard(
+    limit: int = Query(50, ge=1, le=100),
+    period: str = Query("all", pattern="^(all|week|month)$"),
+    db: Session = Depends(get_read_db),
+):
+    """Get leaderboard (active users only) for all time, this week or this month"""
+    if period == "all":
+        leaderboard = leaderboard_service.top(db, limit=limit)
+    else:
+        leaderboard = PointsLedgerService.get_period_leaderboard(db, period, limit=limit)
+    
+    return {
+        "success": True,
+        "data": leaderboard,
+    }
+
+
+@router.get("/leaderboard/me")
+async def get_my_rank(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get the current user's leaderboard rank"""
+    rank = leaderboard_service.rank_of(current_user.id, db)
+    
+    return {
+        "success": True,
+        "data": {
+            "user_id": str(current_user.id),
+            "total_points": current_user.total_points,
+            "eco_score": current_user.eco_score,
+            **rank,
+        },
+    }
+
+
+@router.get("/leaderboard/around-me")
+async def get_leaderboard_around_me(
+    radius: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get the users ranked just above and below the current user"""
+    leaderboard = leaderboard_service.around(current_user.id, db, radius=radius)
     
     return {
         "success": True,
@@ -53,22 +140,147 @@ async def get_leaderboard(
     }
 
 
+@router.get("/points/history")
+async def get_points_history(
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get the current user's points ledger entries (most recent first)"""
+    history = PointsLedgerService.get_user_history(db, current_user.id, limit=limit)
+    
+    return {
+        "success": True,
+        "data": history,
+    }
+
+
+@router.get("/leaderboard/friends")
+async def get_friends_leaderboard(
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get the leaderboard of the current user and the people they follow"""
+    return {
+        "success": True,
+        "data": friends_leaderboard.get_leaderboard(db, current_user.id, limit=limit),
+    }
+
+
+@router.get("/following")
+async def get_following(
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get the users the current user follows"""
+    return {
+        "success": True,
+        "data": friends_leaderboard.get_following(db, current_user.id, limit=limit, offset=offset),
+    }
+
+
+@router.post("/follow/{user_id}")
+async def follow_user(
+    user_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Follow another user"""
+    if user_id == str(current_user.id):
+        raise HTTPException(status_code=400, detail="Cannot follow yourself")
+    
+    target = db.query(User).filter(User.id == user_id, User.is_active == True).first()
+    if not target:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    created = friends_leaderboard.follow(db, current_user.id, target.id)
+    friends_leaderboard.invalidate_user(current_user.id)
+    
+    return {
+        "success": True,
+        "message": "User followed" if created else "Already following",
+    }
+
+
+@router.delete("/follow/{user_id}")
+async def unfollow_user(
+    user_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Stop following a user"""
+    if not friends_leaderboard.unfollow(db, current_user.id, user_id):
+        raise HTTPException(status_code=404, detail="Not following this user")
+    friends_leaderboard.invalidate_user(current_user.id)
+    
+    return {
+        "success": True,
+        "message": "User unfollowed",
+    }
+
+
+def _serialize_challenge(challenge: Challenge) -> dict:
+    return {
+        "id": str(challenge.id),
+        "name": challenge.name,
+        "description": challenge.description,
+        "target_value": challenge.target_value,
+        "current_unit": challenge.current_unit,
+        "reward_points": challenge.reward_points,
+        "category": challenge.category,
+        "activity": challenge.activity,
+        "expires_at": challenge.expires_at.isoformat() if challenge.expires_at else None,
+    }
+
+
+def _active_challenges(db: Session):
+    return (
+        db.query(Challenge)
+        .filter(
+            Challenge.is_active == True,
+            or_(Challenge.expires_at.is_(None), Challenge.expires_at > datetime.utcnow()),
+        )
+        .order_by(Challenge.created_at.desc())
+        .all()
+    )
+
+
 @router.get("/challenges")
-async def get_challenges(db: Session = Depends(get_db)):
+async def get_challenges(db: Session = Depends(get_read_db)):
     """Get active challenges"""
-    # TODO: Add Challenge model to query
     return {
         "success": True,
-        "data": [
-            {
-                "id": "challenge-1",
-                "name": "Carbon Free Week",
-                "description": "Go 7 days without adding carbon footprint",
-                "target_value": 7,
-                "current_unit": "days",
-                "reward_points": 500,
-                "expires_at": None,
-            }
-        ],
+        "data": [_serialize_challenge(challenge) for challenge in _active_challenges(db)],
     }
 
+
+@router.get("/challenges/me")
+async def get_my_challenges(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    """Get active challenges with the current user's progress"""
+    progress = {
+        str(row.challenge_id): row
+        for row in db.query(UserChallengeProgress).filter(
+            UserChallengeProgress.user_id == current_user.id
+        ).all()
+    }
+    
+    data = []
+    for challenge in _active_challenges(db):
+        row = progress.get(str(challenge.id))
+        data.append({
+            **_serialize_challenge(challenge),
+            "progress": round(row.progress, 2) if row else 0,
+            "completed": bool(row and row.completed_at),
+            "completed_at": row.completed_at.isoformat() if row and row.completed_at else None,
+        })
+    
+    return {
+        "success": True,
+        "data": data,
+    }
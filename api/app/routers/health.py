@@ -26,12 +26,23 @@ async def health_check():
     except Exception as e:
         database_status = f"error: {str(e)[:50]}"
     
-    return {
+    health = {
         "status": "healthy",
         "database": database_status,
         "service": "carbon-tracker-api",
         "version": "0.1.0",
     }
+    
+    from app.database import read_engine
+    if read_engine is not None:
+        try:
+            with read_engine.connect() as conn:
+                conn.execute(text("SELECT 1")).fetchone()
+            health["read_replica"] = "connected"
+        except Exception as e:
+            health["read_replica"] = f"error: {str(e)[:50]}"
+    
+    return health
 
 
 @router.get("/ready")
@@ -0,0 +1,201 @@
+"""
+Activity day bitmaps
+Stores one bit per day for each user (bit 0 = the first day they logged),
+so streaks and active-day counts come from bit operations instead of
+scanning their carbon logs
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models import CarbonLog, UserActivityDays
+
+
+def _to_int(day_bits: Optional[bytes]) -> int:
+    return int.from_bytes(day_bits or b"", "little")
+
+
+def _to_bytes(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+class ActivityDaysService:
+    """Service for per-user logging-day bitmaps and the streaks derived from them"""
+
+    @staticmethod
+    def _get_row(db: Session, user_id, for_update: bool = False) -> Optional[UserActivityDays]:
+        query = db.query(UserActivityDays).filter(UserActivityDays.user_id == user_id)
+        if for_update:
+            # Serialises concurrent writers on PostgreSQL (no-op on SQLite);
+            # populate_existing so a row changed by an upsert isn't read stale
+            query = query.with_for_update().populate_existing()
+        return query.first()
+
+    @staticmethod
+    def _upsert(db: Session, user_id, start_date: date, bits: int, overwrite: bool) -> None:
+        """
+        Create a user's row in one statement, so concurrent first logs can't
+        both insert. On conflict the existing row is kept, or replaced when
+        overwrite is set.
+        """
+        values = {"start_date": start_date, "day_bits": _to_bytes(bits), "updated_at": datetime.utcnow()}
+        stmt = dialect_insert(db)(UserActivityDays).values(user_id=user_id, **values)
+        if overwrite:
+            stmt = stmt.on_conflict_do_update(index_elements=["user_id"], set_=values)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["user_id"])
+        db.execute(stmt)
+
+    @staticmethod
+    def _days_from_logs(db: Session, user_id) -> Tuple[Optional[date], int]:
+        """Compute (start_date, bits) from a user's carbon logs"""
+        days = {
+            created_at.date()
+            for (created_at,) in db.query(CarbonLog.created_at).filter(
+                CarbonLog.user_id == user_id,
+                CarbonLog.created_at.isnot(None),
+            )
+        }
+        if not days:
+            return None, 0
+
+        start_date = min(days)
+        bits = 0
+        for day in days:
+            bits |= 1 << (day - start_date).days
+        return start_date, bits
+
+    @staticmethod
+    def rebuild(db: Session, user_id) -> Optional[UserActivityDays]:
+        """
+        Rebuild a user's bitmap from their carbon logs (for users that
+        predate the bitmap). Does not commit.
+        """
+        start_date, bits = ActivityDaysService._days_from_logs(db, user_id)
+        if start_date is None:
+            db.query(UserActivityDays).filter(UserActivityDays.user_id == user_id).delete(
+                synchronize_session=False
+            )
+            return None
+
+        ActivityDaysService._upsert(db, user_id, start_date, bits, overwrite=True)
+        return ActivityDaysService._get_row(db, user_id, for_update=True)
+
+    @staticmethod
+    def load(db: Session, user_id) -> Tuple[Optional[date], int]:
+        """Get (start_date, bits) for a user"""
+        row = ActivityDaysService._get_row(db, user_id)
+        if row is None:
+            # Not stored yet - computed here, persisted on the user's next log
+            return ActivityDaysService._days_from_logs(db, user_id)
+        return row.start_date, _to_int(row.day_bits)
+
+    @staticmethod
+    def mark_day(db: Session, user_id, day: date) -> None:
+        """Set the bit for a day the user logged on. Does not commit."""
+        row = ActivityDaysService._get_row(db, user_id, for_update=True)
+        if row is None:
+            # First bitmap for the user: built from their logs, unless a concurrent
+            # log created it first (then that row is kept and this day added to it)
+            start_date, bits = ActivityDaysService._days_from_logs(db, user_id)
+            if start_date is None:
+                start_date, bits = day, 0
+            ActivityDaysService._upsert(db, user_id, start_date, bits, overwrite=False)
+            row = ActivityDaysService._get_row(db, user_id, for_update=True)
+
+        start_date, bits = row.start_date, _to_int(row.day_bits)
+        offset = (day - start_date).days
+        if offset < 0:
+            # Day before the bitmap starts: move the start back
+            bits <<= -offset
+            start_date, offset = day, 0
+        if bits >> offset & 1:
+            return
+
+        row.start_date = start_date
+        row.day_bits = _to_bytes(bits | 1 << offset)
+        row.updated_at = datetime.utcnow()
+
+    @staticmethod
+    def clear_day_if_empty(db: Session, user_id, day: date) -> None:
+        """Clear a day's bit when the user no longer has any logs on it. Does not commit."""
+        start = datetime.combine(day, datetime.min.time())
+        remaining = db.query(func.count(CarbonLog.id)).filter(
+            CarbonLog.user_id == user_id,
+            CarbonLog.created_at >= start,
+            CarbonLog.created_at < start + timedelta(days=1),
+        ).scalar()
+        if remaining:
+            return
+
+        row = ActivityDaysService._get_row(db, user_id, for_update=True)
+        if row is None:
+            return
+        offset = (day - row.start_date).days
+        bits = _to_int(row.day_bits)
+        if offset < 0 or not bits >> offset & 1:
+            return
+        row.day_bits = _to_bytes(bits & ~(1 << offset))
+        row.updated_at = datetime.utcnow()
+
+    @staticmethod
+    def count_days(start_date: Optional[date], bits: int, days: Optional[int] = None,
+                   today: Optional[date] = None) -> int:
+        """Number of active days overall, or within the last `days` days"""
+        if start_date is None or not bits:
+            return 0
+        if days is not None:
+            today = today or datetime.utcnow().date()
+            end = (today - start_date).days + 1  # Bit after today
+            begin = max(end - days, 0)
+            if end <= 0:
+                return 0
+            bits = (bits >> begin) & ((1 << (end - begin)) - 1)
+        return bits.bit_count()
+
+    @staticmethod
+    def current_streak(start_date: Optional[date], bits: int, today: Optional[date] = None) -> int:
+        """
+        Consecutive logged days ending today (or yesterday, so a streak
+        isn't shown as broken before the user has logged today)
+        """
+        if start_date is None or not bits:
+            return 0
+        today = today or datetime.utcnow().date()
+        last = (today - start_date).days
+        if last >= 0 and not bits >> last & 1:
+            last -= 1
+        if last < 0:
+            return 0
+
+        # The streak ends at the highest unset bit at or below `last`
+        mask = (1 << (last + 1)) - 1
+        gaps = ~bits & mask
+        return last + 1 if not gaps else last - (gaps.bit_length() - 1)
+
+    @staticmethod
+    def longest_streak(bits: int) -> int:
+        """Longest run of consecutive logged days"""
+        longest = 0
+        while bits:
+            bits &= bits >> 1
+            longest += 1
+        return longest
+
+    @staticmethod
+    def get_streaks(db: Session, user_id, today: Optional[date] = None) -> Dict[str, Any]:
+        """Streak and active-day summary for a user"""
+        today = today or datetime.utcnow().date()
+        start_date, bits = ActivityDaysService.load(db, user_id)
+        return {
+            "current_streak": ActivityDaysService.current_streak(start_date, bits, today),
+            "longest_streak": ActivityDaysService.longest_streak(bits),
+            "active_days": ActivityDaysService.count_days(start_date, bits),
+            "active_last_7_days": ActivityDaysService.count_days(start_date, bits, 7, today),
+            "active_last_30_days": ActivityDaysService.count_days(start_date, bits, 30, today),
+            "logged_today": ActivityDaysService.count_days(start_date, bits, 1, today) == 1,
+        }
@@ -0,0 +1,123 @@
+"""
+Badge award engine
+Keeps points-based badge thresholds in a sorted array so each points change
+finds newly crossed badges with a bisect instead of scanning all badges
+"""
+
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import and_, exists, literal, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import dialect_insert
+from app.models import Badge, User, UserBadge
+
+
+class BadgeEngine:
+    """
+    Awards badges whose points_required is crossed by a points change.
+    Badges with points_required <= 0 are not points-based (challenge or
+    manual rewards) and are never auto-awarded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thresholds: List[int] = []
+        self._badges: List[Tuple[Any, str]] = []  # (badge_id, name), same order as thresholds
+        self._loaded_at = 0.0
+
+    def invalidate(self) -> None:
+        """Force a reload on next use (call after badges are created/updated/deleted)"""
+        self._loaded_at = 0.0
+
+    def _load(self, db: Session) -> Tuple[List[int], List[Tuple[Any, str]]]:
+        """Get the sorted thresholds, reloading them when stale"""
+        with self._lock:
+            age = time.monotonic() - self._loaded_at
+            if not self._loaded_at or age > settings.BADGE_THRESHOLDS_REFRESH_SECONDS:
+                rows = (
+                    db.query(Badge.points_required, Badge.id, Badge.name)
+                    .filter(Badge.points_required > 0)
+                    .order_by(Badge.points_required)
+                    .all()
+                )
+                self._thresholds = [points for points, _, _ in rows]
+                self._badges = [(badge_id, name) for _, badge_id, name in rows]
+                self._loaded_at = time.monotonic()
+            return self._thresholds, self._badges
+
+    def award_crossed(
+        self,
+        db: Session,
+        user_id,
+        old_points: int,
+        new_points: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Award every badge with old_points < points_required <= new_points
+        Inserts the UserBadge rows in one statement without committing, so
+        they land in the caller's transaction
+
+        Returns:
+            Newly crossed badges (id and name)
+        """
+        if new_points is None or old_points is None or new_points <= old_points:
+            return []
+
+        thresholds, badges = self._load(db)
+        start = bisect_right(thresholds, old_points)
+        stop = bisect_right(thresholds, new_points)
+        crossed = badges[start:stop]
+        if not crossed:
+            return []
+
+        now = datetime.utcnow()
+        insert = dialect_insert(db)
+        db.execute(
+            insert(UserBadge).on_conflict_do_nothing(),
+            [
+                {"user_id": user_id, "badge_id": badge_id, "earned_at": now}
+                for badge_id, _ in crossed
+            ],
+        )
+
+        return [{"id": str(badge_id), "name": name} for badge_id, name in crossed]
+
+    @staticmethod
+    def backfill(db: Session) -> int:
+        """
+        Award all historical points badges for every user in one set-based
+        INSERT ... SELECT (skips badges a user already holds)
+
+        Returns:
+            Number of badges awarded
+        """
+        already_earned = exists().where(and_(
+            UserBadge.user_id == User.id,
+            UserBadge.badge_id == Badge.id,
+        ))
+        eligible = (
+            select(User.id, Badge.id, literal(datetime.utcnow()))
+            .join(Badge, and_(
+                Badge.points_required > 0,
+                User.total_points >= Badge.points_required,
+            ))
+            .where(~already_earned)
+        )
+
+        insert = dialect_insert(db)
+        result = db.execute(
+            insert(UserBadge)
+            .from_select(["user_id", "badge_id", "earned_at"], eligible)
+            .on_conflict_do_nothing()
+        )
+        db.commit()
+        return result.rowcount or 0
+
+
+badge_engine = BadgeEngine()
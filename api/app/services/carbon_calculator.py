@@ -9,7 +9,7 @@ References:
 For detailed references, see: EMISSION_FACTORS_REFERENCES.md
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 
 class CarbonCalculator:
@@ -218,6 +218,68 @@ class CarbonCalculator:
         },
     }
 
+    # Unit each energy/lifestyle factor is quoted in (lifestyle activities
+    # not listed here are counted per item: load, meal, session, ...)
+    FACTOR_UNITS = {
+        "energy": {
+            "electricity_grid": "kwh",
+            "electricity_bangladesh": "kwh",
+            "natural_gas": "m3",
+            "heating_oil": "liter",
+            "coal": "kwh",
+        },
+        "lifestyle": {
+            **{activity: "hour" for activity in (
+                "streaming_hour", "social_media", "cooking_gas", "cooking_electric",
+                "fan_hour", "fan_energy_efficient", "ac_hour_1ton", "ac_hour_1.5ton",
+                "ac_hour_2ton", "ac_hour", "led_bulb_7w", "led_bulb_12w", "cfl_bulb_15w",
+                "light_bulb_hour", "tv_led_32", "tv_led_42plus", "tv_hour",
+                "water_pump_submersible", "water_pump_surface", "electric_iron",
+            )},
+            "internet_gb": "gb",
+            "phone_call": "minute",
+            "shower_10min": "10min",
+            "shower_cold": "10min",
+            "waste_kg": "kg",
+            "refrigerator_small": "day",
+            "refrigerator_medium": "day",
+            "refrigerator_large": "day",
+        },
+    }
+
+    # Logged unit -> multiplier into the factor's unit
+    UNIT_CONVERSIONS = {
+        "kwh": {"kwh": 1.0, "wh": 0.001, "mwh": 1000.0},
+        "m3": {"m3": 1.0, "liter": 0.001, "ft3": 0.0283168},
+        "liter": {"liter": 1.0, "l": 1.0, "ml": 0.001, "gallon": 3.78541},
+        "hour": {"hour": 1.0, "h": 1.0, "minute": 1 / 60, "min": 1 / 60},
+        "minute": {"minute": 1.0, "min": 1.0, "hour": 60.0, "h": 60.0},
+        "10min": {"time": 1.0, "minute": 0.1, "min": 0.1},
+        "gb": {"gb": 1.0, "mb": 0.001, "tb": 1000.0},
+        "kg": {"kg": 1.0, "g": 0.001},
+        "day": {"day": 1.0, "week": 7.0},
+        "item": {unit: 1.0 for unit in (
+            "item", "load", "time", "email", "issue", "person", "meal", "session", "use",
+        )},
+    }
+
+    @staticmethod
+    def convert_amount(
+        category: str, activity: str, amount: float, unit: Optional[str]
+    ) -> Optional[float]:
+        """
+        Convert an energy/lifestyle amount into the unit its factor is quoted in
+
+        Returns:
+            The converted amount (unchanged when no unit is given), or None
+            if the unit can't be converted for this activity
+        """
+        if not unit:
+            return amount
+        factor_unit = CarbonCalculator.FACTOR_UNITS.get(category, {}).get(activity, "item")
+        multiplier = CarbonCalculator.UNIT_CONVERSIONS[factor_unit].get(unit.lower())
+        return amount * multiplier if multiplier is not None else None
+
     @staticmethod
     def calculate_transport(
         mode: str, distance_km: float, passengers: int = 1
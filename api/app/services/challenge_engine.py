@@ -0,0 +1,206 @@
+"""
+Challenge progress engine
+Indexes active challenges by the category/activity they watch so each log
+write only evaluates the challenges it can affect
+"""
+
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, or_
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import dialect_insert
+from app.models import CarbonLog, Challenge, User, UserBadge, UserChallengeProgress
+
+WatchedChallenge = namedtuple(
+    "WatchedChallenge",
+    ["id", "name", "metric", "target_value", "reward_points", "badge_reward", "expires_at"],
+)
+
+
+class ChallengeEngine:
+    """Service for tracking challenge progress from carbon log writes"""
+
+    # current_unit -> what a log contributes to progress
+    UNIT_METRICS = {
+        "kg": "carbon_kg",
+        "kg_co2": "carbon_kg",
+        "logs": "count",
+        "entries": "count",
+        "times": "count",
+        "days": "days",
+        "km": "distance_km",
+        "points": "points",
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Dict[Tuple[Optional[str], Optional[str]], List[WatchedChallenge]] = {}
+        self._loaded_at = 0.0
+
+    def invalidate(self) -> None:
+        """Force a rebuild on next use (call after challenges change)"""
+        self._loaded_at = 0.0
+
+    def _get_index(self, db: Session):
+        """Get the (category, activity) -> challenges index, rebuilding it when stale"""
+        with self._lock:
+            age = time.monotonic() - self._loaded_at
+            if not self._loaded_at or age > settings.CHALLENGE_INDEX_REFRESH_SECONDS:
+                now = datetime.utcnow()
+                challenges = db.query(Challenge).filter(
+                    Challenge.is_active == True,
+                    or_(Challenge.expires_at.is_(None), Challenge.expires_at > now),
+                ).all()
+
+                index: Dict[Tuple[Optional[str], Optional[str]], List[WatchedChallenge]] = {}
+                for challenge in challenges:
+                    watched = WatchedChallenge(
+                        id=challenge.id,
+                        name=challenge.name,
+                        metric=self.UNIT_METRICS.get((challenge.current_unit or "").lower(), "count"),
+                        target_value=challenge.target_value,
+                        reward_points=challenge.reward_points or 0,
+                        badge_reward=challenge.badge_reward,
+                        expires_at=challenge.expires_at,
+                    )
+                    # An activity only makes sense within its category
+                    activity = challenge.activity if challenge.category else None
+                    index.setdefault((challenge.category, activity), []).append(watched)
+
+                self._index = index
+                self._loaded_at = time.monotonic()
+            return self._index
+
+    def candidates(self, db: Session, category: str, activity: str) -> List[WatchedChallenge]:
+        """Active, non-expired challenges a log in this category/activity can affect"""
+        index = self._get_index(db)
+        now = datetime.utcnow()
+        matched = (
+            index.get((category, activity), [])
+            + index.get((category, None), [])
+            + index.get((None, None), [])
+        )
+        return [c for c in matched if c.expires_at is None or c.expires_at > now]
+
+    @staticmethod
+    def _increment(challenge: WatchedChallenge, log: CarbonLog, points: int) -> float:
+        """How much a log adds to a challenge's progress"""
+        if challenge.metric == "carbon_kg":
+            return float(log.carbon_amount_kg or 0)
+        if challenge.metric == "distance_km":
+            return float((log.meta_data or {}).get("distance_km", 0) or 0)
+        if challenge.metric == "points":
+            return float(points)
+        return 1.0
+
+    @staticmethod
+    def _result(challenge: WatchedChallenge, progress: Optional[float], completed: bool,
+                just_completed: bool) -> Dict[str, Any]:
+        return {
+            "challenge_id": str(challenge.id),
+            "name": challenge.name,
+            "progress": round(progress or 0, 2),
+            "target_value": challenge.target_value,
+            "completed": completed,
+            "just_completed": just_completed,
+            "reward_points": challenge.reward_points if just_completed else 0,
+        }
+
+    def process_log(
+        self,
+        db: Session,
+        user: User,
+        log: CarbonLog,
+        points: int,
+    ) -> List[Dict[str, Any]]:
+        """
+        Update progress for the challenges a new log affects and award any
+        completions. Does not commit - runs inside the log-creation transaction.
+
+        Returns:
+            Progress for each affected challenge
+        """
+        challenges = self.candidates(db, log.category, log.activity)
+        if not challenges:
+            return []
+
+        from app.services.gamification import GamificationService
+
+        insert = dialect_insert(db)
+        now = datetime.utcnow()
+        today = (log.created_at or now).date()
+        results: Dict[Any, Dict[str, Any]] = {}
+        already_completed = []
+        for challenge in challenges:
+            increment = self._increment(challenge, log, points)
+
+            # Atomic upsert; "days" challenges count a day only once
+            if challenge.metric == "days":
+                new_progress = case(
+                    (UserChallengeProgress.last_counted_date == today, UserChallengeProgress.progress),
+                    else_=UserChallengeProgress.progress + 1,
+                )
+            else:
+                new_progress = UserChallengeProgress.progress + increment
+            # Progress and completion in one statement. Completed rows are left
+            # alone (and return nothing), so only the request that sets
+            # completed_at gets it back and awards the reward.
+            row = db.execute(
+                insert(UserChallengeProgress)
+                .values(user_id=user.id, challenge_id=challenge.id, progress=increment,
+                        last_counted_date=today, updated_at=now,
+                        completed_at=now if increment >= challenge.target_value else None)
+                .on_conflict_do_update(
+                    index_elements=["user_id", "challenge_id"],
+                    set_={
+                        "progress": new_progress,
+                        "last_counted_date": today,
+                        "updated_at": now,
+                        "completed_at": case((new_progress >= challenge.target_value, now), else_=None),
+                    },
+                    where=UserChallengeProgress.completed_at.is_(None),
+                )
+                .returning(UserChallengeProgress.progress, UserChallengeProgress.completed_at)
+            ).first()
+            if row is None:
+                already_completed.append(challenge)
+                continue
+
+            progress, completed_at = row
+            completed = completed_at is not None
+            if completed:
+                if challenge.reward_points:
+                    GamificationService.apply_points(
+                        db, user.id, challenge.reward_points, "challenge_reward"
+                    )
+                if challenge.badge_reward:
+                    db.execute(
+                        insert(UserBadge).on_conflict_do_nothing(),
+                        [{"user_id": user.id, "badge_id": challenge.badge_reward,
+                          "earned_at": now}],
+                    )
+            results[challenge.id] = self._result(challenge, progress, completed, completed)
+
+        if already_completed:
+            # Completed earlier: progress no longer moves, read it in one query
+            progress_by_challenge = dict(db.query(
+                UserChallengeProgress.challenge_id, UserChallengeProgress.progress
+            ).filter(
+                UserChallengeProgress.user_id == user.id,
+                UserChallengeProgress.challenge_id.in_([c.id for c in already_completed]),
+            ).all())
+            for challenge in already_completed:
+                results[challenge.id] = self._result(
+                    challenge, progress_by_challenge.get(challenge.id), True, False
+                )
+
+        return [results[challenge.id] for challenge in challenges]
+
+
+challenge_engine = ChallengeEngine()
@@ -0,0 +1,123 @@
+"""
+Eco score history
+Daily eco score / points / level snapshots for every active user, written
+by an end-of-day batch job with a single set-based statement
+"""
+
+import math
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, distinct, func, literal, select
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models import CarbonLog, EcoScoreHistory, User
+from app.services.gamification import GamificationService
+
+
+class EcoScoreHistoryService:
+    """Service for writing and reading daily eco score snapshots"""
+
+    @staticmethod
+    def snapshot_day(db: Session, day: Optional[date] = None) -> int:
+        """
+        Score every active user as of the end of `day` and store the snapshot
+        Eco scores are computed in SQL from aggregated logs; points and level
+        are the users' current values. Re-running a day overwrites it.
+
+        Returns:
+            Number of snapshots written
+        """
+        day = day or datetime.utcnow().date()
+        day_end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+        week_start = datetime.combine(day - timedelta(days=6), datetime.min.time())
+        log_day = func.date(CarbonLog.created_at)
+
+        logs = (
+            select(
+                CarbonLog.user_id.label("user_id"),
+                func.sum(CarbonLog.carbon_amount_kg).label("total_carbon"),
+                func.count(distinct(log_day)).label("days_active"),
+                func.count(distinct(case((CarbonLog.created_at >= week_start, log_day)))).label("recent_days"),
+            )
+            .where(CarbonLog.created_at < day_end)
+            .group_by(CarbonLog.user_id)
+            .subquery()
+        )
+
+        eco_score = GamificationService.eco_score_expression(
+            logs.c.total_carbon, logs.c.days_active, logs.c.recent_days
+        )
+        scores = (
+            select(
+                User.id,
+                literal(day, EcoScoreHistory.snapshot_date.type),
+                eco_score,
+                func.coalesce(User.total_points, 0),
+                func.coalesce(User.level, 1),
+                literal(datetime.utcnow(), EcoScoreHistory.created_at.type),
+            )
+            .outerjoin(logs, logs.c.user_id == User.id)
+            .where(User.is_active == True)
+        )
+
+        insert = dialect_insert(db)
+        stmt = insert(EcoScoreHistory).from_select(
+            ["user_id", "snapshot_date", "eco_score", "total_points", "level", "created_at"],
+            scores,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "snapshot_date"],
+            set_={
+                "eco_score": stmt.excluded.eco_score,
+                "total_points": stmt.excluded.total_points,
+                "level": stmt.excluded.level,
+                "created_at": stmt.excluded.created_at,
+            },
+        )
+        result = db.execute(stmt)
+        db.commit()
+        return result.rowcount or 0
+
+    @staticmethod
+    def get_series(
+        db: Session,
+        user_id,
+        days: int = 90,
+        max_points: int = 90,
+    ) -> List[Dict[str, Any]]:
+        """
+        A user's daily snapshots for the last `days` days
+        Long ranges are downsampled to at most `max_points` points by averaging
+        the eco score over equal runs of days (points and level keep the last
+        value of each run).
+        """
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        rows = (
+            db.query(
+                EcoScoreHistory.snapshot_date,
+                EcoScoreHistory.eco_score,
+                EcoScoreHistory.total_points,
+                EcoScoreHistory.level,
+            )
+            .filter(
+                EcoScoreHistory.user_id == user_id,
+                EcoScoreHistory.snapshot_date >= since,
+            )
+            .order_by(EcoScoreHistory.snapshot_date)
+            .all()
+        )
+
+        step = max(math.ceil(len(rows) / max(max_points, 1)), 1)
+        series = []
+        for start in range(0, len(rows), step):
+            bucket = rows[start:start + step]
+            last = bucket[-1]
+            series.append({
+                "date": last.snapshot_date.isoformat(),
+                "eco_score": round(sum(row.eco_score for row in bucket) / len(bucket), 1),
+                "total_points": last.total_points,
+                "level": last.level,
+            })
+        return series
@@ -0,0 +1,279 @@
+"""
+Email outbox
+Emails are written to the email_outbox table in the same transaction as the
+change that triggers them, and a background sender delivers them in batches
+over one pooled HTTP client (or the pooled SMTP transport). Failed sends are
+retried with exponential backoff and dead-lettered after
+EMAIL_OUTBOX_MAX_ATTEMPTS.
+"""
+
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import EmailOutbox
+from app.services.email_service import EmailDeliveryError, EmailService
+from app.services.smtp_transport import smtp_transport
+
+
+class EmailOutboxService:
+    """Queues emails and runs the background sender"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stopping = False
+
+    @staticmethod
+    def enqueue(db: Session, kind: str, to_email: str, subject: str,
+                html_body: str, text_body: str, headers: Optional[Dict[str, str]] = None) -> EmailOutbox:
+        """Queue an email; it is sent once the caller's transaction commits"""
+        row = EmailOutbox(
+            kind=kind,
+            to_email=to_email,
+            subject=subject,
+            html_body=html_body,
+            text_body=text_body,
+            headers=headers,
+            status="pending",
+            attempts=0,
+            next_attempt_at=datetime.utcnow(),
+        )
+        db.add(row)
+        return row
+
+    @staticmethod
+    def enqueue_verification(db: Session, to_email: str, name: str, verification_token: str) -> EmailOutbox:
+        """Queue the email verification message"""
+        subject, html_body, text_body = EmailService.build_verification_email(name, verification_token)
+        return EmailOutboxService.enqueue(db, "verification", to_email, subject, html_body, text_body)
+
+    # Background sender
+
+    async def start(self) -> None:
+        """Start the sender (called on application startup)"""
+        if not settings.EMAIL_OUTBOX_ENABLED or self._task is not None:
+            return
+        self._stopping = False
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(
+                max_connections=settings.EMAIL_OUTBOX_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.EMAIL_OUTBOX_MAX_CONNECTIONS,
+            ),
+        )
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Finish the current batch and close the HTTP/SMTP connections (application shutdown)"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self.notify()
+        try:
+            await asyncio.wait_for(self._task, timeout=15)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
+        await self._client.aclose()
+        self._client = None
+        await smtp_transport.close()
+
+    def notify(self) -> None:
+        """Wake the sender after queuing an email instead of waiting for the next poll"""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                processed = await self.drain_once()
+            except Exception as e:
+                print(f"❌ Email outbox: sender error: {e}")
+                processed = 0
+            if processed >= settings.EMAIL_OUTBOX_BATCH_SIZE:
+                continue  # More may be due right away
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.EMAIL_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def drain_once(self) -> int:
+        """
+        Claim one batch of due emails, send them concurrently and record the results
+
+        Returns:
+            Number of emails processed
+        """
+        rows = await asyncio.to_thread(self._claim_batch)
+        if not rows:
+            return 0
+        errors = await EmailService.deliver_batch(
+            self._client,
+            [(row.to_email, row.subject, row.html_body, row.text_body, row.headers) for row in rows],
+        )
+        results = [(row.id, row.attempts, error) for row, error in zip(rows, errors)]
+        await asyncio.to_thread(self._record, results)
+        return len(rows)
+
+    @staticmethod
+    def _claim_batch() -> List[Any]:
+        """
+        Mark a batch of due emails as sending
+        A claimed row's next_attempt_at becomes its claim deadline, so rows left
+        behind by a crashed sender become due again once the deadline passes.
+        """
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            due = (
+                db.query(EmailOutbox.id)
+                .filter(
+                    EmailOutbox.status.in_(("pending", "sending")),
+                    EmailOutbox.next_attempt_at <= now,
+                )
+                .order_by(EmailOutbox.next_attempt_at)
+                .limit(settings.EMAIL_OUTBOX_BATCH_SIZE)
+            )
+            if db.bind.dialect.name == "postgresql":
+                # Concurrent senders (other API workers) skip rows being claimed
+                due = due.with_for_update(skip_locked=True)
+            ids = [row_id for (row_id,) in due]
+            if not ids:
+                db.rollback()
+                return []
+
+            claim_until = now + timedelta(seconds=settings.EMAIL_OUTBOX_CLAIM_TIMEOUT_SECONDS)
+            columns = (
+                EmailOutbox.id, EmailOutbox.to_email, EmailOutbox.subject,
+                EmailOutbox.html_body, EmailOutbox.text_body, EmailOutbox.headers, EmailOutbox.attempts,
+            )
+            claim = (
+                update(EmailOutbox)
+                .where(EmailOutbox.id.in_(ids), EmailOutbox.next_attempt_at <= now)
+                .values(status="sending", attempts=EmailOutbox.attempts + 1, next_attempt_at=claim_until)
+                .execution_options(synchronize_session=False)
+            )
+            if db.bind.dialect.update_returning:
+                rows = db.execute(claim.returning(*columns)).all()
+            else:
+                db.execute(claim)
+                rows = db.query(*columns).filter(
+                    EmailOutbox.id.in_(ids), EmailOutbox.next_attempt_at == claim_until
+                ).all()
+            db.commit()
+            return rows
+        finally:
+            db.close()
+
+    @staticmethod
+    def _backoff(attempts: int) -> float:
+        """Delay before the next attempt: base * 2^(attempts-1), capped, with jitter"""
+        delay = settings.EMAIL_OUTBOX_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0))
+        return min(delay, settings.EMAIL_OUTBOX_MAX_BACKOFF_SECONDS) * random.uniform(0.8, 1.2)
+
+    @staticmethod
+    def _record(results: List[Tuple[Any, int, Optional[EmailDeliveryError]]]) -> None:
+        """Mark sent emails, and reschedule or dead-letter failed ones"""
+        from app.database import SessionLocal
+
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            sent = [row_id for row_id, _, error in results if error is None]
+            if sent:
+                db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id.in_(sent))
+                    .values(status="sent", sent_at=now, last_error=None)
+                    .execution_options(synchronize_session=False)
+                )
+
+            for row_id, attempts, error in results:
+                if error is None:
+                    continue
+                if error.permanent or attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    values = {"status": "dead"}
+                    print(f"❌ Email outbox: giving up on {row_id} after {attempts} attempt(s): {error}")
+                else:
+                    values = {
+                        "status": "pending",
+                        "next_attempt_at": now + timedelta(seconds=EmailOutboxService._backoff(attempts)),
+                    }
+                    print(f"⚠️ Email outbox: attempt {attempts} for {row_id} failed, will retry: {error}")
+                db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id == row_id)
+                    .values(last_error=str(error)[:2000], **values)
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+        finally:
+            db.close()
+
+    # Dead letters
+
+    @staticmethod
+    def stats(db: Session) -> Dict[str, int]:
+        """Number of queued emails per status"""
+        rows = db.query(EmailOutbox.status, func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all()
+        return {status: count for status, count in rows}
+
+    @staticmethod
+    def list_emails(db: Session, status: str = "dead", limit: int = 50) -> List[Dict[str, Any]]:
+        """Queued emails with the given status, newest first"""
+        rows = (
+            db.query(EmailOutbox)
+            .filter(EmailOutbox.status == status)
+            .order_by(EmailOutbox.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "id": str(row.id),
+                "kind": row.kind,
+                "to_email": row.to_email,
+                "status": row.status,
+                "attempts": row.attempts,
+                "last_error": row.last_error,
+                "next_attempt_at": row.next_attempt_at.isoformat() if row.next_attempt_at else None,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "sent_at": row.sent_at.isoformat() if row.sent_at else None,
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def retry(db: Session, email_id) -> bool:
+        """
+        Put a dead email back in the queue with a fresh attempt budget
+
+        Returns:
+            False if there is no dead email with that id
+        """
+        updated = db.query(EmailOutbox).filter(
+            EmailOutbox.id == email_id,
+            EmailOutbox.status == "dead",
+        ).update(
+            {"status": "pending", "attempts": 0, "next_attempt_at": datetime.utcnow()},
+            synchronize_session=False,
+        )
+        db.commit()
+        return updated > 0
+
+
+email_outbox = EmailOutboxService()
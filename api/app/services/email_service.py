@@ -1,36 +1,57 @@
 """
-Email service for sending verification emails
-Supports SMTP and Resend API
+Email service for building and delivering emails
+Supports SMTP (pooled async transport) and Resend API. Application code queues emails through the
+outbox (app/services/email_outbox.py); delivery happens in its sender.
 """
 
-import smtplib
+import asyncio
+import email.policy
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 import httpx
 import os
 from app.config import settings
+from app.services.smtp_transport import SMTPReplyError, smtp_transport
+
+
+class EmailDeliveryError(Exception):
+    """An email could not be delivered; permanent errors are not worth retrying"""
+
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
 
 
 class EmailService:
     """Service for sending emails via SMTP or Resend API"""
     
     @staticmethod
-    async def send_verification_email(
-        to_email: str,
-        name: str,
-        verification_token: str
-    ) -> bool:
+    def _resend_key() -> str:
+        # Check both settings and environment variables
+        resend_key = getattr(settings, 'RESEND_API_KEY', '') or os.getenv('RESEND_API_KEY', '') or ''
+        return resend_key.strip()
+    
+    @staticmethod
+    def smtp_configured() -> bool:
+        return bool(settings.SMTP_HOST)
+    
+    @staticmethod
+    def is_configured() -> bool:
+        """Whether any email transport is configured"""
+        return bool(EmailService._resend_key()) or EmailService.smtp_configured()
+    
+    @staticmethod
+    def build_verification_email(name: str, verification_token: str) -> Tuple[str, str, str]:
         """
-        Send email verification email
+        Build the email verification message
         
         Args:
-            to_email: Recipient email address
             name: Recipient name
             verification_token: Verification token to include in link
             
         Returns:
-            True if email sent successfully, False otherwise
+            (subject, html_content, text_content)
         """
         verification_url = f"{settings.FRONTEND_URL}/verify-email?token={verification_token}"
         
@@ -89,155 +110,156 @@ class EmailService:
         © 2024 MyCarbonFootprint. All rights reserved.
         """
         
-        # Try Resend API first if configured
-        # Check both settings and environment variables
-        resend_key = os.getenv('RESEND_API_KEY', '') or getattr(settings, 'RESEND_API_KEY', '') or ''
-        resend_key = resend_key.strip() if resend_key else ''
-        
-        print(f"🔍 Checking Resend configuration...")
-        print(f"   RESEND_API_KEY from env: {os.getenv('RESEND_API_KEY', 'NOT_SET')[:15] if os.getenv('RESEND_API_KEY') else 'NOT_SET'}...")
-        print(f"   RESEND_API_KEY from settings: {getattr(settings, 'RESEND_API_KEY', 'NOT_SET')[:15] if getattr(settings, 'RESEND_API_KEY', '') else 'NOT_SET'}...")
-        print(f"   Final resend_key: {resend_key[:15] if resend_key else 'NOT_SET'}...")
-        
-        if resend_key:
-            print(f"📧 Resend API key found, attempting to send email...")
-            result = await EmailService._send_via_resend(
-                to_email=to_email,
-                subject=subject,
-                html_content=html_content,
-                text_content=text_content
-            )
-            if result:
-                return True
-            # If Resend fails, continue to SMTP fallback
-        else:
-            print(f"⚠️ RESEND_API_KEY not found in environment or settings")
-        
-        # Fallback to SMTP
-        if settings.SMTP_HOST and settings.SMTP_USER and settings.SMTP_PASSWORD:
-            return await EmailService._send_via_smtp(
-                to_email=to_email,
-                subject=subject,
-                html_content=html_content,
-                text_content=text_content
+        return subject, html_content, text_content
+    
+    @staticmethod
+    async def deliver_batch(
+        client: httpx.AsyncClient,
+        messages: List[tuple]
+    ) -> List[Optional[EmailDeliveryError]]:
+        """
+        Deliver emails, trying Resend first and SMTP as the fallback
+        
+        Args:
+            client: Shared HTTP client used for the Resend API
+            messages: (to_email, subject, html_content, text_content[, headers]) per email
+            
+        Returns:
+            Per email: None if delivered, otherwise why it was not
+        """
+        not_configured = EmailDeliveryError("Email service not configured", permanent=True)
+        results: List[Optional[EmailDeliveryError]] = [not_configured] * len(messages)
+        
+        if EmailService._resend_key():
+            results = list(await asyncio.gather(*(
+                EmailService._send_via_resend(client, *message) for message in messages
+            )))
+        
+        # Anything Resend did not deliver goes out over SMTP
+        retry = [index for index, error in enumerate(results) if error is not None]
+        if retry and EmailService.smtp_configured():
+            smtp_results = await EmailService._send_via_smtp([messages[index] for index in retry])
+            for index, error in zip(retry, smtp_results):
+                results[index] = error
+        return results
+    
+    @staticmethod
+    async def deliver(
+        client: httpx.AsyncClient,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: str
+    ) -> None:
+        """
+        Deliver one email
+        
+        Raises:
+            EmailDeliveryError: If no transport delivered the email
+        """
+        (error,) = await EmailService.deliver_batch(client, [(to_email, subject, html_content, text_content)])
+        if error is not None:
+            raise error
+    
+    @staticmethod
+    def _from_field() -> str:
+        """Format the "from" field correctly for Resend"""
+        # Resend accepts: "email@example.com" or "Name <email@example.com>"
+        from_email = (getattr(settings, 'SMTP_FROM_EMAIL', '') or os.getenv('SMTP_FROM_EMAIL', '')).strip()
+        from_name = (getattr(settings, 'SMTP_FROM_NAME', '') or os.getenv('SMTP_FROM_NAME', 'MyCarbonFootprint')).strip()
+        
+        # Validate email format
+        if not from_email or "@" not in from_email:
+            raise EmailDeliveryError(
+                f"Invalid SMTP_FROM_EMAIL: {from_email} (should be an email address like noreply@example.com)",
+                permanent=True,
             )
         
-        # If no email service configured, log and return False
-        print(f"⚠️ Email service not configured. Would send verification email to {to_email}")
-        print(f"   RESEND_API_KEY: {'Set' if resend_key else 'Not set'}")
-        print(f"   SMTP_HOST: {settings.SMTP_HOST or 'Not set'}")
-        print(f"   Verification URL: {verification_url}")
-        print(f"   🔗 For localhost development, use this URL to verify: {verification_url}")
-        print(f"   📝 Or manually verify in database or use: http://localhost:3000/verify-email?token={verification_token}")
-        return False
+        return f"{from_name} <{from_email}>" if from_name else from_email
     
     @staticmethod
     async def _send_via_resend(
+        client: httpx.AsyncClient,
         to_email: str,
         subject: str,
         html_content: str,
-        text_content: str
-    ) -> bool:
+        text_content: str,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Optional[EmailDeliveryError]:
         """Send email via Resend API"""
         try:
-            # Get Resend API key from settings or environment
-            resend_key = getattr(settings, 'RESEND_API_KEY', '') or os.getenv('RESEND_API_KEY', '')
-            if not resend_key or not resend_key.strip():
-                print(f"❌ RESEND_API_KEY not found")
-                return False
-            
-            # Format the "from" field correctly for Resend
-            # Resend accepts: "email@example.com" or "Name <email@example.com>"
-            from_email = (getattr(settings, 'SMTP_FROM_EMAIL', '') or os.getenv('SMTP_FROM_EMAIL', '')).strip()
-            from_name = (getattr(settings, 'SMTP_FROM_NAME', '') or os.getenv('SMTP_FROM_NAME', 'MyCarbonFootprint')).strip()
-            
-            # Validate email format
-            if not from_email or "@" not in from_email:
-                print(f"❌ Invalid SMTP_FROM_EMAIL: {from_email}")
-                print(f"   It should be an email address like: noreply@jibanahammed.com")
-                print(f"   Current value: {from_email}")
-                return False
-            
-            # Format: "Name <email@example.com>" or just "email@example.com"
-            if from_name:
-                from_field = f"{from_name} <{from_email}>"
-            else:
-                from_field = from_email
-            
-            print(f"📧 Sending email via Resend from: {from_field}")
-            
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://api.resend.com/emails",
-                    headers={
-                        "Authorization": f"Bearer {resend_key}",
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "from": from_field,
-                        "to": [to_email],
-                        "subject": subject,
-                        "html": html_content,
-                        "text": text_content,
-                    },
-                    timeout=10.0,
-                )
-                
-                if response.status_code == 200:
-                    response_data = response.json()
-                    print(f"✅ Verification email sent to {to_email} via Resend")
-                    print(f"   Email ID: {response_data.get('id', 'N/A')}")
-                    return True
-                else:
-                    error_detail = response.text
-                    try:
-                        error_json = response.json()
-                        error_detail = error_json.get('message', error_detail)
-                    except:
-                        pass
-                    print(f"❌ Failed to send email via Resend")
-                    print(f"   Status Code: {response.status_code}")
-                    print(f"   Error: {error_detail}")
-                    print(f"   From Email: {from_field}")
-                    print(f"   To Email: {to_email}")
-                    if response.status_code == 422:
-                        print(f"   💡 Common issue: Domain not verified in Resend dashboard")
-                        print(f"   💡 Go to https://resend.com/domains to verify your domain")
-                    return False
-        except Exception as e:
-            print(f"❌ Error sending email via Resend: {e}")
-            return False
+            response = await client.post(
+                settings.RESEND_API_URL,
+                headers={
+                    "Authorization": f"Bearer {EmailService._resend_key()}",
+                    "Content-Type": "application/json",
+                },
+                json={
+                    "from": EmailService._from_field(),
+                    "to": [to_email],
+                    "subject": subject,
+                    "html": html_content,
+                    "text": text_content,
+                    **({"headers": headers} if headers else {}),
+                },
+            )
+        except EmailDeliveryError as e:
+            return e
+        except httpx.HTTPError as e:
+            return EmailDeliveryError(f"Resend request failed: {e!r}")
+        
+        if response.status_code == 200:
+            print(f"✅ Email sent to {to_email} via Resend (id: {response.json().get('id', 'N/A')})")
+            return None
+        
+        error_detail = response.text
+        try:
+            error_detail = response.json().get('message', error_detail)
+        except ValueError:
+            pass
+        if response.status_code == 422:
+            print(f"   💡 Common issue: Domain not verified in Resend dashboard")
+            print(f"   💡 Go to https://resend.com/domains to verify your domain")
+        # Client errors won't succeed on retry, except timeouts and rate limits
+        permanent = 400 <= response.status_code < 500 and response.status_code not in (408, 409, 429)
+        return EmailDeliveryError(f"Resend {response.status_code}: {error_detail}", permanent=permanent)
     
     @staticmethod
-    async def _send_via_smtp(
+    def _build_mime(
         to_email: str,
         subject: str,
         html_content: str,
-        text_content: str
-    ) -> bool:
-        """Send email via SMTP"""
-        try:
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = subject
-            msg["From"] = f"{settings.SMTP_FROM_NAME} <{settings.SMTP_FROM_EMAIL}>"
-            msg["To"] = to_email
-            
-            # Add both plain text and HTML versions
-            part1 = MIMEText(text_content, "plain")
-            part2 = MIMEText(html_content, "html")
-            
-            msg.attach(part1)
-            msg.attach(part2)
-            
-            # Send email
-            with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-                server.starttls()
-                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-                server.send_message(msg)
-            
-            print(f"✅ Verification email sent to {to_email} via SMTP")
-            return True
-        except Exception as e:
-            print(f"❌ Error sending email via SMTP: {e}")
-            return False
-
+        text_content: str,
+        headers: Optional[Dict[str, str]] = None
+    ) -> bytes:
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = subject
+        msg["From"] = f"{settings.SMTP_FROM_NAME} <{settings.SMTP_FROM_EMAIL}>"
+        msg["To"] = to_email
+        for name, value in (headers or {}).items():
+            msg[name] = value
+        
+        # Add both plain text and HTML versions
+        part1 = MIMEText(text_content, "plain")
+        part2 = MIMEText(html_content, "html")
+        
+        msg.attach(part1)
+        msg.attach(part2)
+        return msg.as_bytes(policy=email.policy.SMTP)
+    
+    @staticmethod
+    async def _send_via_smtp(messages: List[tuple]) -> List[Optional[EmailDeliveryError]]:
+        """Send emails via SMTP over the pooled, pipelined transport"""
+        envelopes = [
+            (settings.SMTP_FROM_EMAIL, [message[0]], EmailService._build_mime(*message))
+            for message in messages
+        ]
+        results = []
+        for (to_email, *_), error in zip(messages, await smtp_transport.send_many(envelopes)):
+            if error is None:
+                print(f"✅ Email sent to {to_email} via SMTP")
+                results.append(None)
+            else:
+                permanent = isinstance(error, SMTPReplyError) and error.permanent
+                results.append(EmailDeliveryError(str(error), permanent=permanent))
+        return results
@@ -0,0 +1,189 @@
+"""
+Friends leaderboard
+Ranks a user against the people they follow. Results are cached per user
+and dropped as soon as anyone in that neighborhood changes stats, using a
+reverse index (followee -> cached followers) kept next to the cache. A
+leaderboard cut at its limit watches the whole follow set, since anyone
+below the cut can climb into it.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Set, Tuple
+
+from sqlalchemy import func, or_, select, union
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import dialect_insert, primary_session
+from app.models import User, UserFollow
+
+
+class FriendsLeaderboardService:
+    """Service for the follow graph and per-user friends leaderboards"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # user id -> (computed at, limit it was computed with, entries, watched user ids)
+        self._cache: Dict[str, Tuple[float, int, List[Dict[str, Any]], Set[str]]] = {}
+        self._watchers: Dict[str, Set[str]] = {}  # user id -> cached leaderboards watching them
+        self._swept_at = time.monotonic()
+
+    @staticmethod
+    def follow(db: Session, follower_id, followee_id) -> bool:
+        """
+        Follow a user
+
+        Returns:
+            False if already following
+        """
+        insert = dialect_insert(db)
+        result = db.execute(
+            insert(UserFollow)
+            .values(follower_id=follower_id, followee_id=followee_id, created_at=datetime.utcnow())
+            .on_conflict_do_nothing()
+        )
+        db.commit()
+        return result.rowcount > 0
+
+    @staticmethod
+    def unfollow(db: Session, follower_id, followee_id) -> bool:
+        """
+        Stop following a user
+
+        Returns:
+            False if not following
+        """
+        deleted = db.query(UserFollow).filter(
+            UserFollow.follower_id == follower_id,
+            UserFollow.followee_id == followee_id,
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted > 0
+
+    @staticmethod
+    def get_following(db: Session, user_id, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
+        """Users the given user follows"""
+        rows = (
+            db.query(User, UserFollow.created_at)
+            .join(UserFollow, UserFollow.followee_id == User.id)
+            .filter(UserFollow.follower_id == user_id)
+            .order_by(UserFollow.created_at.desc())
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "user_id": str(user.id),
+                "name": user.name,
+                "avatar_url": user.avatar_url,
+                "followed_at": created_at.isoformat() if created_at else None,
+            }
+            for user, created_at in rows
+        ]
+
+    @staticmethod
+    def _compute(db: Session, user_id, limit: int) -> List[Dict[str, Any]]:
+        """Rank a user and everyone they follow (top `limit`) with one indexed query"""
+        members = union(
+            select(UserFollow.followee_id.label("id")).where(UserFollow.follower_id == user_id),
+            select(User.id.label("id")).where(User.id == user_id),
+        ).subquery()
+        rows = (
+            db.query(User.id, User.name, User.avatar_url, User.total_points, User.eco_score, User.level)
+            .join(members, members.c.id == User.id)
+            .filter(or_(User.is_active == True, User.id == user_id))
+            .order_by(func.coalesce(User.total_points, 0).desc(), func.coalesce(User.eco_score, 0.0).desc())
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "user_id": str(row.id),
+                "name": row.name,
+                "avatar_url": row.avatar_url,
+                "eco_score": row.eco_score,
+                "total_points": row.total_points,
+                "level": row.level,
+                "rank": idx + 1,
+                "is_me": str(row.id) == str(user_id),
+            }
+            for idx, row in enumerate(rows)
+        ]
+
+    @staticmethod
+    def _members(db: Session, user_id) -> Set[str]:
+        """The user and everyone they follow (primary key scan)"""
+        followees = db.query(UserFollow.followee_id).filter(UserFollow.follower_id == user_id)
+        return {str(followee_id) for (followee_id,) in followees} | {str(user_id)}
+
+    def _drop(self, key: str) -> None:
+        """Remove a cached leaderboard and its watcher entries (caller holds the lock)"""
+        cached = self._cache.pop(key, None)
+        if cached is None:
+            return
+        for member in cached[3]:
+            watching = self._watchers.get(member)
+            if watching is not None:
+                watching.discard(key)
+                if not watching:
+                    del self._watchers[member]
+
+    def _sweep(self, now: float) -> None:
+        """Drop expired leaderboards, at most once per cache lifetime (caller holds the lock)"""
+        max_age = settings.FRIENDS_LEADERBOARD_CACHE_SECONDS
+        if now - self._swept_at < max_age:
+            return
+        self._swept_at = now
+        for key in [key for key, cached in self._cache.items() if now - cached[0] >= max_age]:
+            self._drop(key)
+
+    def get_leaderboard(self, db: Session, user_id, limit: int = 50) -> List[Dict[str, Any]]:
+        """The user's friends leaderboard (the user plus everyone they follow)"""
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            cached = self._cache.get(key)
+        if cached and now - cached[0] < settings.FRIENDS_LEADERBOARD_CACHE_SECONDS:
+            computed_limit, entries = cached[1], cached[2]
+            # Also serves smaller limits, and larger ones when nothing was cut off
+            if limit <= computed_limit or len(entries) < computed_limit:
+                return entries[:limit]
+
+        # Cached for everyone watching these users: never fill it from a replica
+        with primary_session(db) as primary:
+            entries = self._compute(primary, user_id, limit)
+            members = {entry["user_id"] for entry in entries}
+            if len(entries) >= limit:
+                members |= self._members(primary, user_id)
+        with self._lock:
+            self._drop(key)
+            self._cache[key] = (time.monotonic(), limit, entries, members)
+            for member in members:
+                self._watchers.setdefault(member, set()).add(key)
+        return entries
+
+    def invalidate_user(self, user_id) -> None:
+        """Drop the user's own cached leaderboard (e.g. after they follow/unfollow)"""
+        with self._lock:
+            self._drop(str(user_id))
+
+    def stats_changed(self, user_id) -> None:
+        """Drop every cached leaderboard this user is ranked in (or could climb into)"""
+        key = str(user_id)
+        with self._lock:
+            for follower in list(self._watchers.get(key, ())):
+                self._drop(follower)
+            self._drop(key)
+
+    def clear(self) -> None:
+        """Drop every cached leaderboard (after bulk stats changes)"""
+        with self._lock:
+            self._cache.clear()
+            self._watchers.clear()
+
+
+friends_leaderboard = FriendsLeaderboardService()
@@ -2,14 +2,27 @@
 Gamification service for calculating points, eco scores, and levels
 """
 
+from sqlalchemy import case, func, update
 from sqlalchemy.orm import Session
 from app.models import User, CarbonLog
-from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
 
 class GamificationService:
     """Service for gamification calculations"""
 
+    # Eco score by average daily footprint: (max kg CO2 per active day, score)
+    ECO_SCORE_BANDS = [
+        (10, 95.0),  # Excellent
+        (20, 85.0),  # Very good
+        (30, 75.0),  # Good
+        (40, 65.0),  # Average
+        (50, 50.0),  # Below average
+    ]
+    ECO_SCORE_FLOOR = 40.0  # Needs improvement
+    ECO_SCORE_DEFAULT = 50.0  # No logs yet
+    ECO_SCORE_STREAK_BONUS = 5.0  # Bonus for tracking every day this week
+
     @staticmethod
     def calculate_eco_score(user: User, db: Session) -> float:
         """
@@ -19,44 +32,59 @@ class GamificationService:
         - Achievement milestones
         """
         # Base score starts at 50
-        base_score = 50.0
+        base_score = GamificationService.ECO_SCORE_DEFAULT
         
-        # Get user's carbon logs
-        logs = db.query(CarbonLog).filter(CarbonLog.user_id == user.id).all()
+        # Logged days come from the user's day bitmap (popcount)
+        from app.services.activity_days import ActivityDaysService
+        start_date, day_bits = ActivityDaysService.load(db, user.id)
+        days_active = ActivityDaysService.count_days(start_date, day_bits)
         
-        if not logs:
+        if not days_active:
             return base_score
         
         # Calculate average daily carbon footprint
-        total_carbon = sum(log.carbon_amount_kg for log in logs)
-        days_active = len(set(log.created_at.date() for log in logs))
+        total_carbon = db.query(func.sum(CarbonLog.carbon_amount_kg)).filter(
+            CarbonLog.user_id == user.id
+        ).scalar() or 0
         daily_avg = total_carbon / max(days_active, 1)
         
         # Score calculation: Lower is better
         # Average person emits ~40kg CO2/day
         # Score decreases as carbon increases above baseline
         
-        if daily_avg <= 10:
-            base_score = 95.0  # Excellent
-        elif daily_avg <= 20:
-            base_score = 85.0  # Very good
-        elif daily_avg <= 30:
-            base_score = 75.0  # Good
-        elif daily_avg <= 40:
-            base_score = 65.0  # Average
-        elif daily_avg <= 50:
-            base_score = 50.0  # Below average
-        else:
-            base_score = 40.0  # Needs improvement
+        base_score = GamificationService.ECO_SCORE_FLOOR
+        for max_daily_kg, band_score in GamificationService.ECO_SCORE_BANDS:
+            if daily_avg <= max_daily_kg:
+                base_score = band_score
+                break
         
         # Bonus for consistent tracking
-        recent_logs = [log for log in logs if log.created_at >= datetime.utcnow() - timedelta(days=7)]
-        if len(recent_logs) >= 7:
-            base_score += 5.0  # Bonus for tracking every day this week
+        if ActivityDaysService.count_days(start_date, day_bits, 7) >= 7:
+            base_score += GamificationService.ECO_SCORE_STREAK_BONUS
         
         # Cap score at 100
         return min(base_score, 100.0)
 
+    @staticmethod
+    def eco_score_expression(total_carbon, days_active, recent_days):
+        """
+        SQL equivalent of calculate_eco_score over aggregated log columns,
+        for scoring many users in one statement
+        """
+        daily_avg = total_carbon / days_active
+        band = case(
+            *[(daily_avg <= max_daily_kg, band_score)
+              for max_daily_kg, band_score in GamificationService.ECO_SCORE_BANDS],
+            else_=GamificationService.ECO_SCORE_FLOOR,
+        )
+        bonus = case((recent_days >= 7, GamificationService.ECO_SCORE_STREAK_BONUS), else_=0.0)
+        score = band + bonus
+        return case(
+            (func.coalesce(days_active, 0) == 0, GamificationService.ECO_SCORE_DEFAULT),
+            (score > 100.0, 100.0),
+            else_=score,
+        )
+
     @staticmethod
     def award_points_for_log(carbon_amount_kg: float, category: str) -> int:
         """
@@ -92,27 +120,146 @@ class GamificationService:
         return max(1, (total_points // 100) + 1)
 
     @staticmethod
-    def update_user_stats(user: User, points_to_add: int, db: Session) -> dict:
-        """Update user's stats after adding a carbon log"""
-        # Award points
-        user.total_points += points_to_add
-        
-        # Calculate new level
-        user.level = GamificationService.calculate_level(user.total_points)
-        
-        # Calculate new eco score
-        user.eco_score = GamificationService.calculate_eco_score(user, db)
-        
-        db.commit()
-        db.refresh(user)
-        
-        return {
-            "total_points": user.total_points,
-            "level": user.level,
-            "eco_score": round(user.eco_score, 1),
-        }
+    def level_expression(points):
+        """SQL equivalent of calculate_level, for use inside UPDATE statements"""
+        return case((points < 100, 1), else_=points // 100 + 1)
 
+    @staticmethod
+    def add_points(
+        db: Session,
+        user_id,
+        delta: int,
+        minimum: Optional[int] = None,
+        **values,
+    ) -> Tuple[int, int, int]:
+        """
+        Atomically add delta to a user's points and recompute their level
+        Runs a single UPDATE ... RETURNING, so concurrent writes for the same
+        user can't lose an update. Does not commit.
 
+        Args:
+            db: Database session
+            user_id: User to update
+            delta: Points to add (negative to remove)
+            minimum: Optional floor for the new total
+            **values: Other columns to set in the same statement
 
+        Returns:
+            The new (total_points, level) and the delta actually applied,
+            which differs from delta when the floor was hit
+        """
+        def increment(amount: int, **extra) -> Tuple[int, int]:
+            new_points = func.coalesce(User.total_points, 0) + amount
+            stmt = (
+                update(User)
+                .where(User.id == user_id)
+                .values(
+                    total_points=new_points,
+                    level=GamificationService.level_expression(new_points),
+                    **extra,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if db.bind.dialect.update_returning:
+                row = db.execute(stmt.returning(User.total_points, User.level)).one()
+            else:
+                # SQLite < 3.35 has no RETURNING; the UPDATE itself is still atomic
+                db.execute(stmt)
+                row = db.query(User.total_points, User.level).filter(User.id == user_id).one()
+            return row[0], row[1]
 
+        total_points, level = increment(delta, **values)
+        applied = delta
+        if minimum is not None and total_points < minimum:
+            # Raise it back to the floor in a second increment: the row stays
+            # locked by the first one, and the returned totals give the exact
+            # amount applied (so the points ledger can record it)
+            correction = minimum - total_points
+            total_points, level = increment(correction)
+            applied += correction
+        return total_points, level, applied
 
+    @staticmethod
+    def apply_points(
+        db: Session,
+        user_id,
+        delta: int,
+        reason: str,
+        log_id=None,
+        **values,
+    ) -> dict:
+        """
+        Record a points change in the ledger, apply it atomically and award
+        any badges it crosses. Does not commit.
+        """
+        from app.services.points_ledger import PointsLedgerService
+        from app.services.badge_engine import badge_engine
+        PointsLedgerService.record(db, user_id, delta, reason, log_id=log_id)
+        total_points, level, _ = GamificationService.add_points(db, user_id, delta, **values)
+        
+        # Old total is derived from the returned one, so badges stay correct
+        # even if another request changed the points in between
+        new_badges = badge_engine.award_crossed(db, user_id, total_points - delta, total_points)
+        
+        return {
+            "total_points": total_points,
+            "level": level,
+            "new_badges": new_badges,
+        }
+
+    @staticmethod
+    def update_user_stats(
+        user: User,
+        points_to_add: int,
+        db: Session,
+        reason: str = "carbon_log",
+        log_id=None,
+    ) -> dict:
+        """Update user's stats after adding a carbon log"""
+        user_id = user.id
+        stats, eco_score = GamificationService.apply_user_stats(
+            user, points_to_add, db, reason=reason, log_id=log_id
+        )
+        db.commit()
+        GamificationService.publish_user_stats(db, user_id, stats["total_points"], eco_score)
+        return stats
+    
+    @staticmethod
+    def apply_user_stats(
+        user: User,
+        points_to_add: int,
+        db: Session,
+        reason: str = "carbon_log",
+        log_id=None,
+    ) -> Tuple[dict, float]:
+        """
+        Apply a carbon log's points and the recomputed eco score. Does not
+        commit - call publish_user_stats once the transaction has committed.
+        
+        Returns:
+            (stats for the API response, unrounded eco score)
+        """
+        # Eco score is derived from the logs, so it can be computed up front
+        # and written in the same statement as the points
+        eco_score = GamificationService.calculate_eco_score(user, db)
+        
+        stats = GamificationService.apply_points(
+            db, user.id, points_to_add, reason, log_id=log_id, eco_score=eco_score
+        )
+        return {
+            "total_points": stats["total_points"],
+            "level": stats["level"],
+            "eco_score": round(eco_score, 1),
+            "new_badges": stats["new_badges"],
+        }, eco_score
+    
+    @staticmethod
+    def publish_user_stats(db: Session, user_id, total_points: int, eco_score: float) -> None:
+        """Refresh caches and rankings after committed stats changes"""
+        # Cached copies of the user row now have stale stats
+        from app.auth import auth_cache
+        auth_cache.invalidate_user(user_id)
+        
+        # Keep the ranked leaderboard in sync
+        from app.services.leaderboard import leaderboard_service
+        leaderboard_service.update_entry(user_id, total_points, eco_score, db)
@@ -0,0 +1,339 @@
+"""
+Ranked leaderboard structure
+Keeps active users ordered by (total_points, eco_score) so top-N, "my rank"
+and "users around me" are served without sorting the users table.
+Uses a Redis sorted set when REDIS_URL is reachable, otherwise (or once
+Redis fails) an in-process sorted list. The shared set is built from the
+users table only when it is missing or after a bulk recompute; otherwise
+it is kept up to date by every worker's updates.
+"""
+
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import primary_session
+from app.models import User
+from app.services.friends_leaderboard import friends_leaderboard
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional for local development
+    redis = None
+
+# Errors that make the leaderboard give up on Redis for the local structure
+REDIS_ERRORS = (redis.RedisError,) if redis is not None else ()
+
+
+class LocalLeaderboard:
+    """In-process leaderboard backed by a sorted list (O(log n) updates and ranks)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Sort keys are (-points, -eco_score, user_id) so rank 1 is index 0
+        self._keys: SortedList = SortedList()
+        self._by_user: Dict[str, Tuple[int, float, str]] = {}
+
+    def is_loaded(self) -> bool:
+        return True
+
+    def load(self, entries: List[Tuple[str, int, float]], replace: bool = True) -> bool:
+        """Replace the contents with (user_id, points, eco_score) entries (always: the copy is this worker's own)"""
+        keys = {
+            user_id: (-(points or 0), -(eco_score or 0.0), user_id)
+            for user_id, points, eco_score in entries
+        }
+        with self._lock:
+            self._by_user = keys
+            self._keys = SortedList(keys.values())
+        return True
+
+    def update(self, user_id: str, points: int, eco_score: float) -> None:
+        """Insert or move a user"""
+        key = (-(points or 0), -(eco_score or 0.0), user_id)
+        with self._lock:
+            old_key = self._by_user.get(user_id)
+            if old_key == key:
+                return
+            if old_key is not None:
+                self._keys.remove(old_key)
+            self._keys.add(key)
+            self._by_user[user_id] = key
+
+    def remove(self, user_id: str) -> None:
+        """Remove a user (e.g. deactivated)"""
+        with self._lock:
+            old_key = self._by_user.pop(user_id, None)
+            if old_key is not None:
+                self._keys.remove(old_key)
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """1-based rank of a user, None if not ranked"""
+        with self._lock:
+            key = self._by_user.get(user_id)
+            if key is None:
+                return None
+            return self._keys.bisect_left(key) + 1
+
+    def range(self, start: int, stop: int) -> List[str]:
+        """User ids ranked start+1 .. stop (0-based, stop exclusive)"""
+        with self._lock:
+            return [key[2] for key in self._keys.islice(max(start, 0), max(stop, 0))]
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._keys)
+
+
+class RedisLeaderboard:
+    """Leaderboard backed by a Redis sorted set shared by all API workers"""
+
+    # Points and eco score are packed into one sorted-set score;
+    # eco_score (0-100) is kept to 3 decimals below the points
+    ECO_SCALE = 1000
+    POINTS_SCALE = 1_000_000
+    # How long one worker may hold the rebuild lock
+    LOCK_SECONDS = 30
+
+    def __init__(self, client, key: str):
+        self._client = client
+        self._key = key
+
+    @classmethod
+    def _score(cls, points: int, eco_score: float) -> float:
+        return (points or 0) * cls.POINTS_SCALE + round((eco_score or 0.0) * cls.ECO_SCALE)
+
+    def is_loaded(self) -> bool:
+        return bool(self._client.exists(self._key))
+
+    def load(self, entries: List[Tuple[str, int, float]], replace: bool = False) -> bool:
+        """
+        Build the shared set from (user_id, points, eco_score) entries
+        Only one worker builds at a time (lock key). The set is written under
+        a temporary key and renamed into place, so it is never missing or
+        half-built for readers. Unless replace is set, scores already in the
+        shared set win over the entries: updates from other workers may be
+        newer than this snapshot.
+
+        Returns:
+            False if another worker holds the lock (nothing was done)
+        """
+        lock = self._client.lock(f"{self._key}:lock", timeout=self.LOCK_SECONDS, blocking=False)
+        if not lock.acquire():
+            return False
+        try:
+            if not replace and self.is_loaded():
+                return True
+            scores = {
+                user_id: self._score(points, eco_score)
+                for user_id, points, eco_score in entries
+            }
+            if not scores:
+                if replace:
+                    self._client.delete(self._key)
+                return True
+
+            temp_key = f"{self._key}:build:{uuid.uuid4().hex}"
+            pipe = self._client.pipeline()
+            pipe.zadd(temp_key, scores)
+            if replace:
+                pipe.rename(temp_key, self._key)
+            else:
+                pipe.renamenx(temp_key, self._key)
+            if not pipe.execute()[-1]:
+                # Another worker's update created the set meanwhile: keep its
+                # scores and only add the users it doesn't have yet
+                pipe = self._client.pipeline()
+                pipe.zadd(self._key, scores, nx=True)
+                pipe.delete(temp_key)
+                pipe.execute()
+            return True
+        finally:
+            try:
+                lock.release()
+            except redis.exceptions.LockError:
+                pass  # Held past LOCK_SECONDS; the rebuild is done either way
+
+    def update(self, user_id: str, points: int, eco_score: float) -> None:
+        self._client.zadd(self._key, {user_id: self._score(points, eco_score)})
+
+    def remove(self, user_id: str) -> None:
+        self._client.zrem(self._key, user_id)
+
+    def rank(self, user_id: str) -> Optional[int]:
+        rank = self._client.zrevrank(self._key, user_id)
+        return rank + 1 if rank is not None else None
+
+    def range(self, start: int, stop: int) -> List[str]:
+        if stop <= start:
+            return []
+        members = self._client.zrevrange(self._key, max(start, 0), stop - 1)
+        return [m.decode() if isinstance(m, bytes) else m for m in members]
+
+    def size(self) -> int:
+        return self._client.zcard(self._key)
+
+
+class LeaderboardService:
+    """Service for ranked leaderboard queries and updates"""
+
+    def __init__(self):
+        self._backend = None
+        self._loaded_at = 0.0
+        self._replace = False
+        self._lock = threading.Lock()
+
+    def _create_backend(self):
+        """Use Redis when configured and reachable, otherwise the local structure"""
+        if settings.LEADERBOARD_BACKEND != "local" and redis is not None and settings.REDIS_URL:
+            try:
+                client = redis.Redis.from_url(
+                    settings.REDIS_URL,
+                    socket_connect_timeout=0.5,
+                    socket_timeout=0.5,
+                )
+                client.ping()
+                return RedisLeaderboard(client, settings.LEADERBOARD_REDIS_KEY)
+            except Exception as e:
+                print(f"⚠️ Leaderboard: Redis unavailable ({e}), using in-process fallback")
+        return LocalLeaderboard()
+
+    def _get_backend(self, db: Session):
+        """Get the backend, (re)loading it from the users table when stale"""
+        with self._lock:
+            if self._backend is None:
+                self._backend = self._create_backend()
+                self._loaded_at = 0.0
+
+            # Each worker keeps its own local copy, so resync it periodically
+            # to pick up updates made by other processes
+            refresh = settings.LEADERBOARD_REFRESH_SECONDS
+            stale = isinstance(self._backend, LocalLeaderboard) and (
+                time.monotonic() - self._loaded_at > refresh
+            )
+            if not self._loaded_at or stale:
+                # The local copy is rebuilt from the users table; the shared set
+                # only when missing or after invalidate(), since other workers'
+                # updates may be newer than this worker's snapshot
+                replace = self._replace or isinstance(self._backend, LocalLeaderboard)
+                if replace or not self._backend.is_loaded():
+                    # Shared by every reader: always load from the primary
+                    with primary_session(db) as primary:
+                        if self.reload(primary, self._backend, replace):
+                            self._replace = False
+                # Another worker may still be building the shared set: check again next time
+                if self._backend.is_loaded():
+                    self._loaded_at = time.monotonic()
+            return self._backend
+
+    @staticmethod
+    def reload(db: Session, backend, replace: bool = True) -> bool:
+        """Load every active user into the backend (False if another worker is already doing it)"""
+        rows = db.query(User.id, User.total_points, User.eco_score).filter(
+            User.is_active == True
+        ).all()
+        return backend.load([(str(user_id), points, eco_score) for user_id, points, eco_score in rows], replace)
+
+    def _fall_back(self, error: Exception) -> None:
+        """Switch this worker to the local structure after a Redis failure (loaded on next use)"""
+        with self._lock:
+            if isinstance(self._backend, RedisLeaderboard):
+                print(f"⚠️ Leaderboard: Redis failed ({error}), using in-process fallback")
+                self._backend = LocalLeaderboard()
+                self._loaded_at = 0.0
+
+    def _call(self, db: Session, operation: Callable[[Any], Any]) -> Any:
+        """Run operation(backend), retrying on the local structure if Redis fails"""
+        try:
+            return operation(self._get_backend(db))
+        except REDIS_ERRORS as e:
+            self._fall_back(e)
+            return operation(self._get_backend(db))
+
+    def invalidate(self) -> None:
+        """Rebuild from the users table on next use (after bulk stats changes)"""
+        self._replace = True
+        self._loaded_at = 0.0
+
+    def update_user(self, user: User, db: Session) -> None:
+        """Reflect a user's current stats (or deactivation) in the leaderboard"""
+        if user.is_active:
+            self.update_entry(user.id, user.total_points, user.eco_score, db)
+        else:
+            self.remove_user(user.id, db)
+
+    def update_entry(self, user_id, points: int, eco_score: float, db: Session) -> None:
+        """Move an active user to the given points and eco score"""
+        friends_leaderboard.stats_changed(user_id)
+        try:
+            self._call(db, lambda backend: backend.update(str(user_id), points, eco_score))
+        except Exception as e:
+            # The leaderboard is derived data - never fail the write that triggered this
+            print(f"⚠️ Leaderboard update failed: {e}")
+            self._loaded_at = 0.0
+
+    def remove_user(self, user_id: str, db: Session) -> None:
+        """Drop a user from the leaderboard"""
+        friends_leaderboard.stats_changed(user_id)
+        try:
+            self._call(db, lambda backend: backend.remove(str(user_id)))
+        except Exception as e:
+            print(f"⚠️ Leaderboard update failed: {e}")
+            self._loaded_at = 0.0
+
+    @staticmethod
+    def _entries(user_ids: List[str], first_rank: int, db: Session) -> List[Dict[str, Any]]:
+        """Load display fields for ranked user ids by primary key"""
+        if not user_ids:
+            return []
+        users = {
+            str(user.id): user
+            for user in db.query(User).filter(User.id.in_(user_ids)).all()
+        }
+        entries = []
+        for offset, user_id in enumerate(user_ids):
+            user = users.get(user_id)
+            if user is None:
+                continue
+            entries.append({
+                "user_id": user_id,
+                "name": user.name,
+                "avatar_url": user.avatar_url,
+                "eco_score": user.eco_score,
+                "total_points": user.total_points,
+                "level": user.level,
+                "rank": first_rank + offset,
+            })
+        return entries
+
+    def top(self, db: Session, limit: int = 50) -> List[Dict[str, Any]]:
+        """Top-N active users"""
+        user_ids = self._call(db, lambda backend: backend.range(0, limit))
+        return self._entries(user_ids, 1, db)
+
+    def rank_of(self, user_id: str, db: Session) -> Dict[str, Any]:
+        """A user's rank and the number of ranked users"""
+        return self._call(db, lambda backend: {
+            "rank": backend.rank(str(user_id)),
+            "total_users": backend.size(),
+        })
+
+    def around(self, user_id: str, db: Session, radius: int = 5) -> List[Dict[str, Any]]:
+        """Users ranked within radius places of a user (including the user)"""
+        def ranked_around(backend) -> Tuple[int, List[str]]:
+            rank = backend.rank(str(user_id))
+            if rank is None:
+                return 0, []
+            start = max(rank - 1 - radius, 0)
+            return start, backend.range(start, rank + radius)
+
+        start, user_ids = self._call(db, ranked_around)
+        return self._entries(user_ids, start + 1, db)
+
+
+leaderboard_service = LeaderboardService()
@@ -0,0 +1,116 @@
+"""
+Carbon log metadata queries
+CarbonLog.meta_data is JSONB on PostgreSQL, with a GIN index and expression
+indexes on the common keys, and JSON text on SQLite (read with json_extract).
+These helpers pull metadata values out in SQL, using the exact expressions
+the PostgreSQL indexes were built on, so analytics aggregate in the database
+instead of loading and parsing every row.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Float, case, func, literal_column
+from sqlalchemy.orm import Session
+
+from app.models import CarbonLog
+
+# Keys with an expression index on PostgreSQL (see the carbon_logs JSONB migration)
+NUMERIC_KEYS = ("distance_km", "quantity_kg", "amount")
+TEXT_KEYS = ("unit",)
+
+
+def _inline(key: str, template: str = "'{}'"):
+    """
+    Inline the key as an SQL literal (bound parameters would keep PostgreSQL
+    from matching the index expression); keys are identifiers from code
+    """
+    if not key.isidentifier():
+        raise ValueError(f"Invalid metadata key: {key!r}")
+    return literal_column(template.format(key))
+
+
+class LogMetadataService:
+    """SQL expressions and aggregates over carbon log metadata"""
+
+    @staticmethod
+    def number(db: Session, key: str):
+        """Numeric value of a metadata key; NULL when missing or not a JSON number"""
+        if db.bind.dialect.name == "postgresql":
+            return case(
+                (func.jsonb_typeof(CarbonLog.meta_data.op("->")(_inline(key))) == literal_column("'number'"),
+                 CarbonLog.meta_data.op("->>")(_inline(key)).cast(Float)),
+            )
+        path = _inline(key, "'$.{}'")
+        return case(
+            (func.json_type(CarbonLog.meta_data, path).in_([literal_column("'integer'"), literal_column("'real'")]),
+             func.json_extract(CarbonLog.meta_data, path)),
+        )
+
+    @staticmethod
+    def text(db: Session, key: str):
+        """Text value of a metadata key (NULL when missing)"""
+        if db.bind.dialect.name == "postgresql":
+            return CarbonLog.meta_data.op("->>")(_inline(key))
+        return func.json_extract(CarbonLog.meta_data, _inline(key, "'$.{}'"))
+
+    @staticmethod
+    def activity_totals(
+        db: Session,
+        since: Optional[datetime] = None,
+        user_id=None,
+        keys=NUMERIC_KEYS,
+    ) -> List[Dict[str, Any]]:
+        """
+        Per category, activity and unit: number of logs, kg CO2 and the sum of
+        each numeric metadata key, for one user or (user_id None) everyone
+
+        Returns:
+            Rows like {"category", "activity", "unit", "count", "carbon_kg", "distance_km", ...}
+        """
+        unit = LogMetadataService.text(db, "unit")
+        columns = [
+            CarbonLog.category,
+            CarbonLog.activity,
+            unit.label("unit"),
+            func.count(CarbonLog.id).label("log_count"),
+            func.sum(CarbonLog.carbon_amount_kg).label("carbon_kg"),
+        ]
+        columns += [func.sum(LogMetadataService.number(db, key)).label(key) for key in keys]
+        query = db.query(*columns)
+        if user_id is not None:
+            query = query.filter(CarbonLog.user_id == user_id)
+        if since is not None:
+            query = query.filter(CarbonLog.created_at >= since)
+        rows = query.group_by(CarbonLog.category, CarbonLog.activity, unit).all()
+        return [
+            {
+                "category": row.category,
+                "activity": row.activity,
+                "unit": row.unit,
+                "count": row.log_count,
+                "carbon_kg": float(row.carbon_kg or 0),
+                **{key: float(getattr(row, key) or 0) for key in keys},
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def total_by_user(
+        db: Session,
+        key: str,
+        activities: Optional[List[str]] = None,
+        since: Optional[datetime] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """Users with the largest sum of a numeric metadata key (e.g. car km), largest first"""
+        value = func.sum(LogMetadataService.number(db, key))
+        query = db.query(CarbonLog.user_id, value.label("total")).filter(
+            LogMetadataService.number(db, key).isnot(None)
+        )
+        if activities:
+            query = query.filter(CarbonLog.activity.in_(activities))
+        if since is not None:
+            query = query.filter(CarbonLog.created_at >= since)
+        rows = query.group_by(CarbonLog.user_id).order_by(value.desc()).limit(limit).all()
+        return [{"user_id": str(row.user_id), "total": round(float(row.total), 2)} for row in rows]
@@ -0,0 +1,114 @@
+"""
+carbon_logs partition maintenance (PostgreSQL)
+The partition migration splits carbon_logs into monthly range partitions on
+created_at (carbon_logs_pYYYYMM), so time-window queries only touch the
+months they cover. This keeps partitions created ahead of time (inserts past
+the last one would pile up in carbon_logs_default) and applies the retention
+policy: months older than the retention window are detached and moved to the
+archive schema, or dropped.
+"""
+
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.config import settings
+
+PARENT = "carbon_logs"
+PARTITION_NAME = re.compile(r"^carbon_logs_p(\d{4})(\d{2})$")
+RETENTION_ACTIONS = ("archive", "drop")
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class LogPartitionService:
+    """Creates upcoming carbon_logs partitions and retires old ones"""
+
+    @staticmethod
+    def is_partitioned(engine) -> bool:
+        """Whether carbon_logs is a partitioned table (PostgreSQL after the partition migration)"""
+        if engine.dialect.name != "postgresql":
+            return False
+        with engine.connect() as conn:
+            return conn.execute(text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:parent))"
+            ), {"parent": PARENT}).scalar()
+
+    @staticmethod
+    def partitions(engine) -> List[Dict[str, Any]]:
+        """Attached partitions, oldest first: name, month (None for the default partition) and rows (estimate)"""
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT c.relname, c.reltuples FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(:parent)"
+            ), {"parent": PARENT}).all()
+        partitions = []
+        for name, reltuples in rows:
+            match = PARTITION_NAME.match(name)
+            month = date(int(match.group(1)), int(match.group(2)), 1) if match else None
+            partitions.append({"name": name, "month": month, "rows": max(int(reltuples), 0)})
+        return sorted(partitions, key=lambda p: (p["month"] is None, p["month"] or date.min))
+
+    @staticmethod
+    def ensure_partitions(engine, months_ahead: Optional[int] = None) -> int:
+        """
+        Create the partitions for this month through months_ahead months from now
+
+        Returns:
+            Number of partitions created
+        """
+        if months_ahead is None:
+            months_ahead = settings.CARBON_LOG_PARTITION_MONTHS_AHEAD
+        this_month = datetime.utcnow().date().replace(day=1)
+        with engine.begin() as conn:
+            return conn.execute(
+                text("SELECT carbon_logs_ensure_partitions(:first_month, :last_month)"),
+                {"first_month": this_month, "last_month": _add_months(this_month, months_ahead)},
+            ).scalar()
+
+    @staticmethod
+    def expired_partitions(engine, retention_months: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Monthly partitions entirely older than the retention window (none when retention is 0)"""
+        if retention_months is None:
+            retention_months = settings.CARBON_LOG_RETENTION_MONTHS
+        if retention_months <= 0:
+            return []
+        # Keep the current month plus retention_months full months before it
+        cutoff = _add_months(datetime.utcnow().date().replace(day=1), -retention_months)
+        return [p for p in LogPartitionService.partitions(engine) if p["month"] is not None and p["month"] < cutoff]
+
+    @staticmethod
+    def apply_retention(
+        engine,
+        retention_months: Optional[int] = None,
+        action: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Detach the expired partitions, then move them to the archive schema or drop them
+
+        Returns:
+            Names of the partitions retired
+        """
+        action = action or settings.CARBON_LOG_RETENTION_ACTION
+        if action not in RETENTION_ACTIONS:
+            raise ValueError(f"Retention action must be one of: {', '.join(RETENTION_ACTIONS)}")
+        schema = settings.CARBON_LOG_ARCHIVE_SCHEMA
+
+        retired = []
+        for partition in LogPartitionService.expired_partitions(engine, retention_months):
+            name = partition["name"]
+            # One transaction per partition: the parent is locked only briefly each time
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f'ALTER TABLE "{PARENT}" DETACH PARTITION "{name}"')
+                if action == "archive":
+                    conn.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+                    conn.exec_driver_sql(f'ALTER TABLE "{name}" SET SCHEMA "{schema}"')
+                else:
+                    conn.exec_driver_sql(f'DROP TABLE "{name}"')
+            retired.append(name)
+        return retired
@@ -0,0 +1,183 @@
+"""
+Points ledger service
+Append-only record of every points change, with incrementally maintained
+weekly and monthly totals for time-windowed leaderboards
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import dialect_insert
+from app.models import PointsLedger, PointsPeriodTotal, User
+
+PERIOD_TYPES = ("week", "month")
+
+
+class PointsLedgerService:
+    """Service for recording points changes and reading period totals"""
+
+    @staticmethod
+    def period_start(period_type: str, when: datetime) -> date:
+        """Start date of the week (Monday) or month containing `when`"""
+        day = when.date()
+        if period_type == "week":
+            return day - timedelta(days=day.weekday())
+        return day.replace(day=1)
+
+    @staticmethod
+    def _add_to_period_totals(db: Session, user_id, delta: int, when: datetime) -> None:
+        """Atomically add delta to the user's week and month totals"""
+        insert = dialect_insert(db)
+        for period_type in PERIOD_TYPES:
+            stmt = insert(PointsPeriodTotal).values(
+                period_type=period_type,
+                period_start=PointsLedgerService.period_start(period_type, when),
+                user_id=user_id,
+                points=delta,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["period_type", "period_start", "user_id"],
+                set_={"points": PointsPeriodTotal.points + delta},
+            )
+            db.execute(stmt)
+
+    @staticmethod
+    def record(
+        db: Session,
+        user_id,
+        delta: int,
+        reason: str,
+        log_id=None,
+        when: Optional[datetime] = None,
+    ) -> PointsLedger:
+        """
+        Append a ledger entry and update period totals
+        Does not commit - the caller's transaction owns the write
+
+        Args:
+            db: Database session
+            user_id: User whose points changed
+            delta: Points added (negative to remove)
+            reason: Why the points changed (carbon_log, log_deleted, ...)
+            log_id: Carbon log the change belongs to, if any
+            when: Timestamp of the change (defaults to now)
+        """
+        when = when or datetime.utcnow()
+        entry = PointsLedger(
+            user_id=user_id,
+            delta=delta,
+            reason=reason,
+            log_id=log_id,
+            created_at=when,
+        )
+        db.add(entry)
+        if delta:
+            PointsLedgerService._add_to_period_totals(db, user_id, delta, when)
+        return entry
+
+    @staticmethod
+    def reverse_log(db: Session, log_id) -> Dict[Any, int]:
+        """
+        Remove all points awarded for a carbon log from the users' totals
+        (never below zero) and record what was actually removed. Each
+        reversal is charged to the period the points were earned in, so
+        weekly and monthly leaderboards drop them too. Does not commit.
+
+        Returns:
+            Points removed per user id
+        """
+        from app.services.gamification import GamificationService
+
+        entries = db.query(PointsLedger).filter(PointsLedger.log_id == log_id).all()
+        if any(entry.reason == "log_deleted" for entry in entries):
+            return {}
+
+        by_user: Dict[Any, List[PointsLedger]] = {}
+        for entry in entries:
+            if entry.delta != 0:
+                by_user.setdefault(entry.user_id, []).append(entry)
+
+        reversed_points: Dict[Any, int] = {}
+        for user_id, user_entries in by_user.items():
+            awarded = sum(entry.delta for entry in user_entries)
+            _, _, applied = GamificationService.add_points(db, user_id, -awarded, minimum=0)
+
+            # Spread what was removed over the entries (all of each, unless the
+            # floor cut it short) so the ledger sums to users.total_points
+            remaining = -applied
+            for index, entry in enumerate(user_entries):
+                part = remaining if index == len(user_entries) - 1 else min(entry.delta, remaining)
+                remaining -= part
+                if part == 0:
+                    continue
+                db.add(PointsLedger(
+                    user_id=user_id,
+                    delta=-part,
+                    reason="log_deleted",
+                    log_id=log_id,
+                ))
+                PointsLedgerService._add_to_period_totals(
+                    db, user_id, -part, entry.created_at or datetime.utcnow()
+                )
+            reversed_points[user_id] = -applied
+
+        return reversed_points
+
+    @staticmethod
+    def get_period_leaderboard(
+        db: Session,
+        period_type: str,
+        limit: int = 50,
+        when: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top active users by points earned in the current week or month"""
+        period_start = PointsLedgerService.period_start(period_type, when or datetime.utcnow())
+        rows = (
+            db.query(User, PointsPeriodTotal.points)
+            .join(PointsPeriodTotal, PointsPeriodTotal.user_id == User.id)
+            .filter(
+                PointsPeriodTotal.period_type == period_type,
+                PointsPeriodTotal.period_start == period_start,
+                User.is_active == True,
+            )
+            .order_by(PointsPeriodTotal.points.desc(), User.eco_score.desc())
+            .limit(limit)
+            .all()
+        )
+
+        return [
+            {
+                "user_id": str(user.id),
+                "name": user.name,
+                "avatar_url": user.avatar_url,
+                "eco_score": user.eco_score,
+                "total_points": user.total_points,
+                "period_points": points,
+                "level": user.level,
+                "rank": idx + 1,
+            }
+            for idx, (user, points) in enumerate(rows)
+        ]
+
+    @staticmethod
+    def get_user_history(db: Session, user_id, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent ledger entries for a user"""
+        entries = (
+            db.query(PointsLedger)
+            .filter(PointsLedger.user_id == user_id)
+            .order_by(PointsLedger.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+        return [
+            {
+                "id": str(entry.id),
+                "delta": entry.delta,
+                "reason": entry.reason,
+                "log_id": str(entry.log_id) if entry.log_id else None,
+                "created_at": entry.created_at.isoformat() if entry.created_at else None,
+            }
+            for entry in entries
+        ]
@@ -0,0 +1,223 @@
+"""
+Token-bucket rate limiting for authentication endpoints
+Buckets live in Redis when REDIS_URL is reachable (shared by all API
+workers), otherwise in process memory
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional for local development
+    redis = None
+
+
+class LocalTokenBuckets:
+    """In-process token buckets"""
+
+    # Buckets that have refilled are dropped by a sweep at most this often; past
+    # the hard cap the least recently used buckets are evicted (keys include
+    # client-chosen emails, so the map must stay bounded)
+    PRUNE_INTERVAL_SECONDS = 60
+    MAX_BUCKETS = 100000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> (tokens, updated_at, full_at), least recently used first
+        self._buckets: "OrderedDict[str, Tuple[float, float, float]]" = OrderedDict()
+        self._pruned_at = time.monotonic()
+
+    def take(self, key: str, capacity: int, refill_per_second: float) -> Tuple[bool, float]:
+        """
+        Take one token from a bucket
+
+        Returns:
+            (allowed, seconds until a token is available)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.get(key, (float(capacity), now, now))
+            tokens = min(float(capacity), tokens + (now - updated_at) * refill_per_second)
+            if tokens >= 1:
+                tokens -= 1
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (1 - tokens) / refill_per_second
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_per_second)
+            self._buckets.move_to_end(key)
+
+            if now - self._pruned_at >= self.PRUNE_INTERVAL_SECONDS:
+                self._prune(now)
+            while len(self._buckets) > self.MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def _prune(self, now: float) -> None:
+        """Drop buckets that are full again (they behave like missing ones)"""
+        self._pruned_at = now
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] <= now]:
+            del self._buckets[key]
+
+
+class RedisTokenBuckets:
+    """Token buckets in Redis, updated atomically by a Lua script"""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1])
+    local ts = tonumber(bucket[2])
+    if tokens == nil then
+        tokens = capacity
+        ts = now
+    end
+    tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    else
+        retry_after = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+    return {allowed, tostring(retry_after)}
+    """
+
+    def __init__(self, client, prefix: str):
+        self._client = client
+        self._prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+
+    def take(self, key: str, capacity: int, refill_per_second: float) -> Tuple[bool, float]:
+        allowed, retry_after = self._script(
+            keys=[f"{self._prefix}:{key}"],
+            args=[capacity, refill_per_second, time.time()],
+        )
+        return bool(int(allowed)), float(retry_after)
+
+
+class RateLimiter:
+    """Login/registration throttling with hit metrics"""
+
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, int]] = {}
+
+    def _create_backend(self):
+        """Use Redis when configured and reachable, otherwise local buckets"""
+        if settings.RATE_LIMIT_BACKEND != "local" and redis is not None and settings.REDIS_URL:
+            try:
+                client = redis.Redis.from_url(
+                    settings.REDIS_URL,
+                    socket_connect_timeout=0.5,
+                    socket_timeout=0.5,
+                )
+                client.ping()
+                return RedisTokenBuckets(client, settings.RATE_LIMIT_REDIS_PREFIX)
+            except Exception as e:
+                print(f"⚠️ Rate limiter: Redis unavailable ({e}), using in-process buckets")
+        return LocalTokenBuckets()
+
+    def _get_backend(self):
+        with self._lock:
+            if self._backend is None:
+                self._backend = self._create_backend()
+            return self._backend
+
+    def _record(self, scope: str, allowed: bool) -> None:
+        with self._lock:
+            counters = self._metrics.setdefault(scope, {"allowed": 0, "rejected": 0, "errors": 0})
+            counters["allowed" if allowed else "rejected"] += 1
+
+    def hit(self, scope: str, key: str, capacity: int, per_minute: float) -> Tuple[bool, float]:
+        """
+        Count a request against a bucket
+        Fails open if the backend errors - throttling must not lock users out.
+
+        Returns:
+            (allowed, seconds until a retry can succeed)
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return True, 0.0
+        try:
+            allowed, retry_after = self._get_backend().take(
+                f"{scope}:{key}", capacity, per_minute / 60.0
+            )
+        except Exception as e:
+            print(f"⚠️ Rate limiter error: {e}")
+            with self._lock:
+                counters = self._metrics.setdefault(scope, {"allowed": 0, "rejected": 0, "errors": 0})
+                counters["errors"] += 1
+                self._backend = None
+            return True, 0.0
+        self._record(scope, allowed)
+        return allowed, retry_after
+
+    def check_login(self, ip: Optional[str], email: Optional[str]) -> Optional[float]:
+        """
+        Check login buckets for the client IP and the target email
+
+        Returns:
+            None if allowed, otherwise seconds to wait
+        """
+        if ip:
+            allowed, retry_after = self.hit(
+                "login_ip", ip,
+                settings.LOGIN_RATE_LIMIT_IP_BURST, settings.LOGIN_RATE_LIMIT_IP_PER_MINUTE,
+            )
+            if not allowed:
+                return retry_after
+        if email:
+            allowed, retry_after = self.hit(
+                "login_email", email,
+                settings.LOGIN_RATE_LIMIT_EMAIL_BURST, settings.LOGIN_RATE_LIMIT_EMAIL_PER_MINUTE,
+            )
+            if not allowed:
+                return retry_after
+        return None
+
+    def check_register(self, ip: Optional[str]) -> Optional[float]:
+        """Check the registration bucket for the client IP"""
+        if not ip:
+            return None
+        allowed, retry_after = self.hit(
+            "register_ip", ip,
+            settings.REGISTER_RATE_LIMIT_IP_BURST, settings.REGISTER_RATE_LIMIT_IP_PER_MINUTE,
+        )
+        return None if allowed else retry_after
+
+    def check_refresh(self, ip: Optional[str]) -> Optional[float]:
+        """Check the token refresh bucket for the client IP"""
+        if not ip:
+            return None
+        allowed, retry_after = self.hit(
+            "refresh_ip", ip,
+            settings.REFRESH_RATE_LIMIT_IP_BURST, settings.REFRESH_RATE_LIMIT_IP_PER_MINUTE,
+        )
+        return None if allowed else retry_after
+
+    def metrics(self) -> Dict[str, object]:
+        """Hit counters per scope since process start"""
+        with self._lock:
+            backend = self._backend
+            return {
+                "backend": (
+                    "redis" if isinstance(backend, RedisTokenBuckets)
+                    else "local" if backend is not None else "not_initialized"
+                ),
+                "enabled": settings.RATE_LIMIT_ENABLED,
+                "scopes": {scope: dict(counts) for scope, counts in self._metrics.items()},
+            }
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,153 @@
+"""
+Read replica routing
+Read-only endpoints take their session from get_read_db, which uses the
+DATABASE_READ_URL replica. A user who just sent a write request is pinned to
+the primary for READ_YOUR_WRITES_SECONDS so a lagging replica never hides
+their own change. Pins are shared through Redis when reachable (a user's
+next request may hit another worker), otherwise kept in process memory.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional for local development
+    redis = None
+
+# Methods that never write; everything else pins the user to the primary
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReadYourWrites:
+    """Per-user "read from the primary until" pins"""
+
+    # Expired pins are dropped once the map grows past this
+    PRUNE_THRESHOLD = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pins: Dict[str, float] = {}  # user key -> pinned until (monotonic)
+        self._client = None
+        self._client_checked = False
+
+    def _get_client(self):
+        """Redis client when configured and reachable, otherwise None (local only)"""
+        if self._client_checked:
+            return self._client
+        self._client_checked = True
+        if settings.READ_YOUR_WRITES_BACKEND == "local" or redis is None or not settings.REDIS_URL:
+            return None
+        try:
+            client = redis.Redis.from_url(
+                settings.REDIS_URL,
+                socket_connect_timeout=0.5,
+                socket_timeout=0.5,
+            )
+            client.ping()
+            self._client = client
+        except Exception as e:
+            print(f"⚠️ Read routing: Redis unavailable ({e}), read-your-writes pins stay in this process")
+        return self._client
+
+    @staticmethod
+    def user_key(authorization: Optional[str]) -> Optional[str]:
+        """User id (or email for old tokens) from a bearer Authorization header"""
+        from app.auth import decode_token_claims
+
+        if not authorization or not authorization.lower().startswith("bearer "):
+            return None
+        claims = decode_token_claims(authorization[7:].strip())
+        if claims is None:
+            return None
+        return str(claims.get("uid") or claims.get("sub"))
+
+    def pin(self, key: str) -> None:
+        """Send the user's reads to the primary for READ_YOUR_WRITES_SECONDS"""
+        seconds = settings.READ_YOUR_WRITES_SECONDS
+        if seconds <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._pins[key] = now + seconds
+            if len(self._pins) > self.PRUNE_THRESHOLD:
+                self._pins = {k: until for k, until in self._pins.items() if until > now}
+
+        client = self._get_client()
+        if client is not None:
+            try:
+                client.set(f"{settings.READ_YOUR_WRITES_REDIS_PREFIX}:{key}", 1, px=int(seconds * 1000))
+            except Exception as e:
+                print(f"⚠️ Read routing: failed to publish pin: {e}")
+
+    def is_pinned(self, key: str) -> bool:
+        """Whether the user wrote something recently (on this worker or, with Redis, any worker)"""
+        with self._lock:
+            until = self._pins.get(key)
+            if until is not None:
+                if until > time.monotonic():
+                    return True
+                del self._pins[key]
+
+        client = self._get_client()
+        if client is not None:
+            try:
+                return bool(client.exists(f"{settings.READ_YOUR_WRITES_REDIS_PREFIX}:{key}"))
+            except Exception:
+                # Redis trouble: prefer a possibly stale replica read over failing the request
+                return False
+        return False
+
+
+read_your_writes = ReadYourWrites()
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware that pins users to the primary after a write request
+    and marks their read requests while pinned (request.state.read_from_primary)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        authorization = None
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value.decode("latin-1")
+                break
+        key = read_your_writes.user_key(authorization)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] in SAFE_METHODS:
+            if read_your_writes.is_pinned(key):
+                scope.setdefault("state", {})["read_from_primary"] = True
+            await self.app(scope, receive, send)
+            return
+
+        # Pin before the response goes out, so the client can't read from the
+        # replica in between; pin on errors too, something may have committed
+        pinned = False
+
+        async def send_after_pin(message):
+            nonlocal pinned
+            if message["type"] == "http.response.start" and not pinned:
+                pinned = True
+                read_your_writes.pin(key)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_after_pin)
+        finally:
+            if not pinned:
+                read_your_writes.pin(key)
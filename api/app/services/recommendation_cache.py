@@ -0,0 +1,196 @@
+"""
+Precomputed recommendation storage
+Stores get_personalized_recommendations results per user with a data-version
+stamp so the API can serve them without recomputing on every dashboard open
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import CarbonLog, RecommendationSnapshot, User
+from app.services.suggestion_service import SuggestionService
+
+
+class RecommendationCache:
+    """Service for storing and serving precomputed recommendations"""
+
+    # Bump when the recommendation rules change so stored copies are recomputed
+    ALGORITHM_VERSION = 1
+
+    @staticmethod
+    def get_data_version(user_id, db: Session) -> str:
+        """
+        Build the data-version stamp for a user's logs
+        Changes whenever a log is added or deleted
+        """
+        count, latest = db.query(
+            func.count(CarbonLog.id),
+            func.max(CarbonLog.created_at),
+        ).filter(CarbonLog.user_id == user_id).one()
+
+        latest_stamp = latest.isoformat() if latest else "none"
+        return f"v{RecommendationCache.ALGORITHM_VERSION}:{count}:{latest_stamp}"
+
+    @staticmethod
+    def get_fresh(user: User, db: Session, days: int = 30) -> Optional[Dict[str, Any]]:
+        """Return the stored recommendations if they are still fresh, None on a miss"""
+        snapshot = db.query(RecommendationSnapshot).filter(
+            RecommendationSnapshot.user_id == user.id,
+            RecommendationSnapshot.days == days,
+        ).first()
+        if snapshot is None:
+            return None
+
+        max_age = timedelta(hours=settings.RECOMMENDATIONS_MAX_AGE_HOURS)
+        if snapshot.computed_at is None or snapshot.computed_at < datetime.utcnow() - max_age:
+            return None
+
+        if snapshot.data_version != RecommendationCache.get_data_version(user.id, db):
+            return None
+
+        return snapshot.data
+
+    @staticmethod
+    def store(
+        user_id,
+        db: Session,
+        days: int,
+        data: Dict[str, Any],
+        data_version: str,
+    ) -> None:
+        """Insert or replace the stored recommendations for a user"""
+        db.merge(RecommendationSnapshot(
+            user_id=user_id,
+            days=days,
+            data=data,
+            data_version=data_version,
+            computed_at=datetime.utcnow(),
+        ))
+        db.commit()
+
+    @staticmethod
+    def get_recommendations(user: User, db: Session, days: int = 30) -> Dict[str, Any]:
+        """Serve stored recommendations when fresh, compute and store them on a miss"""
+        cached = RecommendationCache.get_fresh(user, db, days=days)
+        if cached is not None:
+            return cached
+
+        # Stamp before computing so a log written meanwhile invalidates this copy
+        data_version = RecommendationCache.get_data_version(user.id, db)
+        recommendations = SuggestionService.get_personalized_recommendations(user, db, days=days)
+        RecommendationCache.store(user.id, db, days, recommendations, data_version)
+        return recommendations
+
+    @staticmethod
+    def iter_active_user_shards(
+        db: Session,
+        active_days: int,
+        shard_size: int,
+    ) -> Iterator[List[Any]]:
+        """Yield ids of users with logs in the last active_days, in id order, in shards"""
+        cutoff_date = datetime.utcnow() - timedelta(days=active_days)
+        active_ids = (
+            db.query(CarbonLog.user_id)
+            .join(User, User.id == CarbonLog.user_id)
+            .filter(CarbonLog.created_at >= cutoff_date, User.is_active == True)
+            .distinct()
+            .order_by(CarbonLog.user_id)
+        )
+
+        shard = []
+        for (user_id,) in active_ids.yield_per(shard_size):
+            shard.append(user_id)
+            if len(shard) >= shard_size:
+                yield shard
+                shard = []
+        if shard:
+            yield shard
+
+    @staticmethod
+    def precompute_shard(user_ids: List[Any], days: int = 30) -> int:
+        """
+        Compute and store recommendations for one shard of users
+        Runs inside a worker process with its own database session
+        """
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        stored = 0
+        try:
+            users = db.query(User).filter(User.id.in_(user_ids)).all()
+            for user in users:
+                data_version = RecommendationCache.get_data_version(user.id, db)
+                recommendations = SuggestionService.get_personalized_recommendations(
+                    user, db, days=days
+                )
+                db.merge(RecommendationSnapshot(
+                    user_id=user.id,
+                    days=days,
+                    data=recommendations,
+                    data_version=data_version,
+                    computed_at=datetime.utcnow(),
+                ))
+                stored += 1
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        return stored
+
+    @staticmethod
+    def precompute_active_users(
+        active_days: Optional[int] = None,
+        days: int = 30,
+        workers: Optional[int] = None,
+        shard_size: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Precompute recommendations for every recently active user
+
+        Args:
+            active_days: Users with a log in this many days are precomputed
+            days: Look-back window for the recommendations themselves
+            workers: Size of the process pool (defaults to CPU count)
+            shard_size: Number of user ids handed to a worker at a time
+
+        Returns:
+            Dictionary with shard and user counts
+        """
+        from app.database import SessionLocal
+
+        active_days = active_days or settings.RECOMMENDATIONS_ACTIVE_DAYS
+        shard_size = shard_size or settings.RECOMMENDATIONS_SHARD_SIZE
+
+        db = SessionLocal()
+        try:
+            shards = list(RecommendationCache.iter_active_user_shards(db, active_days, shard_size))
+        finally:
+            db.close()
+
+        stored = 0
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_dispose_inherited_connections,
+        ) as pool:
+            futures = [
+                pool.submit(RecommendationCache.precompute_shard, shard, days)
+                for shard in shards
+            ]
+            for future in futures:
+                stored += future.result()
+
+        return {"shards": len(shards), "users": stored}
+
+
+def _dispose_inherited_connections() -> None:
+    """Drop pooled connections copied from the parent process"""
+    from app.database import engine
+
+    engine.dispose(close=False)
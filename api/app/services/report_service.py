@@ -52,11 +52,95 @@ class ReportService:
             CarbonLog.created_at < week_start
         ).all()
         
-        # Calculate current week totals
-        week_total = sum(log.carbon_amount_kg for log in week_logs)
+        # Calculate by category
+        by_category = {}
+        for log in week_logs:
+            category = log.category
+            by_category[category] = by_category.get(category, 0) + log.carbon_amount_kg
+        
+        # Calculate daily breakdown
+        daily_breakdown = {}
+        for log in week_logs:
+            day = log.created_at.date()
+            daily_breakdown[day.isoformat()] = daily_breakdown.get(day.isoformat(), 0) + log.carbon_amount_kg
+        
+        return ReportService._build_weekly_report(
+            week_start,
+            week_total=sum(log.carbon_amount_kg for log in week_logs),
+            prev_week_total=sum(log.carbon_amount_kg for log in prev_week_logs),
+            by_category=by_category,
+            daily_breakdown=daily_breakdown,
+            total_entries=len(week_logs),
+        )
+    
+    @staticmethod
+    def get_weekly_reports(
+        db: Session,
+        user_ids: List[Any],
+        week_start: datetime
+    ) -> Dict[Any, Dict[str, Any]]:
+        """
+        Weekly reports for many users at once (same shape as get_weekly_report)
+        Uses three grouped queries for the whole batch instead of loading
+        every user's logs.
         
-        # Calculate previous week totals
-        prev_week_total = sum(log.carbon_amount_kg for log in prev_week_logs)
+        Returns:
+            Dictionary of user id -> weekly report
+        """
+        week_end = week_start + timedelta(days=7)
+        prev_week_start = week_start - timedelta(days=7)
+        in_batch = CarbonLog.user_id.in_(user_ids)
+        
+        by_category = {user_id: {} for user_id in user_ids}
+        entries = {user_id: 0 for user_id in user_ids}
+        for user_id, category, total, count in db.query(
+            CarbonLog.user_id, CarbonLog.category,
+            func.sum(CarbonLog.carbon_amount_kg), func.count(CarbonLog.id),
+        ).filter(
+            in_batch, CarbonLog.created_at >= week_start, CarbonLog.created_at < week_end
+        ).group_by(CarbonLog.user_id, CarbonLog.category):
+            by_category[user_id][category] = total or 0
+            entries[user_id] += count
+        
+        daily = {user_id: {} for user_id in user_ids}
+        log_day = func.date(CarbonLog.created_at)
+        for user_id, day, total in db.query(
+            CarbonLog.user_id, log_day, func.sum(CarbonLog.carbon_amount_kg),
+        ).filter(
+            in_batch, CarbonLog.created_at >= week_start, CarbonLog.created_at < week_end
+        ).group_by(CarbonLog.user_id, log_day):
+            # SQLite returns the day as a string, PostgreSQL as a date
+            daily[user_id][day if isinstance(day, str) else day.isoformat()] = total or 0
+        
+        previous = dict(db.query(
+            CarbonLog.user_id, func.sum(CarbonLog.carbon_amount_kg),
+        ).filter(
+            in_batch, CarbonLog.created_at >= prev_week_start, CarbonLog.created_at < week_start
+        ).group_by(CarbonLog.user_id).all())
+        
+        return {
+            user_id: ReportService._build_weekly_report(
+                week_start,
+                week_total=sum(by_category[user_id].values()),
+                prev_week_total=previous.get(user_id) or 0,
+                by_category=by_category[user_id],
+                daily_breakdown=daily[user_id],
+                total_entries=entries[user_id],
+            )
+            for user_id in user_ids
+        }
+    
+    @staticmethod
+    def _build_weekly_report(
+        week_start: datetime,
+        week_total: float,
+        prev_week_total: float,
+        by_category: Dict[str, float],
+        daily_breakdown: Dict[str, float],
+        total_entries: int
+    ) -> Dict[str, Any]:
+        """Assemble a weekly report from the week's totals"""
+        week_end = week_start + timedelta(days=7)
         
         # Calculate percentage change
         if prev_week_total > 0:
@@ -66,12 +150,6 @@ class ReportService:
             percent_change = 0
             is_better = True
         
-        # Calculate by category
-        by_category = {}
-        for log in week_logs:
-            category = log.category
-            by_category[category] = by_category.get(category, 0) + log.carbon_amount_kg
-        
         # Find biggest source
         biggest_source = max(by_category.items(), key=lambda x: x[1]) if by_category else ("", 0)
         
@@ -81,12 +159,6 @@ class ReportService:
         # Generate top tip based on biggest source
         top_tip = ReportService._generate_top_tip(biggest_source[0], biggest_source[1])
         
-        # Calculate daily breakdown
-        daily_breakdown = {}
-        for log in week_logs:
-            day = log.created_at.date()
-            daily_breakdown[day.isoformat()] = daily_breakdown.get(day.isoformat(), 0) + log.carbon_amount_kg
-        
         return {
             "week_start": week_start.isoformat(),
             "week_end": week_end.isoformat(),
@@ -101,8 +173,8 @@ class ReportService:
                 "percentage": round(biggest_source_percentage, 1)
             },
             "top_tip": top_tip,
-            "daily_breakdown": {k: round(v, 2) for k, v in daily_breakdown.items()},
-            "total_entries": len(week_logs),
+            "daily_breakdown": {k: round(v, 2) for k, v in sorted(daily_breakdown.items())},
+            "total_entries": total_entries,
         }
     
     @staticmethod
@@ -0,0 +1,329 @@
+"""
+Async SMTP transport
+A small pool of persistent, authenticated SMTP connections on asyncio
+streams. Connections are reused across messages, re-established when they
+fail or sit idle too long, and send batches with ESMTP PIPELINING (RFC 2920)
+when the server supports it.
+"""
+
+import asyncio
+import base64
+import hmac
+import ssl
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+# (sender, recipients, message bytes with CRLF line endings)
+Envelope = Tuple[str, Sequence[str], bytes]
+
+
+class SMTPReplyError(Exception):
+    """The server rejected a command"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"SMTP {code}: {message}")
+        self.code = code
+        self.message = message
+
+    @property
+    def permanent(self) -> bool:
+        return self.code >= 500
+
+
+class SMTPConnectionError(Exception):
+    """The connection failed or the server is closing it; the message can be retried"""
+
+
+class SMTPConnection:
+    """One ESMTP session"""
+
+    def __init__(self):
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self.extensions: dict = {}
+        self.last_used = 0.0
+        self.confirmed = 0
+
+    async def connect(self) -> None:
+        """Connect, upgrade to TLS if configured and log in"""
+        tls_context = ssl.create_default_context()
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                settings.SMTP_HOST,
+                settings.SMTP_PORT,
+                ssl=tls_context if settings.SMTP_USE_TLS else None,
+            ),
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
+        )
+        self._expect(await self._read_reply(), 220)
+        await self._ehlo()
+
+        if settings.SMTP_STARTTLS and not settings.SMTP_USE_TLS:
+            self._expect(await self.command("STARTTLS"), 220)
+            await self._writer.start_tls(tls_context, server_hostname=settings.SMTP_HOST)
+            await self._ehlo()
+
+        if settings.SMTP_USER:
+            await self._authenticate(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        self.last_used = time.monotonic()
+
+    async def _ehlo(self) -> None:
+        code, message = await self.command("EHLO localhost")
+        self._expect((code, message), 250)
+        self.extensions = {}
+        for line in message.splitlines()[1:]:
+            keyword, _, params = line.partition(" ")
+            if keyword.upper().startswith("AUTH="):
+                # Pre-RFC 4954 servers advertise "AUTH=LOGIN PLAIN"
+                keyword, params = "AUTH", f"{keyword[5:]} {params}"
+            if keyword.upper() == "AUTH" and "AUTH" in self.extensions:
+                params = f"{self.extensions['AUTH']} {params}"
+            self.extensions[keyword.upper()] = params
+
+    # Preference order, as smtplib: no plaintext password on the wire when avoidable
+    AUTH_MECHANISMS = ("CRAM-MD5", "PLAIN", "LOGIN")
+
+    async def _authenticate(self, user: str, password: str) -> None:
+        """Log in with the best mechanism the server advertises"""
+        offered = self.extensions.get("AUTH", "").upper().split()
+        mechanism = next((name for name in self.AUTH_MECHANISMS if name in offered), None)
+        if mechanism is None:
+            raise SMTPReplyError(504, f"No supported AUTH mechanism (server offers: {' '.join(offered) or 'none'})")
+
+        def b64(value: bytes) -> str:
+            return base64.b64encode(value).decode()
+
+        if mechanism == "CRAM-MD5":
+            code, challenge = await self.command("AUTH CRAM-MD5")
+            self._expect((code, challenge), 334)
+            digest = hmac.new(password.encode(), base64.b64decode(challenge), "md5").hexdigest()
+            reply = await self.command(b64(f"{user} {digest}".encode()))
+        elif mechanism == "PLAIN":
+            reply = await self.command("AUTH PLAIN " + b64(f"\0{user}\0{password}".encode()))
+        else:
+            self._expect(await self.command("AUTH LOGIN " + b64(user.encode())), 334)
+            reply = await self.command(b64(password.encode()))
+        self._expect(reply, 235)
+
+    @staticmethod
+    def _expect(reply: Tuple[int, str], code: int) -> None:
+        """Raise the server's reply unless it is the expected one (5xx: permanent)"""
+        if reply[0] != code:
+            raise SMTPReplyError(*reply)
+
+    async def _read_reply(self) -> Tuple[int, str]:
+        """Read one (possibly multi-line) reply"""
+        lines = []
+        while True:
+            try:
+                line = await asyncio.wait_for(self._reader.readline(), timeout=settings.SMTP_TIMEOUT_SECONDS)
+            except (asyncio.TimeoutError, OSError) as e:
+                raise SMTPConnectionError(f"SMTP read failed: {e!r}")
+            if not line:
+                raise SMTPConnectionError("SMTP server closed the connection")
+            line = line.decode("utf-8", "replace").rstrip("\r\n")
+            lines.append(line[4:])
+            if len(line) < 4 or line[3] != "-":
+                break
+        try:
+            code = int(line[:3])
+        except ValueError:
+            raise SMTPConnectionError(f"Malformed SMTP reply: {line!r}")
+        if code == 421:
+            raise SMTPConnectionError(f"SMTP 421: {' '.join(lines)}")
+        return code, "\n".join(lines)
+
+    async def _write(self, data: bytes) -> None:
+        self._writer.write(data)
+        try:
+            await asyncio.wait_for(self._writer.drain(), timeout=settings.SMTP_TIMEOUT_SECONDS)
+        except (asyncio.TimeoutError, OSError) as e:
+            raise SMTPConnectionError(f"SMTP write failed: {e!r}")
+
+    async def command(self, line: str) -> Tuple[int, str]:
+        await self._write(line.encode() + b"\r\n")
+        return await self._read_reply()
+
+    @staticmethod
+    def _data_payload(message: bytes) -> bytes:
+        """Dot-stuff the message and append the end-of-data marker"""
+        if message.startswith(b"."):
+            message = b"." + message
+        message = message.replace(b"\r\n.", b"\r\n..")
+        if not message.endswith(b"\r\n"):
+            message += b"\r\n"
+        return message + b".\r\n"
+
+    async def send_many(self, envelopes: List[Envelope]) -> List[Optional[SMTPReplyError]]:
+        """
+        Send messages over this session, one mail transaction each
+        With PIPELINING, each message's MAIL/RCPT/DATA go out in one write and
+        its content goes out together with the next message's envelope.
+
+        Returns:
+            Per message: None if accepted, otherwise the rejecting reply
+
+        Raises:
+            SMTPConnectionError: The session broke; only the first `confirmed`
+                messages have a known outcome
+        """
+        results: List[Optional[SMTPReplyError]] = [None] * len(envelopes)
+        try:
+            await self._send_all(envelopes, results)
+        except SMTPConnectionError as e:
+            e.results = results
+            raise
+        self.last_used = time.monotonic()
+        return results
+
+    async def _send_all(self, envelopes: List[Envelope], results: List[Optional[SMTPReplyError]]) -> None:
+        pipelining = "PIPELINING" in self.extensions
+        self.confirmed = 0  # Messages (in order) whose outcome is known
+        awaiting_end: Optional[int] = None  # Message whose end-of-data reply is still unread
+
+        for index, (sender, recipients, message) in enumerate(envelopes):
+            commands = [f"MAIL FROM:<{sender}>"] + [f"RCPT TO:<{rcpt}>" for rcpt in recipients] + ["DATA"]
+            if pipelining:
+                await self._write("".join(f"{cmd}\r\n" for cmd in commands).encode())
+                if awaiting_end is not None:
+                    results[awaiting_end] = self._reply_error(await self._read_reply(), 250)
+                    self.confirmed = awaiting_end + 1
+                    awaiting_end = None
+                replies = [await self._read_reply() for _ in commands]
+            else:
+                replies = []
+                for cmd in commands:
+                    replies.append(await self.command(cmd))
+                    if replies[-1][0] >= 400:
+                        break
+
+            mail_reply, rcpt_replies = replies[0], replies[1:1 + len(recipients)]
+            data_reply = replies[-1] if len(replies) == len(commands) else None
+            accepted = mail_reply[0] == 250 and any(reply[0] in (250, 251) for reply in rcpt_replies)
+
+            if data_reply is not None and data_reply[0] == 354:
+                if accepted:
+                    await self._write(self._data_payload(message))
+                    if pipelining:
+                        awaiting_end = index
+                    else:
+                        results[index] = self._reply_error(await self._read_reply(), 250)
+                        self.confirmed = index + 1
+                    continue
+                # No valid recipients: end the (empty) data and give up on the message
+                await self._write(b".\r\n")
+                await self._read_reply()
+
+            # Report the first rejection and clear the half-open transaction
+            results[index] = next(
+                (error for error in (self._reply_error(reply, 250, 251) for reply in replies) if error),
+                SMTPReplyError(554, "Transaction failed"),
+            )
+            self.confirmed = index + 1
+            reset = await self.command("RSET")
+            if reset[0] != 250:
+                raise SMTPConnectionError(f"SMTP RSET failed: {reset[0]} {reset[1]}")
+
+        if awaiting_end is not None:
+            results[awaiting_end] = self._reply_error(await self._read_reply(), 250)
+            self.confirmed = awaiting_end + 1
+
+    @staticmethod
+    def _reply_error(reply: Tuple[int, str], *ok_codes: int) -> Optional[SMTPReplyError]:
+        return None if reply[0] in ok_codes else SMTPReplyError(*reply)
+
+    async def close(self) -> None:
+        if self._writer is None:
+            return
+        try:
+            await asyncio.wait_for(self.command("QUIT"), timeout=2)
+        except Exception:
+            pass
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except Exception:
+            pass
+        self._writer = None
+
+
+class SMTPTransport:
+    """Pool of persistent SMTP connections"""
+
+    def __init__(self):
+        self._idle: List[SMTPConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def _acquire(self, fresh: bool = False) -> SMTPConnection:
+        while self._idle and not fresh:
+            connection = self._idle.pop()
+            if time.monotonic() - connection.last_used < settings.SMTP_IDLE_SECONDS:
+                return connection
+            # Servers drop idle sessions; start a fresh one instead
+            await connection.close()
+        connection = SMTPConnection()
+        try:
+            await connection.connect()
+        except Exception:
+            await connection.close()
+            raise
+        return connection
+
+    async def _send_chunk(self, envelopes: List[Envelope]) -> List[Optional[Exception]]:
+        """
+        Send a chunk on one pooled connection
+        If the session breaks, the messages without a known outcome are sent
+        once more on a fresh connection (pooled sessions may have timed out).
+        A permanent rejection while connecting (e.g. 535 bad credentials) fails
+        the whole chunk right away.
+        """
+        results: List[Optional[Exception]] = []
+        async with self._slots:
+            for attempt in range(2):
+                try:
+                    connection = await self._acquire(fresh=attempt > 0)
+                except SMTPReplyError as e:
+                    if e.permanent:
+                        return results + [e] * len(envelopes)
+                    error = e
+                    continue
+                except (SMTPConnectionError, OSError, asyncio.TimeoutError) as e:
+                    error = e
+                    continue
+                try:
+                    results += await connection.send_many(envelopes)
+                except SMTPConnectionError as e:
+                    await connection.close()
+                    results += e.results[:connection.confirmed]
+                    envelopes = envelopes[connection.confirmed:]
+                    error = e
+                    continue
+                self._idle.append(connection)
+                return results
+            return results + [error] * len(envelopes)
+
+    async def send_many(self, envelopes: List[Envelope]) -> List[Optional[Exception]]:
+        """
+        Send messages over up to SMTP_POOL_SIZE connections in parallel
+
+        Returns:
+            Per message: None if accepted, otherwise the error
+            (SMTPReplyError for rejections, connection errors otherwise)
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(settings.SMTP_POOL_SIZE)
+        size = max(settings.SMTP_PIPELINE_BATCH, 1)
+        chunks = [envelopes[start:start + size] for start in range(0, len(envelopes), size)]
+        chunk_results = await asyncio.gather(*(self._send_chunk(chunk) for chunk in chunks))
+        return [result for results in chunk_results for result in results]
+
+    async def close(self) -> None:
+        """Close every pooled connection (application shutdown)"""
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await connection.close()
+
+
+smtp_transport = SMTPTransport()
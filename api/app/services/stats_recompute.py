@@ -0,0 +1,223 @@
+"""
+Bulk stats recompute
+Re-applies the current scoring rules (eco score, level and optionally
+points) to every user with set-based SQL, one user-id chunk at a time
+"""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, case, distinct, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models import CarbonLog, PointsLedger, User
+from app.services.gamification import GamificationService
+
+# How many per-user differences a dry run keeps for the report
+DRY_RUN_SAMPLE_SIZE = 100
+
+
+class StatsRecomputeService:
+    """Runs one bulk recompute at a time and tracks its progress"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._job: Optional[Dict[str, Any]] = None
+
+    def status(self) -> Optional[Dict[str, Any]]:
+        """Progress of the current (or last) recompute job"""
+        with self._lock:
+            return dict(self._job) if self._job else None
+
+    def start(self, dry_run: bool, chunk_size: int, include_points: bool) -> Optional[Dict[str, Any]]:
+        """
+        Register a new job
+
+        Returns:
+            The job status, or None if a job is already running
+        """
+        with self._lock:
+            if self._job and self._job["state"] == "running":
+                return None
+            self._job = {
+                "state": "running",
+                "dry_run": dry_run,
+                "include_points": include_points,
+                "chunk_size": chunk_size,
+                "total_users": None,
+                "processed_users": 0,
+                "changed": {"eco_score": 0, "level": 0, "total_points": 0},
+                "diff": [] if dry_run else None,
+                "started_at": datetime.utcnow().isoformat(),
+                "finished_at": None,
+                "error": None,
+            }
+            return dict(self._job)
+
+    def _update(self, **values) -> None:
+        with self._lock:
+            self._job.update(values)
+
+    @staticmethod
+    def _expected(first_id, last_id, include_points: bool, now: datetime):
+        """
+        Current vs recomputed stats for users with first_id <= id <= last_id
+        Points come from the ledger when include_points is set, otherwise
+        the stored total is kept and only the level is re-derived from it.
+        """
+        week_start = datetime.combine((now - timedelta(days=6)).date(), datetime.min.time())
+        log_day = func.date(CarbonLog.created_at)
+        in_chunk = and_(User.id >= first_id, User.id <= last_id)
+
+        logs = (
+            select(
+                CarbonLog.user_id.label("user_id"),
+                func.sum(CarbonLog.carbon_amount_kg).label("total_carbon"),
+                func.count(distinct(log_day)).label("days_active"),
+                func.count(distinct(case((CarbonLog.created_at >= week_start, log_day)))).label("recent_days"),
+            )
+            .where(CarbonLog.user_id >= first_id, CarbonLog.user_id <= last_id)
+            .group_by(CarbonLog.user_id)
+            .subquery()
+        )
+
+        if include_points:
+            ledger = (
+                select(
+                    PointsLedger.user_id.label("user_id"),
+                    func.sum(PointsLedger.delta).label("points"),
+                )
+                .where(PointsLedger.user_id >= first_id, PointsLedger.user_id <= last_id)
+                .group_by(PointsLedger.user_id)
+                .subquery()
+            )
+            new_points = func.coalesce(ledger.c.points, 0)
+        else:
+            ledger = None
+            new_points = func.coalesce(User.total_points, 0)
+
+        stmt = select(
+            User.id.label("user_id"),
+            User.eco_score.label("old_eco_score"),
+            User.level.label("old_level"),
+            User.total_points.label("old_total_points"),
+            GamificationService.eco_score_expression(
+                logs.c.total_carbon, logs.c.days_active, logs.c.recent_days
+            ).label("eco_score"),
+            GamificationService.level_expression(new_points).label("level"),
+            new_points.label("total_points"),
+        ).outerjoin(logs, logs.c.user_id == User.id)
+        if ledger is not None:
+            stmt = stmt.outerjoin(ledger, ledger.c.user_id == User.id)
+        return stmt.where(in_chunk).subquery()
+
+    @staticmethod
+    def _changed(expected, include_points: bool):
+        """Filter for rows whose stored stats differ from the recomputed ones"""
+        conditions = [
+            func.coalesce(expected.c.old_eco_score, -1.0) != expected.c.eco_score,
+            func.coalesce(expected.c.old_level, -1) != expected.c.level,
+        ]
+        if include_points:
+            conditions.append(func.coalesce(expected.c.old_total_points, -1) != expected.c.total_points)
+        return or_(*conditions)
+
+    def _process_chunk(self, db: Session, first_id, last_id, dry_run: bool,
+                       include_points: bool, now: datetime) -> Dict[str, int]:
+        """Count (and unless dry_run, apply) the changes for one id chunk"""
+        expected = self._expected(first_id, last_id, include_points, now)
+        counts = db.execute(select(
+            func.count(case((func.coalesce(expected.c.old_eco_score, -1.0) != expected.c.eco_score, 1))),
+            func.count(case((func.coalesce(expected.c.old_level, -1) != expected.c.level, 1))),
+            func.count(case((func.coalesce(expected.c.old_total_points, -1) != expected.c.total_points, 1))),
+        )).one()
+        changed = {"eco_score": counts[0], "level": counts[1], "total_points": counts[2]}
+
+        if dry_run:
+            with self._lock:
+                room = DRY_RUN_SAMPLE_SIZE - len(self._job["diff"])
+            if room > 0 and any(changed.values()):
+                rows = db.execute(
+                    select(expected).where(self._changed(expected, include_points)).limit(room)
+                ).all()
+                diff = [
+                    {
+                        "user_id": str(row.user_id),
+                        "eco_score": [row.old_eco_score, row.eco_score],
+                        "level": [row.old_level, row.level],
+                        "total_points": [row.old_total_points, row.total_points],
+                    }
+                    for row in rows
+                ]
+                with self._lock:
+                    self._job["diff"].extend(diff)
+            return changed
+
+        if any(changed.values()):
+            values = {"eco_score": expected.c.eco_score, "updated_at": now}
+            if include_points:
+                values.update(level=expected.c.level, total_points=expected.c.total_points)
+            else:
+                # Points are left alone: concurrent add_points increments must survive,
+                # so the level follows the row's current points, not the snapshot
+                values["level"] = GamificationService.level_expression(func.coalesce(User.total_points, 0))
+            db.execute(
+                update(User)
+                .where(User.id == expected.c.user_id)
+                .where(self._changed(expected, include_points))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        return changed
+
+    def run(self) -> None:
+        """Run the registered job to completion (called from a background task)"""
+        from app.auth import auth_cache
+        from app.database import SessionLocal
+        from app.services.friends_leaderboard import friends_leaderboard
+        from app.services.leaderboard import leaderboard_service
+
+        job = self.status()
+        dry_run, include_points, chunk_size = job["dry_run"], job["include_points"], job["chunk_size"]
+        now = datetime.utcnow()
+
+        db = SessionLocal()
+        try:
+            self._update(total_users=db.query(func.count(User.id)).scalar())
+
+            processed = 0
+            changed_totals = dict(job["changed"])
+            last_id = None
+            while True:
+                query = db.query(User.id).order_by(User.id)
+                if last_id is not None:
+                    query = query.filter(User.id > last_id)
+                ids: List[Any] = [user_id for (user_id,) in query.limit(chunk_size)]
+                if not ids:
+                    break
+
+                changed = self._process_chunk(db, ids[0], ids[-1], dry_run, include_points, now)
+                for field, count in changed.items():
+                    changed_totals[field] += count
+                processed += len(ids)
+                last_id = ids[-1]
+                self._update(processed_users=processed, changed=dict(changed_totals))
+
+            self._update(state="completed", finished_at=datetime.utcnow().isoformat())
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Stats recompute failed: {e}")
+            self._update(state="failed", error=str(e), finished_at=datetime.utcnow().isoformat())
+        finally:
+            db.close()
+
+        if not dry_run:
+            # Cached user rows and rankings are derived from the stats that just changed
+            auth_cache.clear()
+            leaderboard_service.invalidate()
+            friends_leaderboard.clear()
+
+
+stats_recompute = StatsRecomputeService()
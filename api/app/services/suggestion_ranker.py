@@ -0,0 +1,142 @@
+"""
+Suggestion ranking engine
+Scores every suggestion in the catalog against a user's activity volumes
+using a precomputed suggestion x activity impact matrix
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app.models import CarbonLog
+from app.services.carbon_calculator import CarbonCalculator
+from app.services.suggestion_service import SuggestionService
+
+
+class SuggestionRanker:
+    """Rank catalog suggestions by expected kg CO2 saved for a user"""
+
+    # Share of an activity's emissions a suggestion is expected to remove
+    IMPACT_REDUCTION = {
+        "high": 0.5,
+        "medium": 0.25,
+        "low": 0.1,
+    }
+
+    # Metadata key holding the logged volume for each category
+    # (same keys create_carbon_log reads when calculating emissions)
+    VOLUME_KEYS = {
+        "transport": "distance_km",
+        "diet": "quantity_kg",
+        "energy": "amount",
+        "shopping": "quantity",
+        "lifestyle": "amount",
+    }
+
+    # Categories whose logs carry the volume's unit in meta_data["unit"]
+    UNIT_CATEGORIES = {"energy", "lifestyle"}
+
+    def __init__(self):
+        self.activities: List[Tuple[str, str]] = []
+        self.factors: Dict[Tuple[str, str], float] = {}
+        self.suggestions: List[Dict[str, Any]] = []
+        self._measured_in_kg = set()
+        self._build_catalog()
+
+    def _build_catalog(self) -> None:
+        """Build the activity columns, suggestion rows and the impact matrix"""
+        column_index: Dict[Tuple[str, str], int] = {}
+        row_index: Dict[Tuple[str, str], int] = {}
+        entries: List[Tuple[int, int, float]] = []
+
+        for category, activity_rules in SuggestionService.SUGGESTION_RULES.items():
+            for activity, rules in activity_rules.items():
+                key = (category, activity)
+                column_index[key] = len(self.activities)
+                self.activities.append(key)
+
+                # Activities without a known factor are measured in kg CO2 directly
+                factor = CarbonCalculator.EMISSION_FACTORS.get(category, {}).get(activity)
+                self.factors[key] = factor if factor else 1.0
+                if not factor:
+                    self._measured_in_kg.add(key)
+
+                for suggestion in rules.get("suggestions", []):
+                    # The same action can be suggested for several activities -
+                    # keep one row so its savings add up across all of them
+                    row_key = (category, suggestion["action"].lower())
+                    if row_key not in row_index:
+                        row_index[row_key] = len(self.suggestions)
+                        self.suggestions.append({
+                            **suggestion,
+                            "category": category,
+                            "activities": [],
+                        })
+                    row = row_index[row_key]
+                    self.suggestions[row]["activities"].append(activity)
+
+                    reduction = self.IMPACT_REDUCTION.get(suggestion.get("impact"), 0.0)
+                    entries.append((row, column_index[key], self.factors[key] * reduction))
+
+        self._column_index = column_index
+        self.impact_matrix = np.zeros((len(self.suggestions), len(self.activities)))
+        for row, column, value in entries:
+            self.impact_matrix[row, column] = max(self.impact_matrix[row, column], value)
+
+    def _log_volume(self, log: CarbonLog) -> float:
+        """Get the logged volume (km, kg, kWh, items, hours) for a carbon log"""
+        key = (log.category, log.activity)
+        volume_key = self.VOLUME_KEYS.get(log.category)
+        if key not in self._measured_in_kg and log.meta_data and volume_key:
+            volume = log.meta_data.get(volume_key)
+            if volume and log.category in self.UNIT_CATEGORIES:
+                # In the factor's unit (e.g. Wh -> kWh); None if the unit is unknown
+                volume = CarbonCalculator.convert_amount(
+                    log.category, log.activity, float(volume), log.meta_data.get("unit")
+                )
+            if volume:
+                return float(volume)
+
+        # No usable metadata - derive the volume back from the emissions
+        return (log.carbon_amount_kg or 0.0) / self.factors[key]
+
+    def activity_vector(self, logs: List[CarbonLog]) -> np.ndarray:
+        """Build the user's activity-volume vector from their carbon logs"""
+        vector = np.zeros(len(self.activities))
+        for log in logs:
+            column = self._column_index.get((log.category, log.activity))
+            if column is not None:
+                vector[column] += self._log_volume(log)
+        return vector
+
+    def rank(self, logs: List[CarbonLog], limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Rank all catalog suggestions for a user
+
+        Args:
+            logs: User's carbon logs for the analysis window
+            limit: Maximum number of suggestions to return
+
+        Returns:
+            Top suggestions ordered by expected kg CO2 saved
+        """
+        if limit <= 0 or not self.suggestions:
+            return []
+
+        scores = self.impact_matrix @ self.activity_vector(logs)
+
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [
+            {
+                **self.suggestions[row],
+                "expected_savings_kg": round(float(scores[row]), 2),
+            }
+            for row in top
+            if scores[row] > 0
+        ]
+
+
+suggestion_ranker = SuggestionRanker()
@@ -7,6 +7,7 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from app.models import CarbonLog, User
+from app.services.log_metadata import LogMetadataService
 
 
 class SuggestionService:
@@ -1707,7 +1708,7 @@ class SuggestionService:
             days: Number of days to look back
             
         Returns:
-            Dictionary with suggestions organized by category
+            Dictionary with suggestions ranked by expected kg CO2 saved
         """
         # Get user's recent logs
         cutoff_date = datetime.utcnow() - timedelta(days=days)
@@ -1723,34 +1724,12 @@ class SuggestionService:
                 "message": "Start tracking your carbon footprint to get personalized suggestions!",
             }
         
-        # Group by category and get top suggestions
-        category_emissions = {}
-        for log in recent_logs:
-            category = log.category
-            if category not in category_emissions:
-                category_emissions[category] = []
-            category_emissions[category].append(log)
-        
-        # Generate suggestions for each category
-        all_suggestions = []
-        for category, logs in category_emissions.items():
-            # Use the most recent log from this category
-            latest_log = max(logs, key=lambda x: x.created_at)
-            suggestion_data = SuggestionService.generate_suggestions(
-                latest_log,
-                recent_logs,
-                days
-            )
-            all_suggestions.append(suggestion_data)
-        
-        # Sort by total emissions (highest first)
-        all_suggestions.sort(
-            key=lambda x: x.get("category_analysis", {}).get("total_kg", 0) if x.get("category_analysis") else 0,
-            reverse=True
-        )
+        # Score every catalog suggestion against the user's activity volumes
+        from app.services.suggestion_ranker import suggestion_ranker
+        ranked_suggestions = suggestion_ranker.rank(recent_logs, limit=limit)
         
         return {
-            "suggestions": all_suggestions[:limit],
+            "suggestions": ranked_suggestions,
             "daily_tip": SuggestionService.get_daily_tip(),
             "total_logs": len(recent_logs),
             "days_analyzed": days,
@@ -1773,14 +1752,20 @@ class SuggestionService:
         Returns:
             Dictionary with personalized recommendations, quick wins, and savings calculator
         """
-        # Get user's recent logs
+        # Per-activity emissions and metadata totals, aggregated in SQL
         cutoff_date = datetime.utcnow() - timedelta(days=days)
-        recent_logs = db.query(CarbonLog).filter(
-            CarbonLog.user_id == user.id,
-            CarbonLog.created_at >= cutoff_date
-        ).all()
+        activity_totals = LogMetadataService.activity_totals(db, since=cutoff_date, user_id=user.id)
         
-        if not recent_logs:
+        def total(key: str, category: str, activities=None, match=None) -> float:
+            """Sum of a total over the user's rows of a category (optionally only some activities)"""
+            return sum(
+                row[key] for row in activity_totals
+                if row["category"] == category
+                and (activities is None or row["activity"] in activities)
+                and (match is None or match(row["activity"]))
+            )
+        
+        if not activity_totals:
             return {
                 "recommendations": [],
                 "quick_wins": [],
@@ -1790,9 +1775,9 @@ class SuggestionService:
         
         # Calculate emissions by category
         category_emissions = {}
-        for log in recent_logs:
-            category = log.category
-            category_emissions[category] = category_emissions.get(category, 0) + log.carbon_amount_kg
+        for row in activity_totals:
+            category = row["category"]
+            category_emissions[category] = category_emissions.get(category, 0) + row["carbon_kg"]
         
         # Find highest emission category
         if not category_emissions:
@@ -1813,13 +1798,7 @@ class SuggestionService:
         
         # Transport category recommendations
         if highest_category_name == "transport":
-            transport_logs = [log for log in recent_logs if log.category == "transport"]
-            car_logs = [log for log in transport_logs if log.activity in ["car", "car_small", "car_large"]]
-            
-            total_km = sum(
-                log.meta_data.get("distance_km", 0) if log.meta_data else 0
-                for log in car_logs
-            )
+            total_km = total("distance_km", "transport", ["car", "car_small", "car_large"])
             
             if total_km > 50:  # If driving more than 50km/month
                 # CNG recommendation
@@ -1868,13 +1847,7 @@ class SuggestionService:
         
         # Diet category recommendations
         elif highest_category_name == "diet":
-            diet_logs = [log for log in recent_logs if log.category == "diet"]
-            meat_logs = [log for log in diet_logs if log.activity in ["beef", "mutton", "chicken", "pork"]]
-            
-            total_meat_kg = sum(
-                log.meta_data.get("quantity_kg", 0) if log.meta_data else 0
-                for log in meat_logs
-            )
+            total_meat_kg = total("quantity_kg", "diet", ["beef", "mutton", "chicken", "pork"])
             
             if total_meat_kg > 2:  # If eating more than 2kg meat/month
                 # Vegetarian meals recommendation
@@ -1907,8 +1880,6 @@ class SuggestionService:
         
         # Energy category recommendations
         elif highest_category_name == "energy":
-            energy_logs = [log for log in recent_logs if log.category == "energy"]
-            
             # LED bulbs recommendation
             recommendations.append({
                 "title": "Switch to LED Bulbs",
@@ -1922,15 +1893,14 @@ class SuggestionService:
             total_savings += highest_category_emissions * 0.2
             
             # Bucket bath recommendation (Bangladesh-specific)
-            lifestyle_logs = [log for log in recent_logs if log.category == "lifestyle"]
-            shower_logs = [log for log in lifestyle_logs if log.activity == "shower_10min"]
+            shower_count = total("count", "lifestyle", ["shower_10min"])
             
-            if shower_logs:
+            if shower_count:
                 # Switch to bucket bath saves ~1.5 kg per bath
-                savings_bucket = len(shower_logs) * 1.5
+                savings_bucket = shower_count * 1.5
                 recommendations.append({
                     "title": "Use Bucket Bath Instead of Shower",
-                    "description": f"Switch {len(shower_logs)} showers/month to bucket bath",
+                    "description": f"Switch {shower_count} showers/month to bucket bath",
                     "savings_kg": round(savings_bucket, 2),
                     "difficulty": "Easy",
                     "impact": "Medium",
@@ -1974,16 +1944,10 @@ class SuggestionService:
         ]
         
         # Add more Bangladesh-specific recommendations based on activities
-        lifestyle_logs = [log for log in recent_logs if log.category == "lifestyle"]
-        energy_logs = [log for log in recent_logs if log.category == "energy"]
-        
         # Fan usage recommendations (Bangladesh-specific)
-        fan_logs = [log for log in lifestyle_logs if log.activity in ["fan_hour", "fan_energy_efficient"]]
-        if fan_logs:
-            total_fan_hours = sum(
-                log.meta_data.get("amount", 0) if log.meta_data else 0
-                for log in fan_logs
-            )
+        fan_activities = ["fan_hour", "fan_energy_efficient"]
+        if total("count", "lifestyle", fan_activities):
+            total_fan_hours = total("amount", "lifestyle", fan_activities)
             if total_fan_hours > 100:  # More than 100 hours/month
                 # Suggest energy-efficient fan
                 savings_fan = total_fan_hours * (0.033 - 0.020)  # Standard to efficient
@@ -2000,12 +1964,11 @@ class SuggestionService:
                 total_savings += savings_fan
         
         # AC usage recommendations (Bangladesh-specific)
-        ac_logs = [log for log in lifestyle_logs if "ac" in log.activity.lower()]
-        if ac_logs:
-            total_ac_hours = sum(
-                log.meta_data.get("amount", 0) if log.meta_data else 0
-                for log in ac_logs
-            )
+        def is_ac(activity: str) -> bool:
+            return "ac" in activity.lower()
+        
+        if total("count", "lifestyle", match=is_ac):
+            total_ac_hours = total("amount", "lifestyle", match=is_ac)
             if total_ac_hours > 50:  # More than 50 hours/month
                 # Suggest using fan instead of AC
                 fan_hours_saved = min(total_ac_hours * 0.3, 30)  # Replace 30% with fan, max 30 hours
@@ -2023,13 +1986,9 @@ class SuggestionService:
                 total_savings += savings_ac_to_fan
         
         # Diet: Local food recommendations (Bangladesh-specific)
-        diet_logs = [log for log in recent_logs if log.category == "diet"]
-        beef_logs = [log for log in diet_logs if log.activity in ["beef", "beef_biryani", "beef_curry"]]
-        if beef_logs:
-            total_beef_kg = sum(
-                log.meta_data.get("quantity_kg", 0) if log.meta_data else 0
-                for log in beef_logs
-            )
+        beef_activities = ["beef", "beef_biryani", "beef_curry"]
+        if total("count", "diet", beef_activities):
+            total_beef_kg = total("quantity_kg", "diet", beef_activities)
             if total_beef_kg > 0.5:  # More than 0.5kg beef/month
                 # Suggest local fish instead
                 savings_fish = total_beef_kg * (60.0 - 5.0)  # Beef (60) to Fish (5) = 55 kg CO2/kg saved
@@ -2050,7 +2009,7 @@ class SuggestionService:
         priority_actions = recommendations[:3]  # Top 3 by impact
         
         # Add AI-powered insights based on patterns
-        ai_insights = SuggestionService._generate_ai_insights(recent_logs, category_emissions)
+        ai_insights = SuggestionService._generate_ai_insights(activity_totals, category_emissions)
         
         return {
             "recommendations": recommendations,
@@ -2064,12 +2023,12 @@ class SuggestionService:
         }
     
     @staticmethod
-    def _generate_ai_insights(recent_logs: List[CarbonLog], category_emissions: Dict[str, float]) -> Dict[str, Any]:
+    def _generate_ai_insights(activity_totals: List[Dict[str, Any]], category_emissions: Dict[str, float]) -> Dict[str, Any]:
         """
         Generate AI-powered insights based on user's carbon patterns
         
         Args:
-            recent_logs: User's recent carbon logs
+            activity_totals: User's recent per-activity totals (LogMetadataService.activity_totals)
             category_emissions: Emissions by category
             
         Returns:
@@ -2077,14 +2036,14 @@ class SuggestionService:
         """
         insights = []
         
-        if not recent_logs or not category_emissions:
+        if not activity_totals or not category_emissions:
             return {"insights": insights, "summary": "Start tracking to get personalized insights!"}
         
         # Find top 3 activities by emissions
         activity_emissions = {}
-        for log in recent_logs:
-            activity = log.activity
-            activity_emissions[activity] = activity_emissions.get(activity, 0) + log.carbon_amount_kg
+        for row in activity_totals:
+            activity = row["activity"]
+            activity_emissions[activity] = activity_emissions.get(activity, 0) + row["carbon_kg"]
         
         top_activities = sorted(activity_emissions.items(), key=lambda x: x[1], reverse=True)[:3]
         
@@ -0,0 +1,122 @@
+"""
+In-memory full-text search over tips and suggestions
+Builds an inverted index once at startup and answers prefix queries
+without scanning every string
+"""
+
+import re
+from bisect import bisect_left
+from typing import Any, Dict, List, Set
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens (drops emoji and punctuation)"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class TipSearchIndex:
+    """Inverted index with prefix matching over tip documents"""
+
+    def __init__(self, documents: List[Dict[str, Any]]):
+        """
+        Args:
+            documents: Dicts with a "text" field plus any fields to return with results
+        """
+        self.documents = documents
+        self._postings: Dict[str, Set[int]] = {}
+        for doc_id, document in enumerate(documents):
+            for token in tokenize(document["text"]):
+                self._postings.setdefault(token, set()).add(doc_id)
+
+        # Sorted vocabulary so prefixes resolve to a contiguous range via bisect
+        self._terms = sorted(self._postings)
+
+    @classmethod
+    def from_catalogs(cls) -> "TipSearchIndex":
+        """Index daily tips, suggestion actions and recycling tips"""
+        from app.routers.recycling import RECYCLING_TIPS
+        from app.services.suggestion_service import SuggestionService
+
+        documents: List[Dict[str, Any]] = [
+            {"type": "daily_tip", "text": tip}
+            for tip in SuggestionService.DAILY_TIPS
+        ]
+
+        seen = set()
+        for category, activity_rules in SuggestionService.SUGGESTION_RULES.items():
+            for activity, rules in activity_rules.items():
+                for suggestion in rules.get("suggestions", []):
+                    key = (suggestion["action"], suggestion["description"])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    documents.append({
+                        "type": "suggestion",
+                        "text": f"{suggestion['action']} - {suggestion['description']}",
+                        "action": suggestion["action"],
+                        "description": suggestion["description"],
+                        "icon": suggestion.get("icon"),
+                        "category": category,
+                        "activity": activity,
+                    })
+
+        for waste_type, tips in RECYCLING_TIPS.items():
+            for tip in tips:
+                documents.append({
+                    "type": "recycling_tip",
+                    "text": tip,
+                    "waste_type": waste_type,
+                })
+
+        return cls(documents)
+
+    def _match_prefix(self, prefix: str) -> Set[int]:
+        """Get ids of documents containing a term that starts with prefix"""
+        matches: Set[int] = set()
+        index = bisect_left(self._terms, prefix)
+        while index < len(self._terms) and self._terms[index].startswith(prefix):
+            matches |= self._postings[self._terms[index]]
+            index += 1
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Search the index
+
+        Every query token must match a term in the document, either exactly or
+        as a prefix. Exact matches rank above prefix-only matches.
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of results
+
+        Returns:
+            Matching documents with a relevance score, best first
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        scores: Dict[int, int] = {}
+        for position, token in enumerate(tokens):
+            matches = self._match_prefix(token)
+            if position == 0:
+                candidates = matches
+            else:
+                candidates = set(scores) & matches
+            if not candidates:
+                return []
+
+            exact = self._postings.get(token, set())
+            scores = {
+                doc_id: scores.get(doc_id, 0) + (2 if doc_id in exact else 1)
+                for doc_id in candidates
+            }
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [
+            {**self.documents[doc_id], "score": score}
+            for doc_id, score in ranked
+        ]
@@ -0,0 +1,123 @@
+"""
+Access token revocation list
+Access tokens carry the user's active/admin claims, so when an admin
+changes a user every token issued before that moment must stop working.
+Revocations are kept as a compact user id -> cutoff time map; entries only
+need to outlive the access token lifetime. With Redis available the map is
+shared through a sorted set that each worker pulls from periodically.
+Without it a revocation is only known to the worker that made it (and is
+lost on restart), so callers must not trust token claims alone then.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+from app.config import settings
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional for local development
+    redis = None
+
+
+class RevocationList:
+    """Per-user "tokens issued before this time are invalid" cutoffs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cutoffs: Dict[str, float] = {}
+        self._client = None
+        self._client_checked = False
+        self._synced_at = 0.0
+        self._synced_score = 0.0
+        self._sync_failed = False
+
+    @staticmethod
+    def _retention() -> float:
+        """Cutoffs older than the longest-lived access token can be forgotten"""
+        return settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60 + 60
+
+    def _get_client(self):
+        """Redis client when configured and reachable, otherwise None (local only)"""
+        if self._client_checked:
+            return self._client
+        self._client_checked = True
+        if settings.REVOCATION_BACKEND == "local" or redis is None or not settings.REDIS_URL:
+            return None
+        try:
+            client = redis.Redis.from_url(
+                settings.REDIS_URL,
+                socket_connect_timeout=0.5,
+                socket_timeout=0.5,
+            )
+            client.ping()
+            self._client = client
+        except Exception as e:
+            print(f"⚠️ Token revocation: Redis unavailable ({e}), revocations stay in this process")
+        return self._client
+
+    def revoke_user(self, user_id) -> None:
+        """Invalidate every access token issued to a user until now"""
+        now = time.time()
+        key = str(user_id)
+        with self._lock:
+            self._cutoffs[key] = now
+
+        client = self._get_client()
+        if client is not None:
+            try:
+                pipe = client.pipeline()
+                pipe.zadd(settings.REVOCATION_REDIS_KEY, {key: now})
+                pipe.zremrangebyscore(settings.REVOCATION_REDIS_KEY, 0, now - self._retention())
+                pipe.execute()
+            except Exception as e:
+                print(f"⚠️ Token revocation: failed to publish revocation: {e}")
+
+    def _sync(self) -> None:
+        """Pull revocations published by other workers (throttled)"""
+        client = self._get_client()
+        now = time.monotonic()
+        if client is None or now - self._synced_at < settings.REVOCATION_SYNC_SECONDS:
+            return
+        self._synced_at = now
+        try:
+            entries = client.zrangebyscore(
+                settings.REVOCATION_REDIS_KEY, self._synced_score, "+inf", withscores=True
+            )
+        except Exception as e:
+            if not self._sync_failed:
+                print(f"⚠️ Token revocation: sync failed: {e}")
+            self._sync_failed = True
+            return
+
+        self._sync_failed = False
+        with self._lock:
+            for member, score in entries:
+                key = member.decode() if isinstance(member, bytes) else member
+                if score > self._cutoffs.get(key, 0.0):
+                    self._cutoffs[key] = score
+                self._synced_score = max(self._synced_score, score)
+
+    def _prune(self) -> None:
+        horizon = time.time() - self._retention()
+        with self._lock:
+            self._cutoffs = {key: cutoff for key, cutoff in self._cutoffs.items() if cutoff > horizon}
+
+    def is_shared(self) -> bool:
+        """Whether revocations made by any worker (or before a restart) are seen here"""
+        self._sync()
+        return self._get_client() is not None and not self._sync_failed
+
+    def is_revoked(self, user_id, issued_at: Optional[float]) -> bool:
+        """Whether a token issued to a user at issued_at has been revoked"""
+        self._sync()
+        cutoff = self._cutoffs.get(str(user_id))
+        if cutoff is None:
+            return False
+        if len(self._cutoffs) > 10000:
+            self._prune()
+        return issued_at is None or issued_at <= cutoff
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,139 @@
+"""
+SQLite UUID compaction
+UUID columns (CompactUUID in app/models.py) used to be stored on SQLite as
+36-character text; they are now 16-byte BLOBs. This rewrites the text ids
+of an existing database in place, one rowid range per transaction, with
+the position kept in job_checkpoints so an interrupted run resumes.
+Every UUID column of a table is converted in the same statement, so keys
+and the foreign keys pointing at them never disagree within a table;
+across tables they only agree once the run completes (the API runs it on
+startup before serving requests).
+"""
+
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import inspect, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.database import Base
+from app.models import CompactUUID, JobCheckpoint
+
+JOB_NAME = "compact_uuids"
+
+
+def _uuid_blob(value):
+    """Text UUID -> 16 bytes; anything else (BLOBs, NULLs, non-UUID text) is kept"""
+    if not isinstance(value, str):
+        return value
+    try:
+        return uuid.UUID(value).bytes
+    except ValueError:
+        return value
+
+
+class UUIDCompactionService:
+    """Converts text UUIDs to BLOBs on SQLite"""
+
+    @staticmethod
+    def uuid_columns(engine) -> Dict[str, List[str]]:
+        """UUID columns per existing table, in table name order"""
+        inspector = inspect(engine)
+        existing = set(inspector.get_table_names())
+        columns = {}
+        for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+            if table.name not in existing:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            names = [c.name for c in table.columns if isinstance(c.type, CompactUUID) and c.name in present]
+            if names:
+                columns[table.name] = names
+        return columns
+
+    @staticmethod
+    def is_complete(engine) -> bool:
+        if not inspect(engine).has_table(JobCheckpoint.__tablename__):
+            return False
+        with engine.connect() as conn:
+            completed_at = conn.execute(
+                select(JobCheckpoint.completed_at).where(JobCheckpoint.job_name == JOB_NAME)
+            ).scalar()
+        return completed_at is not None
+
+    @staticmethod
+    def _save_checkpoint(conn, last_key: Optional[str], processed: int, completed: bool = False) -> None:
+        now = datetime.utcnow()
+        values = {"last_key": last_key, "processed": processed, "updated_at": now}
+        if completed:
+            values["completed_at"] = now
+        stmt = insert(JobCheckpoint).values(job_name=JOB_NAME, queued=0, started_at=now, **values)
+        conn.execute(stmt.on_conflict_do_update(index_elements=[JobCheckpoint.job_name], set_=values))
+
+    @staticmethod
+    def run(
+        engine,
+        batch_size: int = 5000,
+        on_batch: Optional[Callable[[str, int], None]] = None,
+    ) -> int:
+        """
+        Convert every remaining text UUID (SQLite only; no-op once complete)
+        Stop the API while this runs unless it is the API's own startup.
+
+        Args:
+            batch_size: Rows rewritten per transaction
+            on_batch: Called with (table, total rows converted) after each commit
+
+        Returns:
+            Number of rows converted by this run
+        """
+        if engine.dialect.name != "sqlite" or UUIDCompactionService.is_complete(engine):
+            return 0
+        JobCheckpoint.__table__.create(bind=engine, checkfirst=True)
+        tables = UUIDCompactionService.uuid_columns(engine)
+
+        with engine.connect() as conn:
+            # Keys change while their references still hold the old value
+            foreign_keys = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            conn.connection.driver_connection.create_function("uuid_blob", 1, _uuid_blob, deterministic=True)
+
+            checkpoint = conn.execute(
+                select(JobCheckpoint.last_key, JobCheckpoint.processed).where(JobCheckpoint.job_name == JOB_NAME)
+            ).first()
+            resume_table, resume_rowid = None, 0
+            if checkpoint is not None and checkpoint.last_key:
+                resume_table, _, rowid = checkpoint.last_key.rpartition(":")
+                resume_rowid = int(rowid)
+            processed = checkpoint.processed if checkpoint is not None else 0
+            converted = 0
+
+            for table, columns in tables.items():
+                if resume_table is not None and table < resume_table:
+                    continue  # Finished by an earlier run
+                last_rowid = resume_rowid if table == resume_table else 0
+                assignments = ", ".join(f'"{c}" = uuid_blob("{c}")' for c in columns)
+                has_text = " OR ".join(f"typeof(\"{c}\") = 'text'" for c in columns)
+                while True:
+                    upper = conn.exec_driver_sql(
+                        f'SELECT max(rowid) FROM (SELECT rowid FROM "{table}" WHERE rowid > ? ORDER BY rowid LIMIT ?)',
+                        (last_rowid, batch_size),
+                    ).scalar()
+                    if upper is None:
+                        break
+                    result = conn.exec_driver_sql(
+                        f'UPDATE "{table}" SET {assignments} WHERE rowid > ? AND rowid <= ? AND ({has_text})',
+                        (last_rowid, upper),
+                    )
+                    converted += result.rowcount
+                    last_rowid = upper
+                    UUIDCompactionService._save_checkpoint(conn, f"{table}:{last_rowid}", processed + converted)
+                    conn.commit()
+                    if on_batch is not None:
+                        on_batch(table, converted)
+
+            UUIDCompactionService._save_checkpoint(conn, None, processed + converted, completed=True)
+            conn.commit()
+            if foreign_keys:
+                conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+        return converted
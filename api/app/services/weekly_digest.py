@@ -0,0 +1,246 @@
+"""
+Weekly digest emails
+Batch job that queues each opted-in user's weekly report summary into the
+email outbox. Users are streamed in id order, reports are computed per
+chunk with grouped queries, and a checkpoint is committed together with
+each chunk's emails so a crashed run resumes where it stopped.
+Every digest carries a signed one-click unsubscribe link (and the
+List-Unsubscribe headers mail clients show their own button for).
+"""
+
+import hashlib
+import hmac
+import uuid
+from datetime import datetime, timedelta
+from html import escape
+from string import Template
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import EmailOutbox, JobCheckpoint, User
+from app.services.report_service import ReportService
+
+# Templates are parsed once at import and only substituted per user
+WEEKLY_DIGEST_SUBJECT = Template("Your week: $total_kg kg CO₂ - MyCarbonFootprint")
+
+WEEKLY_DIGEST_HTML = Template("""
+<!DOCTYPE html>
+<html>
+<body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+    <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+        <div style="background: #10b981; color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0;">
+            <h1>🌱 Your weekly carbon summary</h1>
+            <p>$week_label</p>
+        </div>
+        <div style="background: #f9fafb; padding: 20px; border-radius: 0 0 10px 10px;">
+            <p>Hi $name,</p>
+            <p>You logged <strong>$total_entries</strong> activities adding up to <strong>$total_kg kg CO₂</strong>.</p>
+            <p>$comparison</p>
+            <p>Biggest source: <strong>$biggest_category</strong> ($biggest_percentage%)</p>
+            <p>💡 $top_tip</p>
+            <p style="text-align: center;">
+                <a href="$report_url" style="display: inline-block; padding: 12px 30px; background: #10b981; color: white; text-decoration: none; border-radius: 5px;">View full report</a>
+            </p>
+        </div>
+        <p style="text-align: center; color: #6b7280; font-size: 12px;">
+            You receive this email because you turned on weekly digests.
+            <a href="$unsubscribe_url" style="color: #6b7280;">Unsubscribe</a>
+        </p>
+    </div>
+</body>
+</html>
+""")
+
+WEEKLY_DIGEST_TEXT = Template("""Your weekly carbon summary ($week_label)
+
+Hi $name,
+
+You logged $total_entries activities adding up to $total_kg kg CO2.
+$comparison
+Biggest source: $biggest_category ($biggest_percentage%)
+
+Tip: $top_tip
+
+View full report: $report_url
+
+You receive this email because you turned on weekly digests.
+Unsubscribe: $unsubscribe_url
+""")
+
+
+class WeeklyDigestService:
+    """Service for rendering and queuing weekly digest emails"""
+
+    @staticmethod
+    def default_week_start(today: Optional[datetime] = None) -> datetime:
+        """Monday of the last full week"""
+        today = today or datetime.utcnow()
+        this_monday = (today - timedelta(days=today.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+        return this_monday - timedelta(days=7)
+
+    @staticmethod
+    def unsubscribe_token(user_id) -> str:
+        """Signature that lets a digest's unsubscribe link turn digests off without logging in"""
+        message = f"weekly_digest_unsubscribe:{user_id}".encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def unsubscribe_url(user_id) -> str:
+        query = urlencode({"user": str(user_id), "token": WeeklyDigestService.unsubscribe_token(user_id)})
+        return f"{settings.API_URL}/api/v1/carbon/reports/weekly/digest/unsubscribe?{query}"
+
+    @staticmethod
+    def unsubscribe(db: Session, user_id: str, token: str) -> bool:
+        """
+        Turn digests off for the user an unsubscribe link was signed for
+
+        Returns:
+            False if the signature doesn't match
+        """
+        if not hmac.compare_digest(WeeklyDigestService.unsubscribe_token(user_id), token):
+            return False
+        db.query(User).filter(User.id == WeeklyDigestService._cursor(user_id)).update(
+            {"weekly_digest_opt_in": False}, synchronize_session=False
+        )
+        db.commit()
+        return True
+
+    @staticmethod
+    def render(name: str, report: Dict[str, Any], unsubscribe_url: str) -> Tuple[str, str, str]:
+        """
+        Render a digest email from a weekly report
+
+        Returns:
+            (subject, html_content, text_content)
+        """
+        if report["previous_week_kg"] > 0:
+            direction = "less" if report["is_better"] else "more"
+            comparison = f"That's {abs(report['percent_change'])}% {direction} than the week before."
+        else:
+            comparison = "Keep logging to compare with next week."
+        week_start = datetime.fromisoformat(report["week_start"])
+        values = {
+            "name": name,
+            "week_label": f"{week_start:%b %d} - {week_start + timedelta(days=6):%b %d, %Y}",
+            "total_entries": report["total_entries"],
+            "total_kg": report["total_kg"],
+            "comparison": comparison,
+            "biggest_category": report["biggest_source"]["category"] or "none",
+            "biggest_percentage": report["biggest_source"]["percentage"],
+            "top_tip": report["top_tip"],
+            "report_url": f"{settings.FRONTEND_URL}/reports?week_start={week_start.date().isoformat()}",
+            "unsubscribe_url": unsubscribe_url,
+        }
+        html_values = {key: escape(str(value)) for key, value in values.items()}
+        return (
+            WEEKLY_DIGEST_SUBJECT.substitute(values),
+            WEEKLY_DIGEST_HTML.substitute(html_values),
+            WEEKLY_DIGEST_TEXT.substitute(values),
+        )
+
+    @staticmethod
+    def _cursor(last_key: Optional[str]):
+        if last_key is None or settings.DATABASE_URL.startswith("sqlite"):
+            return last_key
+        return uuid.UUID(last_key)
+
+    @staticmethod
+    def run(
+        db: Session,
+        week_start: datetime,
+        chunk_size: int = 1000,
+        emails_per_minute: int = 1000,
+        restart: bool = False,
+        on_chunk: Optional[Callable[[JobCheckpoint], None]] = None,
+    ) -> JobCheckpoint:
+        """
+        Queue digests for every opted-in, active, verified user
+
+        Emails are scheduled into the outbox `emails_per_minute` apart so the
+        sender spreads them out instead of bursting. Users with no logs in
+        the week or the week before are skipped.
+
+        Args:
+            restart: Ignore an existing checkpoint for this week and start over
+
+        Returns:
+            The job checkpoint (processed users, queued emails, completion)
+        """
+        job_name = f"weekly_digest:{week_start.date().isoformat()}"
+        checkpoint = db.get(JobCheckpoint, job_name)
+        if checkpoint is None:
+            checkpoint = JobCheckpoint(job_name=job_name, processed=0, queued=0, started_at=datetime.utcnow())
+            db.add(checkpoint)
+            db.commit()
+        elif restart:
+            checkpoint.last_key = None
+            checkpoint.processed = 0
+            checkpoint.queued = 0
+            checkpoint.started_at = datetime.utcnow()
+            checkpoint.completed_at = None
+            db.commit()
+        elif checkpoint.completed_at is not None:
+            return checkpoint
+
+        interval = timedelta(minutes=1) / max(emails_per_minute, 1)
+        while True:
+            query = (
+                db.query(User.id, User.email, User.name)
+                .filter(
+                    User.is_active == True,
+                    User.email_verified == True,
+                    User.weekly_digest_opt_in == True,
+                )
+                .order_by(User.id)
+            )
+            if checkpoint.last_key is not None:
+                query = query.filter(User.id > WeeklyDigestService._cursor(checkpoint.last_key))
+            users = query.limit(chunk_size).all()
+            if not users:
+                checkpoint.completed_at = datetime.utcnow()
+                db.commit()
+                return checkpoint
+
+            reports = ReportService.get_weekly_reports(db, [user.id for user in users], week_start)
+
+            # Continue the send schedule where the previous chunk left it
+            now = datetime.utcnow()
+            send_at = max(now, checkpoint.started_at + interval * checkpoint.queued)
+            rows = []
+            for user in users:
+                report = reports[user.id]
+                if report["total_entries"] == 0 and report["previous_week_kg"] == 0:
+                    continue
+                unsubscribe_url = WeeklyDigestService.unsubscribe_url(user.id)
+                subject, html_body, text_body = WeeklyDigestService.render(user.name, report, unsubscribe_url)
+                rows.append({
+                    "kind": "weekly_digest",
+                    "to_email": user.email,
+                    "subject": subject,
+                    "html_body": html_body,
+                    "text_body": text_body,
+                    # RFC 8058 one-click unsubscribe (POSTed by the mail client)
+                    "headers": {
+                        "List-Unsubscribe": f"<{unsubscribe_url}>",
+                        "List-Unsubscribe-Post": "List-Unsubscribe=One-Click",
+                    },
+                    "status": "pending",
+                    "attempts": 0,
+                    "next_attempt_at": send_at,
+                    "created_at": now,
+                })
+                send_at += interval
+            if rows:
+                db.execute(insert(EmailOutbox), rows)
+
+            # The emails and the checkpoint commit together
+            checkpoint.last_key = str(users[-1].id)
+            checkpoint.processed += len(users)
+            checkpoint.queued += len(rows)
+            db.commit()
+            if on_chunk is not None:
+                on_chunk(checkpoint)
@@ -0,0 +1,193 @@
+"""
+Group-commit write queue
+SQLite allows one writer at a time, so concurrent requests that each commit
+queue up on the write lock and pay for their own commit. With the queue
+enabled, requests hand their write to a single writer thread. It runs
+everything that queued up while the previous group was committing in one
+transaction (one SAVEPOINT per write, so a failing write only rolls back
+itself) and commits once. Each request then gets its own result or error.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.config import settings
+
+# A write job: runs inside the shared transaction, must not commit, and
+# should return plain data (ORM objects stay usable but are detached)
+WriteJob = Callable[[Session], Any]
+
+
+class GroupCommitQueue:
+    """Single writer thread that commits queued writes in groups"""
+
+    def __init__(self):
+        self._queue: "queue.Queue[Optional[Tuple[WriteJob, Future]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._session_factory = None
+        self._metrics: Dict[str, int] = {"batches": 0, "writes": 0, "failed_writes": 0, "failed_commits": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.WRITE_QUEUE_ENABLED
+
+    @staticmethod
+    def _create_engine():
+        """Dedicated single-connection engine for the writer thread"""
+        from app.database import install_sqlite_pragmas, sqlite_pragmas
+
+        if not settings.DATABASE_URL.startswith("sqlite"):
+            return create_engine(settings.DATABASE_URL, pool_pre_ping=True, pool_size=1, max_overflow=0)
+
+        engine = create_engine(
+            settings.DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            pool_size=1,
+            max_overflow=0,
+        )
+        install_sqlite_pragmas(engine, sqlite_pragmas())
+
+        # pysqlite starts transactions lazily and would commit the group when the
+        # first SAVEPOINT is released; take over BEGIN so savepoints nest properly.
+        # IMMEDIATE takes the write lock up front instead of failing on upgrade.
+        @event.listens_for(engine, "connect")
+        def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, "begin")
+        def _begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+        return engine
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._session_factory = sessionmaker(
+                bind=self._create_engine(), autoflush=False, expire_on_commit=False
+            )
+            self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, job: WriteJob) -> Future:
+        """Queue a write; the future resolves once its group has committed"""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((job, future))
+        return future
+
+    async def run(self, job: WriteJob) -> Any:
+        """Queue a write and wait for its committed result (or its error)"""
+        return await asyncio.wrap_future(self.submit(job))
+
+    def _run(self) -> None:
+        window = settings.WRITE_QUEUE_WINDOW_MS / 1000.0
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + window
+            while len(batch) < settings.WRITE_QUEUE_MAX_BATCH:
+                # Take everything that piled up during the previous commit; only
+                # linger for the window when this write would otherwise go alone
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if len(batch) > 1 or remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                # Never let the writer thread die with requests waiting on it
+                print(f"❌ Write queue: batch failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _run_batch(self, batch: List[Tuple[WriteJob, Future]]) -> None:
+        """Run a group of writes in one transaction, each in its own savepoint"""
+        batch = [(job, future) for job, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        outcomes: List[Tuple[Future, Any, Optional[BaseException]]] = []
+        db = self._session_factory()
+        try:
+            for job, future in batch:
+                try:
+                    with db.begin_nested():
+                        result = job(db)
+                    outcomes.append((future, result, None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Write queue: group commit failed ({e}), retrying writes one by one")
+            with self._lock:
+                self._metrics["failed_commits"] += 1
+            outcomes = [self._run_alone(job, future) for job, future in batch]
+        finally:
+            db.close()
+
+        with self._lock:
+            self._metrics["batches"] += 1
+            self._metrics["writes"] += len(outcomes)
+            self._metrics["failed_writes"] += sum(1 for _, _, error in outcomes if error is not None)
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _run_alone(self, job: WriteJob, future: Future) -> Tuple[Future, Any, Optional[BaseException]]:
+        db = self._session_factory()
+        try:
+            result = job(db)
+            db.commit()
+            return future, result, None
+        except Exception as e:
+            db.rollback()
+            return future, None, e
+        finally:
+            db.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Batch counters since process start"""
+        with self._lock:
+            metrics: Dict[str, Any] = dict(self._metrics)
+        metrics["enabled"] = self.enabled
+        metrics["average_batch"] = round(metrics["writes"] / metrics["batches"], 2) if metrics["batches"] else 0
+        metrics["pending"] = self._queue.qsize()
+        return metrics
+
+    def stop(self) -> None:
+        """Finish queued writes and stop the writer thread (application shutdown)"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=10)
+
+
+write_queue = GroupCommitQueue()
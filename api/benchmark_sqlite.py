@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark: concurrent SQLite read/write throughput with and without the
+tuning pragmas from Settings (see SQLITE_* in app/config.py)
+Usage: python benchmark_sqlite.py [--seconds N] [--readers N] [--writers N] [--rows N]
+
+Each profile runs against a fresh temporary database file. Writers insert
+single log rows, committing each one like the API does; readers run a
+per-user aggregate like the stats endpoints.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.database import install_sqlite_pragmas, sqlite_pragmas
+
+USERS = 1000
+
+
+def run_profile(pragmas: Dict[str, Any], seconds: float, readers: int, writers: int, rows: int) -> Dict[str, float]:
+    """Run the mixed workload against a new database file with the given pragmas"""
+    directory = tempfile.mkdtemp(prefix="sqlite-bench-")
+    engine = create_engine(
+        f"sqlite:///{os.path.join(directory, 'bench.db')}",
+        connect_args={"check_same_thread": False},
+        pool_size=readers + writers,
+    )
+    install_sqlite_pragmas(engine, pragmas)
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE logs (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+            "carbon_amount_kg REAL NOT NULL, created_at REAL NOT NULL)"
+        ))
+        conn.execute(text("CREATE INDEX ix_logs_user_created ON logs (user_id, created_at)"))
+        conn.execute(
+            text("INSERT INTO logs (user_id, carbon_amount_kg, created_at) VALUES (:u, :kg, :t)"),
+            [{"u": random.randrange(USERS), "kg": random.random() * 10, "t": time.time()} for _ in range(rows)],
+        )
+
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def count(key: str) -> None:
+        with lock:
+            counts[key] += 1
+
+    def writer() -> None:
+        while time.monotonic() < deadline:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO logs (user_id, carbon_amount_kg, created_at) VALUES (:u, :kg, :t)"),
+                        {"u": random.randrange(USERS), "kg": random.random() * 10, "t": time.time()},
+                    )
+                count("writes")
+            except OperationalError:
+                count("errors")
+
+    def reader() -> None:
+        while time.monotonic() < deadline:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT COUNT(*), SUM(carbon_amount_kg) FROM logs WHERE user_id = :u"),
+                        {"u": random.randrange(USERS)},
+                    ).one()
+                count("reads")
+            except OperationalError:
+                count("errors")
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {key: value / seconds for key, value in counts.items()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark SQLite with and without the tuning pragmas")
+    parser.add_argument("--seconds", type=float, default=10, help="Duration of each profile run")
+    parser.add_argument("--readers", type=int, default=8, help="Concurrent reader threads")
+    parser.add_argument("--writers", type=int, default=2, help="Concurrent writer threads")
+    parser.add_argument("--rows", type=int, default=100000, help="Rows loaded before the run")
+    args = parser.parse_args()
+
+    tuned = sqlite_pragmas()
+    if not tuned:
+        print("⚠️ SQLITE_PRAGMAS_ENABLED is off - both profiles would be identical")
+        return 1
+
+    profiles = {
+        # Only the busy timeout, so the default profile waits for locks instead of failing fast
+        "default": {"busy_timeout": tuned["busy_timeout"]},
+        "tuned": tuned,
+    }
+    print(f"📊 {args.readers} readers / {args.writers} writers, {args.seconds:.0f}s per profile, {args.rows} rows")
+    print(f"   tuned pragmas: {tuned}")
+    results = {}
+    for name, pragmas in profiles.items():
+        results[name] = run_profile(pragmas, args.seconds, args.readers, args.writers, args.rows)
+        result = results[name]
+        print(f"   {name:8} reads/s {result['reads']:10.1f}   writes/s {result['writes']:9.1f}   "
+              f"errors/s {result['errors']:6.1f}")
+
+    for key in ("reads", "writes"):
+        if results["default"][key]:
+            print(f"✅ {key}: {results['tuned'][key] / results['default'][key]:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
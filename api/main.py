@@ -10,7 +10,7 @@ import os
 from sqlalchemy import text
 
 from app.config import settings
-from app.database import engine
+from app.database import engine, read_engine
 from app.routers import health, auth, carbon, gamification, recycling, cfc, admin
 
 # Initialize FastAPI app
@@ -48,6 +48,11 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Read replica: keep users on the primary right after they write
+if read_engine is not None:
+    from app.services.read_routing import ReadYourWritesMiddleware
+    app.add_middleware(ReadYourWritesMiddleware)
+
 # Check database tables on startup
 @app.on_event("startup")
 async def check_database():
@@ -131,11 +136,22 @@ async def startup_event():
             print(f"⚠️  Could not check database tables: {e}")
             print("⚠️  Make sure database is running and accessible")
     
+        # Monthly carbon_logs partitions: make sure the coming months exist
+        try:
+            from app.services.log_partitions import LogPartitionService
+            if LogPartitionService.is_partitioned(engine):
+                created = LogPartitionService.ensure_partitions(engine)
+                if created:
+                    print(f"✅ Created {created} carbon_logs partitions")
+        except Exception as e:
+            print(f"⚠️  Could not create carbon_logs partitions: {e}")
+            print("⚠️  Run maintain_log_partitions.py manually")
+    
     if settings.DATABASE_URL.startswith("sqlite"):
         try:
             from app.database import Base, engine
             # Import all models to register them
-            from app.models import User, CarbonLog, Badge, UserBadge, Challenge, RecyclingPoint, CFCReport
+            from app.models import User, CarbonLog, Badge, UserBadge, Challenge, RecyclingPoint, CFCReport, RecommendationSnapshot, PointsLedger, PointsPeriodTotal, UserChallengeProgress, UserActivityDays, UserFollow, EcoScoreHistory, EmailOutbox, JobCheckpoint, UsedRefreshToken
             
             # Extract database file path for logging
             db_path = settings.DATABASE_URL.replace("sqlite:///", "")
@@ -173,6 +189,55 @@ async def startup_event():
                 print(f"⚠️ Could not check/add email verification columns: {migration_error}")
                 print("You may need to run migrate_email_verification.py manually")
             
+            # Challenge watch columns (category/activity) were added after launch
+            try:
+                challenge_columns = [col['name'] for col in inspect(engine).get_columns('challenges')]
+                if 'category' not in challenge_columns:
+                    print("⚠️ Challenge watch columns missing - adding them...")
+                    with engine.connect() as conn:
+                        conn.execute(text("ALTER TABLE challenges ADD COLUMN category VARCHAR(50)"))
+                        conn.execute(text("ALTER TABLE challenges ADD COLUMN activity VARCHAR(255)"))
+                        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_challenges_category ON challenges(category)"))
+                        conn.commit()
+                    print("✅ Challenge watch columns added!")
+            except Exception as migration_error:
+                print(f"⚠️ Could not check/add challenge columns: {migration_error}")
+            
+            # Weekly digest opt-in was added after launch
+            try:
+                user_columns = [col['name'] for col in inspect(engine).get_columns('users')]
+                if 'weekly_digest_opt_in' not in user_columns:
+                    print("⚠️ Weekly digest column missing - adding it...")
+                    with engine.connect() as conn:
+                        conn.execute(text("ALTER TABLE users ADD COLUMN weekly_digest_opt_in BOOLEAN NOT NULL DEFAULT 0"))
+                        conn.commit()
+                    print("✅ Weekly digest column added!")
+            except Exception as migration_error:
+                print(f"⚠️ Could not check/add weekly digest column: {migration_error}")
+            
+            # Email headers (List-Unsubscribe) were added to the outbox after launch
+            try:
+                outbox_columns = [col['name'] for col in inspect(engine).get_columns('email_outbox')]
+                if 'headers' not in outbox_columns:
+                    print("⚠️ Email outbox headers column missing - adding it...")
+                    with engine.connect() as conn:
+                        conn.execute(text("ALTER TABLE email_outbox ADD COLUMN headers JSON"))
+                        conn.commit()
+                    print("✅ Email outbox headers column added!")
+            except Exception as migration_error:
+                print(f"⚠️ Could not check/add email outbox headers column: {migration_error}")
+            
+            # UUIDs are stored as 16-byte BLOBs; convert text ids written by older versions
+            try:
+                from app.services.uuid_compaction import UUIDCompactionService
+                converted = UUIDCompactionService.run(engine)
+                if converted:
+                    print(f"✅ Converted UUIDs to compact storage in {converted} rows")
+                    print("   Run migrate_compact_uuids.py to VACUUM and shrink the database file")
+            except Exception as migration_error:
+                print(f"⚠️ Could not convert UUID columns: {migration_error}")
+                print("You may need to run migrate_compact_uuids.py manually")
+            
             # Verify after creation
             if os.path.exists(db_path):
                 file_size = os.path.getsize(db_path)
@@ -184,12 +249,22 @@ async def startup_event():
             print(f"❌ Error creating tables: {e}")
             print(traceback.format_exc())
             print("Continuing anyway - tables might already exist...")
+    
+    # Background sender for queued emails
+    from app.services.email_outbox import email_outbox
+    await email_outbox.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Shutdown tasks"""
     print("🌱 MyCarbonFootprint API shutting down...")
+    from app.services.email_outbox import email_outbox
+    await email_outbox.stop()
+    from app.services.write_queue import write_queue
+    write_queue.stop()
+    from app.auth import password_hasher
+    password_hasher.shutdown()
 
 
 if __name__ == "__main__":
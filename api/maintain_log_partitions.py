@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Daily job: create upcoming carbon_logs partitions and apply the retention policy (PostgreSQL)
+Usage: python maintain_log_partitions.py [--months-ahead N] [--retention-months N] [--action archive|drop] [--dry-run]
+
+Retention defaults to CARBON_LOG_RETENTION_MONTHS (0: keep every month).
+"""
+
+import argparse
+import sys
+
+from app.config import settings
+from app.database import engine
+from app.services.log_partitions import RETENTION_ACTIONS, LogPartitionService
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Maintain carbon_logs monthly partitions")
+    parser.add_argument("--months-ahead", type=int, default=settings.CARBON_LOG_PARTITION_MONTHS_AHEAD,
+                        help="Create partitions this many months past the current one")
+    parser.add_argument("--retention-months", type=int, default=settings.CARBON_LOG_RETENTION_MONTHS,
+                        help="Retire months older than this many full months (0 keeps everything)")
+    parser.add_argument("--action", choices=RETENTION_ACTIONS, default=settings.CARBON_LOG_RETENTION_ACTION,
+                        help=f"archive: detach into the {settings.CARBON_LOG_ARCHIVE_SCHEMA} schema, drop: delete")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only list the partitions and what retention would retire")
+    args = parser.parse_args()
+
+    if not LogPartitionService.is_partitioned(engine):
+        print("❌ carbon_logs is not partitioned (PostgreSQL only; run alembic upgrade head)")
+        return 1
+
+    try:
+        if not args.dry_run:
+            created = LogPartitionService.ensure_partitions(engine, args.months_ahead)
+            print(f"✅ {created} partitions created")
+
+        for partition in LogPartitionService.partitions(engine):
+            print(f"   {partition['name']}: ~{partition['rows']} rows")
+
+        if args.dry_run:
+            expired = LogPartitionService.expired_partitions(engine, args.retention_months)
+            print(f"📊 Retention would {args.action} {len(expired)} partitions: "
+                  f"{', '.join(p['name'] for p in expired) or '-'}")
+            return 0
+
+        retired = LogPartitionService.apply_retention(engine, args.retention_months, args.action)
+    except Exception as e:
+        print(f"❌ Partition maintenance failed: {e}")
+        return 1
+
+    if retired:
+        print(f"✅ Retention ({args.action}): {', '.join(retired)} retired")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,6 +20,7 @@ def make_admin(email: str):
         user.is_admin = True
         db.commit()
         print(f"✅ User '{email}' is now an admin!")
+        print("   Sign in again (or refresh the access token) to pick up admin access.")
         return True
     except Exception as e:
         print(f"❌ Error: {e}")
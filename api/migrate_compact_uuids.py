@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Convert SQLite UUID columns from 36-character text to 16-byte BLOBs
+Usage: python migrate_compact_uuids.py [DB_PATH] [--batch-size N] [--no-vacuum]
+
+Stop the API first (it also runs the conversion on startup). Rows are
+rewritten in rowid batches, one commit each; re-running after an
+interruption resumes from the checkpoint. VACUUM then rebuilds the file so
+the freed space is returned (needs free disk space about the size of the
+database).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.config import settings
+from app.services.uuid_compaction import UUIDCompactionService
+
+# Table and index whose size the conversion is mostly about
+REPORTED_OBJECTS = ("carbon_logs", "ix_carbon_logs_user_id")
+
+
+def object_sizes(engine) -> dict:
+    """Bytes used by the reported table/index (empty if dbstat is not compiled in)"""
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN (:table, :index) GROUP BY name"
+            ), {"table": REPORTED_OBJECTS[0], "index": REPORTED_OBJECTS[1]}).all()
+        return {name: size for name, size in rows}
+    except Exception:
+        return {}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Store SQLite UUIDs as 16-byte BLOBs")
+    parser.add_argument("db_path", nargs="?", default=None,
+                        help="SQLite database file (default: DATABASE_URL)")
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="Rows rewritten per transaction")
+    parser.add_argument("--no-vacuum", action="store_true",
+                        help="Skip VACUUM (the file keeps its size until the next one)")
+    args = parser.parse_args()
+
+    if args.db_path:
+        if not os.path.exists(args.db_path):
+            print(f"❌ Database file not found: {args.db_path}")
+            return 1
+        url = f"sqlite:///{args.db_path}"
+    elif settings.DATABASE_URL.startswith("sqlite"):
+        url = settings.DATABASE_URL
+    else:
+        print("✅ Not an SQLite database: PostgreSQL already stores UUIDs natively")
+        return 0
+
+    engine = create_engine(url)
+    db_path = engine.url.database
+    before_file = os.path.getsize(db_path)
+    before = object_sizes(engine)
+    started = time.monotonic()
+
+    def report_progress(table, converted):
+        print(f"   {table}: {converted} rows converted ({time.monotonic() - started:.1f}s)")
+
+    try:
+        converted = UUIDCompactionService.run(engine, batch_size=args.batch_size, on_batch=report_progress)
+    except Exception as e:
+        print(f"❌ UUID conversion failed: {e}")
+        print("   Re-run to resume from the last checkpoint")
+        return 1
+    print(f"✅ {converted} rows converted ({time.monotonic() - started:.1f}s)")
+
+    if not args.no_vacuum:
+        print("Running VACUUM...")
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+        after = object_sizes(engine)
+        for name in REPORTED_OBJECTS:
+            if name in before and name in after:
+                print(f"   {name}: {before[name] / 1024:.0f} KiB -> {after[name] / 1024:.0f} KiB")
+        print(f"   file: {before_file / 1024:.0f} KiB -> {os.path.getsize(db_path) / 1024:.0f} KiB")
+    engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Nightly job: precompute personalized recommendations for active users
+Usage: python precompute_recommendations.py [--active-days N] [--days N] [--workers N] [--shard-size N]
+"""
+
+import argparse
+import sys
+import time
+
+from app.config import settings
+from app.services.recommendation_cache import RecommendationCache
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Precompute recommendations for active users")
+    parser.add_argument("--active-days", type=int, default=settings.RECOMMENDATIONS_ACTIVE_DAYS,
+                        help="Precompute users who logged in the last N days")
+    parser.add_argument("--days", type=int, default=30,
+                        help="Look-back window used by the recommendations")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--shard-size", type=int, default=settings.RECOMMENDATIONS_SHARD_SIZE,
+                        help="User ids per worker shard")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    try:
+        result = RecommendationCache.precompute_active_users(
+            active_days=args.active_days,
+            days=args.days,
+            workers=args.workers,
+            shard_size=args.shard_size,
+        )
+    except Exception as e:
+        print(f"❌ Precompute failed: {e}")
+        return 1
+
+    elapsed = time.monotonic() - started
+    print(f"✅ Precomputed recommendations for {result['users']} users "
+          f"in {result['shards']} shards ({elapsed:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Weekly job: queue digest emails for users who opted in
+Usage: python send_weekly_digest.py [--week-start YYYY-MM-DD] [--chunk-size N] [--per-minute N] [--restart]
+
+Progress is checkpointed per chunk; re-running after a crash resumes the
+same week where it stopped.
+"""
+
+import argparse
+import sys
+import time
+from datetime import date, datetime
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.weekly_digest import WeeklyDigestService
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Queue weekly digest emails")
+    parser.add_argument("--week-start", type=date.fromisoformat, default=None,
+                        help="Monday of the week to summarize (default: last full week)")
+    parser.add_argument("--chunk-size", type=int, default=settings.WEEKLY_DIGEST_CHUNK_SIZE,
+                        help="Users per chunk (one checkpoint per chunk)")
+    parser.add_argument("--per-minute", type=int, default=settings.WEEKLY_DIGEST_EMAILS_PER_MINUTE,
+                        help="Maximum digest emails sent per minute")
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignore the checkpoint and start the week over")
+    args = parser.parse_args()
+
+    if args.week_start is not None:
+        week_start = datetime.combine(args.week_start, datetime.min.time())
+    else:
+        week_start = WeeklyDigestService.default_week_start()
+
+    started = time.monotonic()
+
+    def report_progress(checkpoint):
+        print(f"   {checkpoint.processed} users processed, {checkpoint.queued} emails queued "
+              f"({time.monotonic() - started:.1f}s)")
+
+    db = SessionLocal()
+    try:
+        checkpoint = WeeklyDigestService.run(
+            db,
+            week_start,
+            chunk_size=args.chunk_size,
+            emails_per_minute=args.per_minute,
+            restart=args.restart,
+            on_chunk=report_progress,
+        )
+        processed, queued = checkpoint.processed, checkpoint.queued
+    except Exception as e:
+        print(f"❌ Weekly digest failed: {e}")
+        print("   Re-run to resume from the last checkpoint")
+        return 1
+    finally:
+        db.close()
+
+    elapsed = time.monotonic() - started
+    print(f"✅ Weekly digest for {week_start.date()}: {queued} emails queued "
+          f"for {processed} users ({elapsed:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
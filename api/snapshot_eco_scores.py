@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+End-of-day job: snapshot eco score, points and level for every active user
+Usage: python snapshot_eco_scores.py [--date YYYY-MM-DD]
+"""
+
+import argparse
+import sys
+import time
+from datetime import date
+
+from app.database import SessionLocal
+from app.services.eco_history import EcoScoreHistoryService
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Snapshot daily eco scores for active users")
+    parser.add_argument("--date", type=date.fromisoformat, default=None,
+                        help="Day to snapshot (default: today, UTC)")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        written = EcoScoreHistoryService.snapshot_day(db, args.date)
+    except Exception as e:
+        print(f"❌ Snapshot failed: {e}")
+        return 1
+    finally:
+        db.close()
+
+    elapsed = time.monotonic() - started
+    print(f"✅ Wrote {written} eco score snapshots ({elapsed:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
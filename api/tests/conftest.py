@@ -0,0 +1,45 @@
+"""
+Test configuration
+Settings and the database engine are created at import time, so the
+environment is set here, before any app module is imported: a throwaway
+SQLite database, fast password hashing, no background email sender.
+"""
+
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="carbon-tracker-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["EMAIL_OUTBOX_ENABLED"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["REDIS_URL"] = ""
+
+import uuid  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    """The API with its startup tasks run (tables created)"""
+    import main
+
+    with TestClient(main.app):
+        yield main.app
+
+
+@pytest.fixture
+def register_user(app):
+    """Register a fresh user; returns (user id, Authorization header)"""
+    def register():
+        client = TestClient(app)
+        email = f"{uuid.uuid4().hex[:12]}@example.com"
+        response = client.post("/api/v1/auth/register", json={"email": email, "password": "pw", "name": "Test"})
+        assert response.status_code in (200, 201), response.text
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        user_id = client.get("/api/v1/auth/me", headers=headers).json()["id"]
+        return user_id, headers
+
+    return register
@@ -0,0 +1,43 @@
+"""
+Activity day bitmaps: a user's first two logs racing to create the row
+both land in it instead of failing on the primary key
+"""
+
+from datetime import date, timedelta
+
+
+def test_concurrent_first_marks_share_one_row(app, register_user, monkeypatch):
+    from app.database import SessionLocal
+    from app.models import UserActivityDays
+    from app.services.activity_days import ActivityDaysService, _to_int
+
+    user_id, _ = register_user()
+    first_day = date(2026, 3, 2)
+    second_day = first_day + timedelta(days=1)
+
+    # The other request read "no row" too, then this one committed its insert
+    racing = SessionLocal()
+    real_get_row = ActivityDaysService._get_row
+    reads = []
+
+    def stale_first_read(db, uid, for_update=False):
+        reads.append(uid)
+        return None if len(reads) == 1 else real_get_row(db, uid, for_update)
+
+    db = SessionLocal()
+    ActivityDaysService.mark_day(db, user_id, first_day)
+    db.commit()
+    db.close()
+
+    monkeypatch.setattr(ActivityDaysService, "_get_row", staticmethod(stale_first_read))
+    ActivityDaysService.mark_day(racing, user_id, second_day)
+    racing.commit()
+    racing.close()
+    monkeypatch.undo()
+
+    db = SessionLocal()
+    rows = db.query(UserActivityDays).filter(UserActivityDays.user_id == user_id).all()
+    db.close()
+    assert len(rows) == 1
+    assert rows[0].start_date == first_day
+    assert _to_int(rows[0].day_bits) == 0b11
@@ -0,0 +1,39 @@
+"""
+Refresh tokens are single-use: each refresh returns a new one and a
+replayed token is rejected
+"""
+
+import uuid
+
+from fastapi.testclient import TestClient
+
+
+def test_refresh_rotates_and_rejects_reuse(app):
+    client = TestClient(app)
+    email = f"{uuid.uuid4().hex[:12]}@example.com"
+    registered = client.post("/api/v1/auth/register", json={"email": email, "password": "pw", "name": "Test"})
+    first = registered.json()["refresh_token"]
+
+    refreshed = client.post("/api/v1/auth/refresh", json={"refresh_token": first})
+    assert refreshed.status_code == 200, refreshed.text
+    second = refreshed.json()["refresh_token"]
+    assert second and second != first
+    me = client.get("/api/v1/auth/me", headers={"Authorization": f"Bearer {refreshed.json()['access_token']}"})
+    assert me.json()["email"] == email
+
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": first}).status_code == 401
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": second}).status_code == 200
+
+
+def test_refresh_is_rate_limited(app, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "REFRESH_RATE_LIMIT_IP_BURST", 2)
+    monkeypatch.setattr(settings, "TRUST_FORWARDED_FOR", True)
+    client = TestClient(app, headers={"X-Forwarded-For": f"10.{uuid.uuid4().int % 256}.0.1"})
+    statuses = [
+        client.post("/api/v1/auth/refresh", json={"refresh_token": "not-a-token"}).status_code
+        for _ in range(3)
+    ]
+    assert statuses == [401, 401, 429]
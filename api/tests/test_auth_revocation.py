@@ -0,0 +1,62 @@
+"""
+Without a revocation store shared between workers, a deactivated or
+demoted user's tokens stop working even where the revocation wasn't seen
+(another worker, or this one after a restart)
+"""
+
+from fastapi.testclient import TestClient
+
+
+def _update_user(user_id, **values):
+    from app.database import SessionLocal
+    from app.models import User
+
+    db = SessionLocal()
+    db.query(User).filter(User.id == user_id).update(values)
+    db.commit()
+    db.close()
+
+
+def _forget_revocations():
+    """What a fresh worker knows: no revocations, nothing cached"""
+    from app.auth import auth_cache
+    from app.services.token_revocation import revocation_list
+
+    revocation_list._cutoffs.clear()
+    auth_cache.clear()
+
+
+def test_deactivated_user_loses_access(app, register_user):
+    user_id, headers = register_user()
+    client = TestClient(app)
+    assert client.get("/api/v1/carbon/logs", headers=headers).status_code == 200
+
+    _update_user(user_id, is_active=False)
+    _forget_revocations()
+    assert client.get("/api/v1/carbon/logs", headers=headers).status_code == 403
+    response = client.post(
+        "/api/v1/carbon/logs",
+        json={"category": "transport", "activity": "bus", "metadata": {"distance_km": 3}},
+        headers=headers,
+    )
+    assert response.status_code == 403
+
+
+def test_demoted_admin_loses_admin_access(app, register_user):
+    from app.auth import create_user_access_token
+    from app.database import SessionLocal
+    from app.models import User
+
+    user_id, _ = register_user()
+    _update_user(user_id, is_admin=True)
+    # A fresh token, so it carries the admin claim
+    db = SessionLocal()
+    token = create_user_access_token(db.query(User).filter(User.id == user_id).one())
+    db.close()
+    headers = {"Authorization": f"Bearer {token}"}
+    client = TestClient(app)
+    assert client.get("/api/v1/admin/stats", headers=headers).status_code == 200
+
+    _update_user(user_id, is_admin=False)
+    _forget_revocations()
+    assert client.get("/api/v1/admin/stats", headers=headers).status_code == 403
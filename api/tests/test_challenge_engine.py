@@ -0,0 +1,76 @@
+"""
+Challenge progress: one upsert per challenge moves progress and completes
+it, and the reward is awarded exactly once
+"""
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+
+def _points(user_id):
+    from app.database import SessionLocal
+    from app.models import User
+
+    db = SessionLocal()
+    points = db.query(User.total_points).filter(User.id == user_id).scalar()
+    db.close()
+    return points
+
+
+def test_challenge_completes_once(app, register_user):
+    from app.database import SessionLocal
+    from app.models import Challenge
+    from app.services.challenge_engine import challenge_engine
+
+    db = SessionLocal()
+    challenge = Challenge(
+        name="Two cycle trips", target_value=2, current_unit="logs",
+        reward_points=500, category="transport", activity="bicycle",
+    )
+    db.add(challenge)
+    db.commit()
+    challenge_id = str(challenge.id)
+    db.close()
+    challenge_engine.invalidate()
+
+    user_id, headers = register_user()
+    client = TestClient(app)
+
+    def log_trip():
+        response = client.post(
+            "/api/v1/carbon/logs",
+            json={"category": "transport", "activity": "bicycle", "metadata": {"distance_km": 4}},
+            headers=headers,
+        )
+        assert response.status_code == 200, response.text
+        (progress,) = [c for c in response.json()["challenges"] if c["challenge_id"] == challenge_id]
+        return progress
+
+    from app.database import engine
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "user_challenge_progress" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        first = log_trip()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert len(statements) == 1  # The upsert returns progress and completion
+    assert (first["progress"], first["completed"], first["just_completed"]) == (1, False, False)
+
+    before = _points(user_id)
+    second = log_trip()
+    assert (second["progress"], second["completed"], second["just_completed"]) == (2, True, True)
+    assert second["reward_points"] == 500
+    assert _points(user_id) - before >= 500
+
+    # Already completed: progress stays, no second reward
+    before = _points(user_id)
+    third = log_trip()
+    assert (third["progress"], third["completed"], third["just_completed"]) == (2, True, False)
+    assert third["reward_points"] == 0
+    assert _points(user_id) - before < 500
@@ -0,0 +1,226 @@
+"""
+Email outbox against a local stand-in for the Resend API: claiming,
+backoff, dead-lettering, and permanent vs transient failures
+"""
+
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+
+class StandInResend(BaseHTTPRequestHandler):
+    """Answers each email with the status code in the local part of its address, e.g. 503@test.local"""
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        code = int(payload["to"][0].split("@")[0].split("-")[0])
+        body = {"id": "stand-in"} if code == 200 else {"message": f"stand-in {code}"}
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def resend(app, monkeypatch):
+    """Point the Resend transport at the stand-in server (SMTP off)"""
+    from app.config import settings
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInResend)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "RESEND_API_URL", f"http://127.0.0.1:{server.server_port}/emails")
+    monkeypatch.setattr(settings, "RESEND_API_KEY", "re_test")
+    monkeypatch.setattr(settings, "SMTP_HOST", "")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def outbox(app):
+    """A sender with an empty queue"""
+    from app.database import SessionLocal
+    from app.models import EmailOutbox
+    from app.services.email_outbox import EmailOutboxService
+
+    db = SessionLocal()
+    db.query(EmailOutbox).delete()
+    db.commit()
+    db.close()
+    return EmailOutboxService()
+
+
+def _drain(service) -> int:
+    async def run():
+        service._client = httpx.AsyncClient(timeout=5.0)
+        try:
+            return await service.drain_once()
+        finally:
+            await service._client.aclose()
+
+    return asyncio.run(run())
+
+
+def _queue(*addresses):
+    from app.database import SessionLocal
+    from app.services.email_outbox import EmailOutboxService
+
+    db = SessionLocal()
+    rows = [EmailOutboxService.enqueue(db, "test", to, "Subject", "<p>Hi</p>", "Hi") for to in addresses]
+    db.commit()
+    ids = [row.id for row in rows]
+    db.close()
+    return ids
+
+
+def _rows():
+    from app.database import SessionLocal
+    from app.models import EmailOutbox
+
+    db = SessionLocal()
+    rows = {row.to_email: row for row in db.query(EmailOutbox).all()}
+    db.close()
+    return rows
+
+
+@pytest.mark.parametrize("code,permanent", [
+    (400, True), (403, True), (422, True),
+    (408, False), (429, False), (500, False), (503, False),
+])
+def test_resend_error_classification(resend, code, permanent):
+    from app.services.email_service import EmailService
+
+    async def send():
+        async with httpx.AsyncClient() as client:
+            return await EmailService._send_via_resend(client, f"{code}@test.local", "S", "<p>h</p>", "t")
+
+    error = asyncio.run(send())
+    assert error is not None and str(code) in str(error)
+    assert error.permanent is permanent
+
+
+def test_resend_success_and_connection_failure(resend, monkeypatch):
+    from app.config import settings
+    from app.services.email_service import EmailService
+
+    async def send(to):
+        async with httpx.AsyncClient() as client:
+            return await EmailService._send_via_resend(client, to, "S", "<p>h</p>", "t")
+
+    assert asyncio.run(send("200@test.local")) is None
+
+    monkeypatch.setattr(settings, "RESEND_API_URL", "http://127.0.0.1:9/emails")  # Nothing listens there
+    error = asyncio.run(send("200@test.local"))
+    assert error is not None and not error.permanent
+
+
+def test_outbox_sends_retries_and_dead_letters(resend, outbox, monkeypatch):
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_BACKOFF_SECONDS", 30.0)
+    _queue("200@test.local", "422@test.local", "503@test.local")
+    started = datetime.utcnow()
+
+    assert _drain(outbox) == 3
+    rows = _rows()
+    assert rows["200@test.local"].status == "sent" and rows["200@test.local"].sent_at is not None
+    assert rows["422@test.local"].status == "dead" and rows["422@test.local"].attempts == 1
+    transient = rows["503@test.local"]
+    assert transient.status == "pending" and transient.attempts == 1
+    assert "503" in transient.last_error
+    # First retry after the base delay, with jitter
+    assert started + timedelta(seconds=23) <= transient.next_attempt_at <= datetime.utcnow() + timedelta(seconds=37)
+
+    # Not due yet: nothing is claimed
+    assert _drain(outbox) == 0
+
+    # Last attempt fails too: dead-lettered
+    from app.database import SessionLocal
+    from app.models import EmailOutbox
+
+    db = SessionLocal()
+    db.query(EmailOutbox).filter(EmailOutbox.id == transient.id).update({
+        "next_attempt_at": datetime.utcnow() - timedelta(seconds=1),
+        "attempts": settings.EMAIL_OUTBOX_MAX_ATTEMPTS - 1,
+    })
+    db.commit()
+    db.close()
+    assert _drain(outbox) == 1
+    assert _rows()["503@test.local"].status == "dead"
+
+
+def test_backoff_doubles_and_caps(monkeypatch):
+    from app.config import settings
+    from app.services.email_outbox import EmailOutboxService
+
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_BACKOFF_SECONDS", 10.0)
+    monkeypatch.setattr(settings, "EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", 60.0)
+    assert 8 <= EmailOutboxService._backoff(1) <= 12
+    assert 32 <= EmailOutboxService._backoff(3) <= 48
+    assert 48 <= EmailOutboxService._backoff(10) <= 72
+
+
+def test_claim_skips_claimed_rows_until_the_deadline(resend, outbox):
+    from app.database import SessionLocal
+    from app.models import EmailOutbox
+
+    (claimed_id,) = _queue("200-a@test.local")
+    rows = outbox._claim_batch()
+    assert [row.id for row in rows] == [claimed_id]
+    assert _rows()["200-a@test.local"].status == "sending"
+
+    # Still within the claim deadline: another sender must not take it
+    assert outbox._claim_batch() == []
+
+    # The claiming sender died: the row is retried once the deadline passes
+    db = SessionLocal()
+    db.query(EmailOutbox).filter(EmailOutbox.id == claimed_id).update(
+        {"next_attempt_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    db.commit()
+    db.close()
+    assert _drain(outbox) == 1
+    row = _rows()["200-a@test.local"]
+    assert row.status == "sent" and row.attempts == 2
+
+
+def test_resend_verification_reports_failure_without_email(app, register_user, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "RESEND_API_KEY", "")
+    monkeypatch.setattr(settings, "SMTP_HOST", "")
+    monkeypatch.delenv("RESEND_API_KEY", raising=False)
+    _, headers = register_user()
+    response = TestClient(app).post("/api/v1/auth/resend-verification", headers=headers)
+    assert response.status_code == 500
+    assert "Failed to send verification email" in response.json()["detail"]
+
+
+def test_resend_verification_queues_the_email(app, register_user, outbox, monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "RESEND_API_KEY", "re_test")
+    _, headers = register_user()
+    response = TestClient(app).post("/api/v1/auth/resend-verification", headers=headers)
+    assert response.status_code == 200
+
+    from app.database import SessionLocal
+    from app.models import EmailOutbox
+
+    db = SessionLocal()
+    kinds = [kind for (kind,) in db.query(EmailOutbox.kind).filter(EmailOutbox.status == "pending")]
+    db.close()
+    assert kinds == ["verification", "verification"]  # At registration, then the resend
@@ -0,0 +1,62 @@
+"""
+Friends leaderboard cache: dropped when anyone in the follow set changes
+stats (also below the cut of a truncated list), kept otherwise
+"""
+
+from fastapi.testclient import TestClient
+
+
+def _set_points(user_id, points):
+    from app.database import SessionLocal
+    from app.models import User
+    from app.services.friends_leaderboard import friends_leaderboard
+
+    db = SessionLocal()
+    db.query(User).filter(User.id == user_id).update({"total_points": points})
+    db.commit()
+    db.close()
+    friends_leaderboard.stats_changed(user_id)
+
+
+def test_truncated_leaderboard_watches_the_whole_follow_set(app, register_user):
+    from app.services.friends_leaderboard import friends_leaderboard
+
+    me, headers = register_user()
+    top, _ = register_user()
+    below_cut, _ = register_user()
+    stranger, _ = register_user()
+    client = TestClient(app)
+    for followee in (top, below_cut):
+        assert client.post(f"/api/v1/gamification/follow/{followee}", headers=headers).status_code == 200
+    _set_points(top, 500)
+    _set_points(below_cut, 10)
+
+    def leaderboard():
+        response = client.get("/api/v1/gamification/leaderboard/friends?limit=1", headers=headers)
+        return [entry["user_id"] for entry in response.json()["data"]]
+
+    assert leaderboard() == [top]
+    assert str(me) in friends_leaderboard._cache
+
+    # Someone outside the follow set: the cached list stays
+    _set_points(stranger, 10000)
+    assert str(me) in friends_leaderboard._cache
+
+    # A followee below the cut climbs past the top entry
+    _set_points(below_cut, 1000)
+    assert str(me) not in friends_leaderboard._cache
+    assert leaderboard() == [below_cut]
+
+
+def test_dropped_leaderboards_leave_no_watchers(app, register_user):
+    from app.services.friends_leaderboard import friends_leaderboard
+
+    me, headers = register_user()
+    friend, _ = register_user()
+    client = TestClient(app)
+    client.post(f"/api/v1/gamification/follow/{friend}", headers=headers)
+    client.get("/api/v1/gamification/leaderboard/friends", headers=headers)
+    assert str(me) in friends_leaderboard._watchers.get(str(friend), set())
+
+    friends_leaderboard.invalidate_user(me)
+    assert str(me) not in friends_leaderboard._watchers.get(str(friend), set())
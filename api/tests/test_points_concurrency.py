@@ -0,0 +1,56 @@
+"""
+Concurrent carbon log writes for one user must not lose points updates
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models import PointsLedger, User
+from app.services.write_queue import write_queue
+
+REQUESTS = 24
+WORKERS = 8
+
+
+@pytest.mark.parametrize("use_write_queue", [False, True], ids=["direct", "write-queue"])
+def test_parallel_logs_keep_points_consistent(app, register_user, monkeypatch, use_write_queue):
+    monkeypatch.setattr(settings, "WRITE_QUEUE_ENABLED", use_write_queue)
+    user_id, headers = register_user()
+    start = threading.Barrier(WORKERS)
+
+    def post_log(index):
+        # A client per thread: each request runs on its own event loop thread
+        client = TestClient(app)
+        if index < WORKERS:
+            start.wait()
+        return client.post(
+            "/api/v1/carbon/logs",
+            json={"category": "transport", "activity": "bus", "metadata": {"distance_km": 3 + index}},
+            headers=headers,
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            responses = list(pool.map(post_log, range(REQUESTS)))
+    finally:
+        write_queue.stop()
+
+    assert [r.status_code for r in responses] == [200] * REQUESTS, [r.text for r in responses if r.status_code != 200]
+    awarded = sum(r.json()["points_awarded"] for r in responses)
+    assert awarded > 0
+
+    db = SessionLocal()
+    try:
+        total_points = db.query(User.total_points).filter(User.id == user_id).scalar()
+        ledger_sum = db.query(func.sum(PointsLedger.delta)).filter(PointsLedger.user_id == user_id).scalar()
+    finally:
+        db.close()
+
+    assert total_points == awarded
+    assert ledger_sum == total_points
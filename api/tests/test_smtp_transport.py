@@ -0,0 +1,248 @@
+"""
+SMTP transport against a local asyncio stub server: pipelined batches,
+rejections in the middle of a batch, dot-stuffing and AUTH negotiation
+"""
+
+import asyncio
+import base64
+import hmac
+from typing import Dict, List, Optional
+
+import pytest
+
+USER, PASSWORD = "mailer", "s3cret"
+
+
+class StubSMTP:
+    """
+    Minimal ESMTP server
+    Replies can be scripted per recipient (RCPT) and per message (end of
+    data); every command is recorded with the network read it arrived in.
+    """
+
+    def __init__(self, pipelining: bool = True, auth: str = "PLAIN LOGIN",
+                 rcpt_codes: Optional[Dict[str, int]] = None, end_codes: Optional[List[int]] = None):
+        self.pipelining = pipelining
+        self.auth = auth
+        self.rcpt_codes = rcpt_codes or {}
+        self.end_codes = list(end_codes or [])
+        self.commands: List[tuple] = []  # (read number, command line)
+        self.messages: List[bytes] = []  # Message content with dot-stuffing undone
+        self.raw_data: List[bytes] = []
+        self.auth_used: List[str] = []
+        self.connections = 0
+        self._reads = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._session, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _session(self, reader, writer):
+        self.connections += 1
+        buffer = b""
+
+        async def readline() -> bytes:
+            nonlocal buffer
+            while b"\r\n" not in buffer:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    raise ConnectionError
+                self._reads += 1
+                buffer += chunk
+            line, buffer = buffer.split(b"\r\n", 1)
+            return line
+
+        async def command() -> str:
+            line = (await readline()).decode()
+            self.commands.append((self._reads, line))
+            return line
+
+        def reply(text: str):
+            writer.write(text.encode() + b"\r\n")
+
+        reply("220 stub ready")
+        accepted = 0
+        try:
+            while True:
+                await writer.drain()
+                line = await command()
+                verb = line.split(" ")[0].upper()
+                if verb == "EHLO":
+                    features = ["stub", "8BITMIME"] + (["PIPELINING"] if self.pipelining else [])
+                    features += [f"AUTH {self.auth}"] if self.auth else []
+                    reply("\r\n".join(f"250-{f}" for f in features[:-1]) + f"\r\n250 {features[-1]}")
+                elif verb == "AUTH":
+                    ok = await self._auth(line, command, reply, writer)
+                    reply("235 ok" if ok else "535 5.7.8 bad credentials")
+                elif verb == "MAIL":
+                    accepted = 0
+                    reply("250 ok")
+                elif verb == "RCPT":
+                    address = line.split("<", 1)[1].rstrip(">")
+                    code = self.rcpt_codes.get(address, 250)
+                    accepted += code == 250
+                    reply(f"{code} rcpt {address}")
+                elif verb == "DATA":
+                    if not accepted:
+                        reply("554 no valid recipients")
+                        continue
+                    reply("354 go ahead")
+                    await writer.drain()
+                    lines = []
+                    while (data_line := await readline()) != b".":
+                        lines.append(data_line)
+                    self.raw_data.append(b"\r\n".join(lines) + b"\r\n")
+                    self.messages.append(b"".join(
+                        (data_line[1:] if data_line.startswith(b".") else data_line) + b"\r\n"
+                        for data_line in lines
+                    ))
+                    code = self.end_codes.pop(0) if self.end_codes else 250
+                    reply(f"{code} message {len(self.messages)}")
+                elif verb == "RSET":
+                    reply("250 reset")
+                elif verb == "QUIT":
+                    reply("221 bye")
+                    await writer.drain()
+                    break
+                else:
+                    reply("502 unknown command")
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def _auth(self, line, command, reply, writer) -> bool:
+        parts = line.split(" ")
+        mechanism = parts[1].upper()
+        self.auth_used.append(mechanism)
+        if mechanism == "PLAIN":
+            return base64.b64decode(parts[2]) == f"\0{USER}\0{PASSWORD}".encode()
+        if mechanism == "LOGIN":
+            user = base64.b64decode(parts[2]).decode() if len(parts) > 2 else None
+            if user is None:
+                reply("334 VXNlcm5hbWU6")
+                await writer.drain()
+                user = base64.b64decode(await command()).decode()
+            reply("334 UGFzc3dvcmQ6")
+            await writer.drain()
+            return (user, base64.b64decode(await command()).decode()) == (USER, PASSWORD)
+        if mechanism == "CRAM-MD5":
+            challenge = b"<1896.697170952@stub>"
+            reply("334 " + base64.b64encode(challenge).decode())
+            await writer.drain()
+            user, digest = base64.b64decode(await command()).decode().split(" ")
+            expected = hmac.new(PASSWORD.encode(), challenge, "md5").hexdigest()
+            return (user, digest) == (USER, expected)
+        return False
+
+
+@pytest.fixture
+def smtp_settings(monkeypatch):
+    from app.config import settings
+
+    for name, value in {
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_USE_TLS": False,
+        "SMTP_STARTTLS": False,
+        "SMTP_USER": USER,
+        "SMTP_PASSWORD": PASSWORD,
+        "SMTP_TIMEOUT_SECONDS": 5.0,
+        "SMTP_POOL_SIZE": 1,
+        "SMTP_PIPELINE_BATCH": 20,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    return settings
+
+
+def _send(smtp_settings, stub: StubSMTP, envelopes):
+    """Send through a fresh transport against the stub; returns per-message results"""
+    from app.services.smtp_transport import SMTPTransport
+
+    async def run():
+        smtp_settings.SMTP_PORT = await stub.start()
+        transport = SMTPTransport()
+        try:
+            return await transport.send_many(envelopes)
+        finally:
+            await transport.close()
+            await stub.stop()
+
+    return asyncio.run(run())
+
+
+def _envelope(to: str, body: str = "Hello"):
+    return ("noreply@test.local", [to], f"Subject: test\r\n\r\n{body}\r\n".encode())
+
+
+def test_pipelined_batch(smtp_settings):
+    stub = StubSMTP(pipelining=True)
+    results = _send(smtp_settings, stub, [_envelope(f"user{i}@test.local", f"Message {i}") for i in range(5)])
+
+    assert results == [None] * 5
+    assert [message.endswith(f"Message {i}\r\n".encode()) for i, message in enumerate(stub.messages)] == [True] * 5
+    assert stub.connections == 1
+    # Each message's MAIL, RCPT and DATA arrive in a single write
+    for read, line in stub.commands:
+        if line.startswith("MAIL FROM"):
+            together = [cmd.split(" ")[0] for r, cmd in stub.commands if r == read]
+            assert {"MAIL", "RCPT", "DATA"} <= set(together)
+
+
+@pytest.mark.parametrize("pipelining", [True, False])
+def test_rejections_mid_batch(smtp_settings, pipelining):
+    from app.services.smtp_transport import SMTPReplyError
+
+    stub = StubSMTP(
+        pipelining=pipelining,
+        rcpt_codes={"gone@test.local": 550},
+        end_codes=[250, 451, 250],  # Messages that reach the end of data: 1, 3, 4
+    )
+    envelopes = [_envelope(to) for to in (
+        "one@test.local", "gone@test.local", "busy@test.local", "four@test.local",
+    )]
+    results = _send(smtp_settings, stub, envelopes)
+
+    assert results[0] is None and results[3] is None
+    assert isinstance(results[1], SMTPReplyError) and results[1].code == 550 and results[1].permanent
+    assert isinstance(results[2], SMTPReplyError) and results[2].code == 451 and not results[2].permanent
+    # The rejected transaction is reset and the session keeps going
+    assert any(line == "RSET" for _, line in stub.commands)
+    assert stub.connections == 1
+
+
+def test_dot_stuffing(smtp_settings):
+    body = ".starts with a dot\r\n.\r\n..two dots\r\nmiddle . dot\r\n.\r\nend"
+    message = f".Subject: odd\r\n\r\n{body}".encode()
+    stub = StubSMTP()
+    results = _send(smtp_settings, stub, [("noreply@test.local", ["to@test.local"], message)])
+
+    assert results == [None]
+    assert stub.messages == [message + b"\r\n"]
+    assert stub.raw_data[0].startswith(b"..Subject")
+    assert b"\r\n..\r\n" in stub.raw_data[0] and b"\r\n...two dots" in stub.raw_data[0]
+
+
+@pytest.mark.parametrize("offered,expected", [
+    ("LOGIN", "LOGIN"),
+    ("PLAIN LOGIN", "PLAIN"),
+    ("LOGIN PLAIN CRAM-MD5", "CRAM-MD5"),
+])
+def test_auth_mechanism_negotiation(smtp_settings, offered, expected):
+    stub = StubSMTP(auth=offered)
+    assert _send(smtp_settings, stub, [_envelope("to@test.local")]) == [None]
+    assert stub.auth_used == [expected]
+
+
+def test_bad_credentials_are_permanent(smtp_settings):
+    from app.services.smtp_transport import SMTPReplyError
+
+    smtp_settings.SMTP_PASSWORD = "wrong"
+    stub = StubSMTP(auth="LOGIN")
+    results = _send(smtp_settings, stub, [_envelope("a@test.local"), _envelope("b@test.local")])
+
+    assert all(isinstance(error, SMTPReplyError) and error.code == 535 and error.permanent for error in results)
+    assert stub.connections == 1  # Not retried on a fresh connection
+    assert stub.messages == []
@@ -0,0 +1,26 @@
+"""
+Suggestion ranking: energy and lifestyle volumes are read in the unit
+their emission factor is quoted in
+"""
+
+from app.models import CarbonLog
+from app.services.suggestion_ranker import suggestion_ranker
+
+
+def _volume(category, activity, meta_data, carbon_amount_kg=0.0):
+    return suggestion_ranker._log_volume(CarbonLog(
+        category=category, activity=activity, meta_data=meta_data, carbon_amount_kg=carbon_amount_kg,
+    ))
+
+
+def test_logged_units_are_converted():
+    assert _volume("energy", "electricity_grid", {"amount": 5000, "unit": "wh"}) == 5.0
+    assert _volume("energy", "electricity_grid", {"amount": 5, "unit": "kWh"}) == 5.0
+    assert _volume("lifestyle", "ac_hour", {"amount": 90, "unit": "minute"}) == 1.5
+    assert _volume("lifestyle", "shower_10min", {"amount": 2, "unit": "time"}) == 2.0
+
+
+def test_unknown_unit_falls_back_to_emissions():
+    # 4.93 kg at 0.493 kg/kWh
+    volume = _volume("energy", "electricity_grid", {"amount": 3, "unit": "btu"}, carbon_amount_kg=4.93)
+    assert round(volume, 6) == 10.0
@@ -0,0 +1,100 @@
+"""
+Weekly digest: every email carries a working signed unsubscribe link
+and the RFC 8058 List-Unsubscribe headers
+"""
+
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def digest_user(app, register_user):
+    """A verified, opted-in user with one log in last week; returns (user id, headers)"""
+    from app.database import SessionLocal
+    from app.models import CarbonLog, EmailOutbox, JobCheckpoint, User
+    from app.services.weekly_digest import WeeklyDigestService
+
+    user_id, headers = register_user()
+    db = SessionLocal()
+    db.query(EmailOutbox).delete()
+    db.query(JobCheckpoint).delete()
+    db.query(User).update({"weekly_digest_opt_in": False}, synchronize_session=False)
+    user = db.query(User).filter(User.id == user_id).one()
+    user.email_verified = True
+    user.weekly_digest_opt_in = True
+    db.add(CarbonLog(
+        user_id=user.id, category="transport", activity="car",
+        carbon_amount_kg=4.2, created_at=WeeklyDigestService.default_week_start() + timedelta(days=2),
+    ))
+    db.commit()
+    db.close()
+    return user_id, headers
+
+
+def _queued_digest():
+    from app.database import SessionLocal
+    from app.models import EmailOutbox
+    from app.services.weekly_digest import WeeklyDigestService
+
+    db = SessionLocal()
+    WeeklyDigestService.run(db, WeeklyDigestService.default_week_start())
+    rows = db.query(EmailOutbox).filter(EmailOutbox.kind == "weekly_digest").all()
+    db.close()
+    assert len(rows) == 1
+    return rows[0]
+
+
+def _opted_in(user_id) -> bool:
+    from app.database import SessionLocal
+    from app.models import User
+
+    db = SessionLocal()
+    opted_in = db.query(User.weekly_digest_opt_in).filter(User.id == user_id).scalar()
+    db.close()
+    return opted_in
+
+
+def test_digest_carries_one_click_unsubscribe(app, digest_user):
+    user_id, _ = digest_user
+    row = _queued_digest()
+
+    link = row.headers["List-Unsubscribe"].strip("<>")
+    assert row.headers["List-Unsubscribe-Post"] == "List-Unsubscribe=One-Click"
+    assert link in row.text_body
+    assert "turn them off in your profile" not in row.text_body
+
+    # Opening the link only asks for confirmation
+    client = TestClient(app)
+    path = urlsplit(link)
+    page = client.get(f"{path.path}?{path.query}")
+    assert page.status_code == 200 and "<form" in page.text
+    assert _opted_in(user_id)
+
+    # The one-click POST turns digests off
+    response = client.post(f"{path.path}?{path.query}", data={"List-Unsubscribe": "One-Click"})
+    assert response.status_code == 200
+    assert not _opted_in(user_id)
+
+
+def test_unsubscribe_rejects_forged_links(app, digest_user):
+    user_id, _ = digest_user
+    response = TestClient(app).post(
+        "/api/v1/carbon/reports/weekly/digest/unsubscribe",
+        params={"user": user_id, "token": "0" * 64},
+    )
+    assert response.status_code == 400
+    assert _opted_in(user_id)
+
+
+def test_smtp_message_includes_unsubscribe_headers():
+    from app.services.email_service import EmailService
+
+    message = EmailService._build_mime(
+        "to@test.local", "Subject", "<p>Hi</p>", "Hi",
+        {"List-Unsubscribe": "<https://api.test/unsubscribe?token=x>", "List-Unsubscribe-Post": "List-Unsubscribe=One-Click"},
+    )
+    assert b"List-Unsubscribe: <https://api.test/unsubscribe?token=x>\r\n" in message
+    assert b"List-Unsubscribe-Post: List-Unsubscribe=One-Click\r\n" in message